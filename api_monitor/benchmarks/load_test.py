@@ -0,0 +1,296 @@
+# api_monitor/benchmarks/load_test.py
+# 本地压测：启动aiohttp桩服务集群（独立进程），让APIMonitor检查100/1k/10k个合成端点，
+# 记录周期耗时、每秒检查数、监控进程CPU和RSS，以及测量误差（观测延迟减注入延迟），
+# 结果输出为JSON，便于对比不同检查引擎和配置。
+#
+#   python -m api_monitor.benchmarks.load_test --sizes 100,1000 --engine async --output bench.json
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import socket
+import struct
+import sys
+import time
+from typing import Dict, List, Optional
+
+from api_monitor.core.monitor import APIMonitor
+from api_monitor.models.api import ErrorType
+from api_monitor.benchmarks.replay import CapturingNotifier
+
+try:
+    import psutil
+except ImportError:  # psutil为可选依赖，缺失时用resource统计
+    psutil = None
+
+QUIET_LOGGERS = ('monitor', 'async_engine', 'http_pool')
+
+def parse_distribution(spec: str):
+    """解析延迟分布：fixed:x、uniform:a,b、lognormal:median,sigma、exponential:mean"""
+    kind, _, params = spec.partition(':')
+    values = [float(v) for v in params.split(',')] if params else []
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    if kind == 'exponential':
+        return lambda rng: rng.expovariate(1 / values[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+# ---------------------------------------------------------------- 桩服务集群
+
+def _farm_main(ports: List[int], ready):
+    """桩服务进程：在多个端口上提供/ep/{id}，按查询参数注入延迟、错误、挂起和连接重置"""
+    from aiohttp import web
+
+    logging.getLogger('aiohttp').setLevel(logging.CRITICAL)
+    rng = random.Random()
+
+    async def handle(request):
+        query = request.query
+        roll = rng.random()
+        hang = float(query.get('hang', 0))
+        reset = float(query.get('reset', 0))
+        error = float(query.get('error', 0))
+        if roll < hang:
+            await asyncio.sleep(3600)
+        elif roll < hang + reset:
+            sock = request.transport.get_extra_info('socket')
+            if sock is not None:
+                # SO_LINGER=0使close发送RST
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            request.transport.abort()
+            return web.Response()
+        await asyncio.sleep(float(query.get('delay', 0)))
+        if roll < hang + reset + error:
+            return web.Response(status=500, text='injected error')
+        return web.Response(text='ok')
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get('/ep/{id}', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        for port in ports:
+            await web.TCPSite(runner, '127.0.0.1', port, backlog=4096).start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+def _free_ports(count: int) -> List[int]:
+    sockets = []
+    for _ in range(count):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        sockets.append(sock)
+    ports = [sock.getsockname()[1] for sock in sockets]
+    for sock in sockets:
+        sock.close()
+    return ports
+
+class StubFarm:
+    """在独立进程中运行桩服务，避免占用被测进程的CPU"""
+    def __init__(self, ports: int = 4):
+        self.ports = _free_ports(ports)
+        context = multiprocessing.get_context('spawn')
+        self._ready = context.Event()
+        self._process = context.Process(target=_farm_main, args=(self.ports, self._ready),
+                                        name='stub-farm', daemon=True)
+
+    def __enter__(self) -> 'StubFarm':
+        self._process.start()
+        if not self._ready.wait(30):
+            raise RuntimeError("Stub farm failed to start")
+        return self
+
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        self._process.join(timeout=5)
+
+    def endpoints(self, count: int, latency, error_rate: float, hang_rate: float,
+                  reset_rate: float, timeout: float, seed: int = 0) -> List[Dict]:
+        """生成端点配置，每个端点的注入延迟从分布中抽取并写入URL"""
+        rng = random.Random(seed)
+        apis = []
+        for index in range(count):
+            delay = round(latency(rng), 6)
+            port = self.ports[index % len(self.ports)]
+            apis.append({
+                'name': f'bench-{index}',
+                'url': (f'http://127.0.0.1:{port}/ep/{index}?delay={delay}'
+                        f'&error={error_rate}&hang={hang_rate}&reset={reset_rate}'),
+                'method': 'GET',
+                'headers': {},
+                'timeout': timeout,
+                'warning_response_time': timeout,
+                'critical_response_time': timeout,
+                'statistics_window': 60,
+                'injected_latency': delay
+            })
+        return apis
+
+# ---------------------------------------------------------------- 被测进程
+
+class _ProcessMeter:
+    """监控进程的CPU时间与RSS"""
+    def __init__(self):
+        self._process = psutil.Process() if psutil is not None else None
+
+    def cpu_seconds(self) -> float:
+        if self._process is not None:
+            times = self._process.cpu_times()
+            return times.user + times.system
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    def rss_bytes(self) -> int:
+        if self._process is not None:
+            return self._process.memory_info().rss
+        # 没有psutil时只能取峰值RSS（Linux上单位为KB）
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * (len(values) - 1)))]
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'p50': pick(0.5),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'max': values[-1]
+    }
+
+def _build_engine(engine: str, args):
+    if engine != 'async':
+        return None
+    from api_monitor.core.async_engine import AsyncCheckEngine
+    return AsyncCheckEngine(max_concurrency=args.max_concurrency,
+                            max_per_host=args.max_per_host)
+
+def run_scenario(farm: StubFarm, size: int, args, latency) -> Dict:
+    """对一个端点规模执行若干检查周期"""
+    apis = farm.endpoints(size, latency, args.error_rate, args.hang_rate, args.reset_rate,
+                          args.timeout, seed=args.seed)
+    injected = {api['url']: api['injected_latency'] for api in apis}
+    check_engine = _build_engine(args.engine, args)
+    monitor = APIMonitor(apis, CapturingNotifier(time.time), check_engine=check_engine,
+                         statistics_backend=args.backend)
+
+    outcomes = {'ok': 0, 'status_error': 0, ErrorType.TIMEOUT: 0, ErrorType.REQUEST: 0,
+                ErrorType.UNEXPECTED: 0}
+    errors: List[float] = []
+    process_response = monitor.process_response
+
+    def recording_process_response(api_config, result):
+        if result.error_type is not None:
+            outcomes[result.error_type] = outcomes.get(result.error_type, 0) + 1
+        elif result.status_code == 200:
+            outcomes['ok'] += 1
+            errors.append(result.response_time - injected[api_config['url']])
+        else:
+            outcomes['status_error'] += 1
+        process_response(api_config, result)
+
+    monitor.process_response = recording_process_response
+    meter = _ProcessMeter()
+    cycles = []
+    try:
+        for _ in range(args.cycles):
+            cpu_before = meter.cpu_seconds()
+            start = time.perf_counter()
+            monitor.check_all_apis()
+            duration = time.perf_counter() - start
+            cpu = meter.cpu_seconds() - cpu_before
+            cycles.append({
+                'duration_seconds': duration,
+                'checks_per_second': size / duration if duration else 0.0,
+                'cpu_seconds': cpu,
+                'cpu_percent': cpu / duration * 100 if duration else 0.0,
+                'rss_bytes': meter.rss_bytes()
+            })
+    finally:
+        if check_engine is not None:
+            check_engine.close()
+
+    durations = [cycle['duration_seconds'] for cycle in cycles]
+    return {
+        'endpoints': size,
+        'engine': args.engine,
+        'backend': args.backend,
+        'cycles': cycles,
+        'summary': {
+            'mean_cycle_seconds': sum(durations) / len(durations),
+            'max_cycle_seconds': max(durations),
+            'mean_checks_per_second': sum(c['checks_per_second'] for c in cycles) / len(cycles),
+            'peak_rss_bytes': max(cycle['rss_bytes'] for cycle in cycles)
+        },
+        'outcomes': outcomes,
+        'measurement_error_seconds': _percentiles(errors)
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Load-test APIMonitor against a local stub farm')
+    parser.add_argument('--sizes', default='100,1000,10000', help='comma-separated endpoint counts')
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--engine', default='async', choices=('sync', 'async'))
+    parser.add_argument('--backend', default='object', choices=('object', 'columnar'))
+    parser.add_argument('--max-concurrency', type=int, default=100)
+    parser.add_argument('--max-per-host', type=int, default=100)
+    parser.add_argument('--ports', type=int, default=4, help='stub farm listening ports')
+    parser.add_argument('--latency', default='lognormal:0.02,0.5',
+                        help='fixed:x | uniform:a,b | lognormal:median,sigma | exponential:mean')
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='requests that never answer')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='connections reset by peer')
+    parser.add_argument('--timeout', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON results to this file')
+    args = parser.parse_args(argv)
+
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+    latency = parse_distribution(args.latency)
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    results = {
+        'started_at': time.time(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+        'runs': []
+    }
+    with StubFarm(args.ports) as farm:
+        for size in sizes:
+            run = run_scenario(farm, size, args, latency)
+            results['runs'].append(run)
+            print(f"{size} endpoints: {run['summary']['mean_cycle_seconds']:.3f}s/cycle, "
+                  f"{run['summary']['mean_checks_per_second']:.0f} checks/s, "
+                  f"error p95 {run['measurement_error_seconds'].get('p95', 0) * 1000:.2f}ms",
+                  file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
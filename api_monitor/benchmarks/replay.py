@@ -0,0 +1,285 @@
+# api_monitor/benchmarks/replay.py
+# 告警管道离线回放：把录制的（结果日志）或合成的检查结果按虚拟时钟送入
+# APIMonitor.process_response，不发起HTTP请求，统计吞吐、各阶段耗时和告警序列。
+#
+#   python -m api_monitor.benchmarks.replay --events 1000000 --apis 100 --output report.json
+#   python -m api_monitor.benchmarks.replay --result-log /root/data/api_monitor/results \
+#       --compare baseline.json
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from api_monitor.core.monitor import APIMonitor
+from api_monitor.models.api import APIResponse, ErrorType
+from api_monitor.notifications.base import BaseNotifier
+from api_monitor.notifications.dispatcher import DeliveryHandle
+from api_monitor.storage.result_log import read_results
+
+# 计时的阶段（包含嵌套调用的时间）
+STAGES = ('process_response', '_check_status_code', '_check_response_time',
+          'calculate_statistics', 'can_send_alert')
+
+ReplayEvent = Tuple[Dict, APIResponse]
+
+class VirtualClock:
+    """回放用的虚拟时钟，时间随事件时间戳推进"""
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def set(self, timestamp: float):
+        self.now = timestamp
+
+class CapturingNotifier(BaseNotifier):
+    """记录而不发送通知，保留发出的顺序"""
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+        self.events: List[Dict] = []
+
+    def send_alert(self, title: str, content: str, alert_type: str, **kwargs) -> DeliveryHandle:
+        self.events.append({
+            'ts': self.clock(),
+            'kind': 'alert',
+            'alert_type': alert_type,
+            'title': title,
+            'content': content,
+            'url': kwargs.get('url'),
+            'status_code': kwargs.get('status_code')
+        })
+        return DeliveryHandle.completed(f"{alert_type} alert: {title}", True)
+
+    def send_recovery(self, title: str, content: str, **kwargs) -> DeliveryHandle:
+        self.events.append({
+            'ts': self.clock(),
+            'kind': 'recovery',
+            'alert_type': None,
+            'title': title,
+            'content': content,
+            'url': kwargs.get('url'),
+            'status_code': None
+        })
+        return DeliveryHandle.completed(f"recovery: {title}", True)
+
+def synthetic_apis(count: int) -> List[Dict]:
+    """生成回放用的API配置"""
+    return [{
+        'name': f'replay-{index}',
+        'url': f'http://replay.invalid/{index}',
+        'method': 'GET',
+        'headers': {},
+        'timeout': 10,
+        'warning_response_time': 1.0,
+        'critical_response_time': 3.0,
+        'statistics_window': 60
+    } for index in range(count)]
+
+def synthetic_events(apis: List[Dict], events: int, interval: float = 30, seed: int = 0,
+                     error_rate: float = 0.01, timeout_rate: float = 0.005,
+                     incident_rate: float = 0.001, start_ts: float = 1_700_000_000.0
+                     ) -> Iterator[ReplayEvent]:
+    """生成确定性的合成检查结果：对数正态延迟、随机错误，以及持续一段时间的故障"""
+    rng = random.Random(seed)
+    incidents: Dict[str, int] = {}  # url -> 故障剩余周期数
+    produced = 0
+    cycle = 0
+    while produced < events:
+        cycle_ts = start_ts + cycle * interval
+        for offset, api in enumerate(apis):
+            if produced >= events:
+                return
+            url = api['url']
+            timestamp = datetime.fromtimestamp(cycle_ts + offset * interval / len(apis))
+            if url not in incidents and rng.random() < incident_rate:
+                incidents[url] = rng.randint(5, 40)
+            roll = rng.random()
+            if url in incidents:
+                incidents[url] -= 1
+                if incidents[url] <= 0:
+                    del incidents[url]
+                if roll < 0.5:
+                    result = APIResponse(503, rng.uniform(0.01, 0.1), timestamp)
+                else:
+                    result = APIResponse(200, rng.lognormvariate(0.8, 0.4), timestamp, success=True)
+            elif roll < timeout_rate:
+                result = APIResponse(None, api['timeout'], timestamp, error='timed out',
+                                     error_type=ErrorType.TIMEOUT)
+            elif roll < timeout_rate + error_rate:
+                result = APIResponse(None, rng.uniform(0.001, 0.05), timestamp,
+                                     error='connection refused', error_type=ErrorType.REQUEST)
+            else:
+                result = APIResponse(200, rng.lognormvariate(-2.5, 0.6), timestamp, success=True,
+                                     connection_reused=roll > 0.1)
+            yield api, result
+            produced += 1
+        cycle += 1
+
+def recorded_events(path: str, start_ts: Optional[float] = None,
+                    end_ts: Optional[float] = None) -> Tuple[List[Dict], Iterator[ReplayEvent]]:
+    """从结果日志读取录制的检查结果，返回(API配置, 事件迭代器)
+
+    结果日志不保存阈值配置，这里按当前settings中同URL的配置回放，找不到时使用默认阈值。
+    """
+    from api_monitor.config.settings import APIMonitorSettings
+    configured = {api['url']: api for api in APIMonitorSettings.APIS}
+    apis: Dict[str, Dict] = {}
+    for record in read_results(path, start_ts, end_ts):
+        url = record['endpoint']
+        if url not in apis:
+            apis[url] = configured.get(url) or {**synthetic_apis(1)[0],
+                                                'name': record.get('name', url), 'url': url}
+
+    def iterate() -> Iterator[ReplayEvent]:
+        for record in read_results(path, start_ts, end_ts):
+            yield apis[record['endpoint']], APIResponse(
+                status_code=record.get('status'),
+                response_time=record['response_time'],
+                timestamp=datetime.fromtimestamp(record['ts']),
+                error=record.get('error'),
+                success=record.get('status') == 200 and record.get('error_class') is None,
+                error_type=record.get('error_class'),
+                connection_reused=record.get('connection_reused'),
+                phase_timings=record.get('phases'),
+                body_bytes=record.get('body_bytes')
+            )
+    return list(apis.values()), iterate()
+
+class ReplayHarness:
+    """用虚拟时钟和捕获通知器驱动APIMonitor"""
+    def __init__(self, apis: List[Dict], statistics_backend: str = 'object',
+                 profile_stages: bool = True):
+        self.clock = VirtualClock()
+        self.notifier = CapturingNotifier(self.clock)
+        self.monitor = APIMonitor(apis, self.notifier, http_pool=_NoHTTP(),
+                                  statistics_backend=statistics_backend, clock=self.clock)
+        self.stage_time = {stage: 0.0 for stage in STAGES}
+        self.stage_calls = {stage: 0 for stage in STAGES}
+        if profile_stages:
+            for stage in STAGES:
+                setattr(self.monitor, stage, self._timed(stage, getattr(self.monitor, stage)))
+
+    def _timed(self, stage: str, method):
+        perf_counter = time.perf_counter
+        stage_time = self.stage_time
+        stage_calls = self.stage_calls
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stage_time[stage] += perf_counter() - start
+                stage_calls[stage] += 1
+        return wrapper
+
+    def run(self, events: Iterable[ReplayEvent]) -> Dict:
+        """回放事件并返回报告"""
+        monitor_logger = logging.getLogger('monitor')
+        previous_level = monitor_logger.level
+        monitor_logger.setLevel(logging.WARNING)  # 逐条检查日志不计入回放
+        process_response = self.monitor.process_response
+        count = 0
+        start = time.perf_counter()
+        try:
+            for api_config, result in events:
+                self.clock.set(result.timestamp.timestamp())
+                process_response(api_config, result)
+                count += 1
+        finally:
+            monitor_logger.setLevel(previous_level)
+        elapsed = time.perf_counter() - start
+        return self._report(count, elapsed)
+
+    def _report(self, count: int, elapsed: float) -> Dict:
+        alerts = self.notifier.events
+        digest = hashlib.sha256(
+            json.dumps(alerts, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        return {
+            'events': count,
+            'elapsed_seconds': elapsed,
+            'events_per_second': count / elapsed if elapsed else 0.0,
+            'stages': {
+                stage: {
+                    'calls': self.stage_calls[stage],
+                    'total_seconds': self.stage_time[stage],
+                    'avg_microseconds': (self.stage_time[stage] / self.stage_calls[stage] * 1e6
+                                         if self.stage_calls[stage] else 0.0)
+                }
+                for stage in STAGES
+            },
+            'alert_count': len(alerts),
+            'alert_digest': digest,
+            'alerts': alerts
+        }
+
+class _NoHTTP:
+    """回放中不允许发起HTTP请求"""
+    def request(self, *args, **kwargs):
+        raise RuntimeError("HTTP requests are disabled during replay")
+
+def diff_alerts(expected: List[Dict], actual: List[Dict]) -> Optional[Dict]:
+    """返回两个告警序列的第一处差异，完全相同时返回None"""
+    for index, (left, right) in enumerate(zip(expected, actual)):
+        if left != right:
+            return {'index': index, 'expected': left, 'actual': right}
+    if len(expected) != len(actual):
+        index = min(len(expected), len(actual))
+        return {
+            'index': index,
+            'expected': expected[index] if index < len(expected) else None,
+            'actual': actual[index] if index < len(actual) else None
+        }
+    return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Replay check results through APIMonitor')
+    parser.add_argument('--events', type=int, default=100000, help='synthetic events to replay')
+    parser.add_argument('--apis', type=int, default=100, help='synthetic endpoint count')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--result-log', help='replay a recorded result log directory instead')
+    parser.add_argument('--backend', default='object', choices=('object', 'columnar'))
+    parser.add_argument('--no-stage-timing', action='store_true',
+                        help='skip per-stage timers to measure raw throughput')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', help='previous JSON report whose alerts must match')
+    args = parser.parse_args(argv)
+
+    if args.result_log:
+        apis, events = recorded_events(args.result_log)
+    else:
+        apis = synthetic_apis(args.apis)
+        events = synthetic_events(apis, args.events, seed=args.seed)
+
+    harness = ReplayHarness(apis, args.backend, profile_stages=not args.no_stage_timing)
+    report = harness.run(events)
+
+    summary = {key: value for key, value in report.items() if key != 'alerts'}
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        difference = diff_alerts(baseline['alerts'],
+                                 json.loads(json.dumps(report['alerts'], default=str)))
+        if difference is not None:
+            print(f"Alert sequence differs at index {difference['index']}:")
+            print(json.dumps(difference, indent=2, default=str))
+            return 1
+        print(f"Alert sequence identical ({report['alert_count']} alerts)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# api_monitor/cluster/backend.py
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterable, List
+
+class CoordinationBackend(ABC):
+    """集群协调后端基类
+
+    保存节点心跳和分区租约。claim必须是原子的：同一分区在租约到期前只能被一个节点持有。
+    """
+    @abstractmethod
+    def heartbeat(self, node_id: str, now: float):
+        """记录节点心跳"""
+        pass
+
+    @abstractmethod
+    def live_nodes(self, since: float) -> List[str]:
+        """返回since之后有心跳的节点"""
+        pass
+
+    @abstractmethod
+    def claim(self, node_id: str, partitions: Iterable[int], now: float, ttl: float) -> List[int]:
+        """获取或续约分区租约，返回本节点实际持有的分区"""
+        pass
+
+    @abstractmethod
+    def release(self, node_id: str, partitions: Iterable[int]):
+        """释放本节点持有的分区租约"""
+        pass
+
+    @abstractmethod
+    def leave(self, node_id: str):
+        """节点退出：删除心跳并释放全部租约"""
+        pass
+
+class SQLiteCoordinationBackend(CoordinationBackend):
+    """基于SQLite文件锁的协调后端，多个节点共享同一个数据库文件即可组成集群"""
+    def __init__(self, path: str, timeout: float = 10):
+        self.path = path
+        self.timeout = timeout
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS nodes (node_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "partition INTEGER PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # 手动管理事务，BEGIN IMMEDIATE在事务开始时即获取写锁
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def heartbeat(self, node_id: str, now: float):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO nodes (node_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(node_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (node_id, now)
+            )
+
+    def live_nodes(self, since: float) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT node_id FROM nodes WHERE last_seen >= ? ORDER BY node_id", (since,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def claim(self, node_id: str, partitions: Iterable[int], now: float, ttl: float) -> List[int]:
+        held = []
+        with self._transaction() as conn:
+            for partition in partitions:
+                cursor = conn.execute(
+                    "INSERT INTO leases (partition, owner, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(partition) DO UPDATE SET owner = excluded.owner, "
+                    "expires_at = excluded.expires_at "
+                    "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                    (partition, node_id, now + ttl, now)
+                )
+                if cursor.rowcount:
+                    held.append(partition)
+        return held
+
+    def release(self, node_id: str, partitions: Iterable[int]):
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM leases WHERE partition = ? AND owner = ?",
+                [(partition, node_id) for partition in partitions]
+            )
+
+    def leave(self, node_id: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE owner = ?", (node_id,))
+            conn.execute("DELETE FROM nodes WHERE node_id = ?", (node_id,))
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK"""
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,110 @@
+# api_monitor/cluster/coordinator.py
+import hashlib
+import os
+import socket
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Set
+
+from api_monitor.cluster.backend import CoordinationBackend
+from api_monitor.utils.logger import setup_logger
+
+logger = setup_logger('cluster')
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class ClusterCoordinator:
+    """基于租约的端点分区协调
+
+    端点按URL哈希到固定数量的分区。每个节点定期心跳，并按活跃节点集合的
+    最高随机权重哈希（rendezvous）计算自己应持有的分区：释放不再属于自己的分区，
+    获取或续约属于自己的分区。租约有时限，节点失联后其分区在lease_ttl后由其他节点接管；
+    节点加入或退出时只有对应的分区移动。本地租约过期后即视为不再持有，
+    因此任何时刻每个端点至多由一个节点探测和告警。
+    """
+    def __init__(self, backend: CoordinationBackend, node_id: Optional[str] = None,
+                 partitions: int = 64, lease_ttl: float = 90, renew_interval: float = 30):
+        self.backend = backend
+        self.node_id = node_id or default_node_id()
+        self.partitions = partitions
+        self.lease_ttl = lease_ttl
+        self.renew_interval = renew_interval
+        self._held: Dict[int, float] = {}  # 分区 -> 本地租约到期时间
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def partition_of(self, url: str) -> int:
+        return zlib.crc32(url.encode('utf-8')) % self.partitions
+
+    def _rendezvous_owner(self, partition: int, nodes) -> str:
+        return max(nodes, key=lambda node: hashlib.md5(f"{node}:{partition}".encode('utf-8')).digest())
+
+    def sync(self):
+        """心跳并重新计算、续约本节点的分区租约"""
+        now = time.time()
+        self.backend.heartbeat(self.node_id, now)
+        live = self.backend.live_nodes(now - self.lease_ttl)
+        if self.node_id not in live:
+            live.append(self.node_id)
+        desired = {partition for partition in range(self.partitions)
+                   if self._rendezvous_owner(partition, live) == self.node_id}
+
+        with self._lock:
+            released = set(self._held) - desired
+        if released:
+            # 先停止使用再释放，避免与接管节点重叠
+            with self._lock:
+                for partition in released:
+                    self._held.pop(partition, None)
+            self.backend.release(self.node_id, released)
+
+        held = self.backend.claim(self.node_id, sorted(desired), now, self.lease_ttl)
+        with self._lock:
+            previous = set(self._held)
+            self._held = {partition: now + self.lease_ttl for partition in held}
+        gained = set(held) - previous
+        if gained or released:
+            logger.info(
+                f"Node {self.node_id} holds {len(held)}/{self.partitions} partitions "
+                f"({len(live)} live nodes, +{len(gained)} -{len(released)})"
+            )
+
+    def owned_partitions(self) -> Set[int]:
+        now = time.time()
+        with self._lock:
+            return {partition for partition, expires in self._held.items() if expires > now}
+
+    def owns(self, url: str) -> bool:
+        """本节点当前是否持有该端点所在分区的有效租约"""
+        partition = self.partition_of(url)
+        with self._lock:
+            expires = self._held.get(partition)
+        return expires is not None and expires > time.time()
+
+    def start(self):
+        """立即同步一次并启动后台续约线程"""
+        self.sync()
+        self._thread = threading.Thread(target=self._renew_loop, name='cluster-lease', daemon=True)
+        self._thread.start()
+
+    def _renew_loop(self):
+        while not self._stop_event.wait(self.renew_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Failed to renew cluster leases for {self.node_id}: {str(e)}")
+
+    def stop(self):
+        """停止续约并退出集群，让其他节点立即接管"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            self._held = {}
+        try:
+            self.backend.leave(self.node_id)
+        except Exception as e:
+            logger.error(f"Failed to leave cluster for {self.node_id}: {str(e)}")
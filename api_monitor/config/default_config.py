@@ -11,12 +11,114 @@ class APIMonitorDefaults:
             'User-Agent': 'API-Monitor/1.0'
         },
         'success_rate_threshold': 95,
-        'availability_threshold': 98
+        'availability_threshold': 98,
+        'response_time_percentile': None,
+        'max_body_bytes': 0,
+        'body_assertions': []
     }
 
     MONITOR_CONFIG = {
         'check_interval': 30,
         'alert_check_count': 10,
         'statistics_window': 60,
-        'alert_cooldown': 5
-    }
\ No newline at end of file
+        'alert_cooldown': 5,
+        'check_engine': 'sync',
+        'max_concurrency': 100,
+        'max_per_host': 10,
+        'scheduler': 'interval',
+        'wheel_tick': 0.1,
+        'wheel_workers': 32,
+        'late_tolerance': 1.0,
+        'cycle_budget': 0.9,
+        'statistics_backend': 'object',
+        'check_workers': 1,
+        'worker_restart_delay': 5
+    }
+
+    DNS_CONFIG = {
+        'enabled': True,
+        'ttl': 60,
+        'negative_ttl': 10,
+        'stale_ttl': 300,
+        'timeout': 5,
+        'max_entries': 10000,
+        'workers': 8
+    }
+
+    HTTP_POOL_CONFIG = {
+        'pool_maxsize': 10,
+        'max_hosts': 100,
+        'idle_timeout': 300,
+        'chunk_size': 8192,
+        'drain_bytes': 16384
+    }
+
+    NOTIFIER_CONFIG = {
+        'async_dispatch': True,
+        'workers': 2,
+        'queue_size': 1000,
+        'max_retries': 3,
+        'backoff_base': 1.0,
+        'backoff_max': 30.0,
+        'overflow_policy': 'drop_oldest',
+        'connect_timeout': 3,
+        'read_timeout': 10,
+        'aggregation_window': 10,
+        'digest_max_items': 20,
+        'rate_limit_per_minute': 20,
+        'rate_limit_burst': 5,
+        'rate_limit_wait': 30
+    }
+
+    TIMESERIES_CONFIG = {
+        'enabled': False,
+        'path': '/root/data/api_monitor/timeseries',
+        'batch_size': 1000,
+        'flush_interval': 5,
+        'segment_max_bytes': 64 * 1024 * 1024,
+        'segment_max_age': 3600,
+        'fsync': False
+    }
+
+    CLUSTER_CONFIG = {
+        'enabled': False,
+        'node_id': None,
+        'backend': 'sqlite',
+        'path': '/root/data/api_monitor/cluster.db',
+        'partitions': 64,
+        'lease_ttl': 90,
+        'renew_interval': 30
+    }
+
+    RESULT_LOG_CONFIG = {
+        'enabled': False,
+        'path': '/root/data/api_monitor/results',
+        'buffer_bytes': 1024 * 1024,
+        'flush_interval': 1,
+        'fsync': False,
+        'max_bytes': 100 * 1024 * 1024,
+        'compress': True
+    }
+
+    ADAPTIVE_INTERVAL_CONFIG = {
+        'enabled': False,
+        'min_interval': 5,
+        'max_interval': 300,
+        'tighten_factor': 0.25,
+        'relax_factor': 1.5,
+        'stable_checks': 10
+    }
+
+    CIRCUIT_BREAKER_CONFIG = {
+        'enabled': False,
+        'failure_threshold': 3,
+        'probe_interval': 30,
+        'probe_timeout': 1.0,
+        'probe_workers': 16
+    }
+
+    METRICS_CONFIG = {
+        'enabled': False,
+        'host': '0.0.0.0',
+        'port': 9108
+    }
@@ -24,7 +24,98 @@ class APIMonitorSettings:
         'check_interval': 30,  # 检查间隔（秒）
         'alert_check_count': 10,  # 需要检查的次数才触发告警
         'statistics_window': 60,  # 统计窗口大小
-        'alert_cooldown': 5  # 告警冷却时间（分钟）
+        'alert_cooldown': 5,  # 告警冷却时间（分钟）
+        'check_engine': 'sync',  # 检查引擎：sync（逐个检查）/ async（aiohttp并发检查）
+        'max_concurrency': 100,  # async引擎全局并发上限
+        'max_per_host': 10,  # async引擎单主机并发上限
+        'scheduler': 'interval',  # 调度方式：interval（统一间隔）/ wheel（按端点间隔+哈希相位错峰）
+        'wheel_tick': 0.1,  # wheel调度的tick精度（秒）
+        'wheel_workers': 32,  # wheel调度执行检查的线程数
+        'late_tolerance': 1.0,  # 检查开始滞后超过该值（秒）记为late
+        'cycle_budget': 0.9,  # interval调度下周期时间预算占检查间隔的比例，到期未完成的检查被取消；0为不限制
+        'statistics_backend': 'object',  # 统计存储：object（每个API一个对象）/ columnar（列式环形缓冲区，适合大量端点）
+        'check_workers': 1,  # 检查进程数，大于1时按URL一致性哈希分片到多个工作进程
+        'worker_restart_delay': 5  # 工作进程异常退出后重启前的等待时间（秒）
+    }
+
+    # 自适应检查间隔配置（按端点调整下一次检查时间，需要scheduler为wheel且check_workers为1，
+    # 其他调度方式下启用会在启动时报错）
+    ADAPTIVE_INTERVAL_CONFIG = {
+        'enabled': False,  # 是否按端点健康状况调整检查间隔
+        'min_interval': 5,  # 间隔下限（秒），端点可用min_check_interval覆盖
+        'max_interval': 300,  # 间隔上限（秒），端点可用max_check_interval覆盖
+        'tighten_factor': 0.25,  # 检查异常（失败、非200、超过警告阈值）时间隔乘以该系数
+        'relax_factor': 1.5,  # 连续stable_checks次正常后间隔乘以该系数
+        'stable_checks': 10  # 放宽间隔需要的连续正常检查次数
+    }
+
+    # 按主机熔断配置
+    CIRCUIT_BREAKER_CONFIG = {
+        'enabled': False,  # 是否对持续不可达的主机熔断，熔断期间跳过完整检查
+        'failure_threshold': 3,  # 同一主机连续超时、连接失败或DNS失败多少次后熔断
+        'probe_interval': 30,  # 熔断期间TCP探测间隔（秒），探测成功后下一次检查执行完整请求
+        'probe_timeout': 1.0,  # TCP探测的连接超时（秒）
+        'probe_workers': 16  # 同一周期内并发执行TCP探测的线程数
+    }
+
+    # DNS缓存配置（HTTP连接池和async引擎共用）
+    DNS_CONFIG = {
+        'enabled': True,  # 是否缓存DNS解析结果，关闭时每次建连都调用系统解析器
+        'ttl': 60,  # 解析结果缓存时间（秒），系统解析器不返回记录TTL，统一使用该值
+        'negative_ttl': 10,  # 解析失败的缓存时间（秒）
+        'stale_ttl': 300,  # 过期后仍可使用旧结果的时间（秒），期间在后台刷新
+        'timeout': 5,  # 等待解析的最长时间（秒），超时按DNS错误处理
+        'max_entries': 10000,  # 最多缓存的主机名数
+        'workers': 8  # 解析线程数
+    }
+
+    # HTTP连接池配置
+    HTTP_POOL_CONFIG = {
+        'pool_maxsize': 10,  # 每个主机保持的最大连接数
+        'max_hosts': 100,  # 最多同时保持会话的主机数
+        'idle_timeout': 300,  # 主机会话空闲回收时间（秒）
+        'chunk_size': 8192,  # 流式读取响应体的块大小（字节）
+        'drain_bytes': 16384  # 未读完的响应体不超过该长度时读完以复用连接，否则关闭连接
+    }
+
+    # 检查结果持久化配置
+    TIMESERIES_CONFIG = {
+        'enabled': False,  # 是否把每次检查结果写入磁盘时序存储
+        'path': '/root/data/api_monitor/timeseries',  # 存储目录
+        'batch_size': 1000,  # 批量写入条数
+        'flush_interval': 5,  # 最长落盘间隔（秒）
+        'segment_max_bytes': 64 * 1024 * 1024,  # 单个段文件大小上限
+        'segment_max_age': 3600,  # 单个段文件最长写入时间（秒）
+        'fsync': False  # 每批写入后是否fsync
+    }
+
+    # 结构化检查结果日志配置
+    RESULT_LOG_CONFIG = {
+        'enabled': False,  # 是否把每次检查结果写成JSONL
+        'path': '/root/data/api_monitor/results',  # 日志目录
+        'buffer_bytes': 1024 * 1024,  # 缓冲达到该大小时写盘
+        'flush_interval': 1,  # 最长写盘间隔（秒）
+        'fsync': False,  # 每批写盘后是否fsync
+        'max_bytes': 100 * 1024 * 1024,  # 单个文件大小上限，超过后轮转
+        'compress': True  # 是否gzip压缩轮转后的文件
+    }
+
+    # 自身运行指标配置
+    METRICS_CONFIG = {
+        'enabled': False,  # 是否提供Prometheus格式的/metrics和JSON格式的/state
+        'host': '0.0.0.0',  # 监听地址
+        'port': 9108  # 监听端口
+    }
+
+    # 集群配置
+    CLUSTER_CONFIG = {
+        'enabled': False,  # 是否启用多节点集群模式（每个端点只由持有租约的节点检查和告警）
+        'node_id': None,  # 节点标识，None时使用"主机名-进程号"
+        'backend': 'sqlite',  # 协调后端，目前支持sqlite
+        'path': '/root/data/api_monitor/cluster.db',  # SQLite数据库路径，各节点需共享同一文件
+        'partitions': 64,  # 端点分区数
+        'lease_ttl': 90,  # 分区租约有效期（秒），节点失联后经过该时间由其他节点接管
+        'renew_interval': 30  # 心跳和续约间隔（秒），应明显小于lease_ttl
     }
 
     # 飞书配置
@@ -33,10 +124,33 @@ class APIMonitorSettings:
         'user_ids': ["用户ID1"]
     }
 
+    # 通知投递配置
+    NOTIFIER_CONFIG = {
+        'async_dispatch': True,  # 是否通过后台队列异步投递通知
+        'workers': 2,  # 投递线程数
+        'queue_size': 1000,  # 待投递队列上限
+        'max_retries': 3,  # 失败重试次数
+        'backoff_base': 1.0,  # 重试退避基数（秒），按指数增长并加随机抖动
+        'backoff_max': 30.0,  # 单次退避上限（秒）
+        'overflow_policy': 'drop_oldest',  # 队列满时：drop_oldest / drop_new
+        'connect_timeout': 3,  # Webhook连接超时（秒）
+        'read_timeout': 10,  # Webhook读取超时（秒）
+        'aggregation_window': 10,  # 告警合并窗口（秒），同级别告警合并为一张摘要卡片，0为不合并
+        'digest_max_items': 20,  # 摘要卡片最多列出的告警条数
+        'rate_limit_per_minute': 20,  # 每个Webhook每分钟最多外发次数
+        'rate_limit_burst': 5,  # 令牌桶容量（允许的突发次数）
+        'rate_limit_wait': 30  # 后台投递等待令牌的最长时间（秒）
+    }
+
     # 日志配置
     LOG_CONFIG = {
         'log_dir': '/root/logs',
         'log_level': 'INFO',
         'log_format': '%(asctime)s - %(levelname)s - %(message)s',
         'backup_count': 30,
+        'mode': 'sync',  # sync: 在调用线程写控制台和文件; async: 放入队列由单个后台线程格式化和写出（进程崩溃时队列中的日志会丢失）
+        'format': 'text',  # text / json（每行一个JSON对象，逐次检查日志附带结构化字段）
+        'compress_rotated': False,  # 是否在后台gzip压缩轮转后的日志文件
+        'check_log_rate': 0,  # 每秒最多输出的逐次检查日志条数，超出部分丢弃并计数，0为不限制
+        'check_log_burst': 100  # 逐次检查日志允许的突发条数
     }
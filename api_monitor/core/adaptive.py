@@ -0,0 +1,46 @@
+# api_monitor/core/adaptive.py
+from typing import Tuple
+
+from api_monitor.models.api import APIResponse
+
+class AdaptiveIntervalPolicy:
+    """按端点健康状况调整检查间隔
+
+    检查异常（请求失败、非200或响应时间超过警告阈值）时，间隔立即乘以tighten_factor，
+    不低于最小间隔，以便尽快确认故障；连续stable_checks次正常后乘以relax_factor，
+    不超过最大间隔，之后每stable_checks次正常再放宽一次。
+    端点可用min_check_interval/max_check_interval覆盖全局上下限。
+    """
+    def __init__(self, default_interval: float = 30, min_interval: float = 5,
+                 max_interval: float = 300, tighten_factor: float = 0.25,
+                 relax_factor: float = 1.5, stable_checks: int = 10):
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.tighten_factor = tighten_factor
+        self.relax_factor = relax_factor
+        self.stable_checks = stable_checks
+
+    def base_interval(self, api_config: dict) -> float:
+        return api_config.get('check_interval', self.default_interval)
+
+    @staticmethod
+    def is_healthy(api_config: dict, result: APIResponse) -> bool:
+        return (result.error_type is None and result.status_code == 200
+                and result.response_time <= api_config['warning_response_time'])
+
+    def update(self, api_config: dict, stats, result: APIResponse) -> Tuple[float, float]:
+        """根据本次检查结果更新stats.check_interval，返回(原间隔, 新间隔)"""
+        current = stats.check_interval or self.base_interval(api_config)
+        if self.is_healthy(api_config, result):
+            stats.healthy_streak += 1
+            interval = current
+            if stats.healthy_streak % self.stable_checks == 0:
+                interval = min(api_config.get('max_check_interval', self.max_interval),
+                               current * self.relax_factor)
+        else:
+            stats.healthy_streak = 0
+            interval = max(api_config.get('min_check_interval', self.min_interval),
+                           current * self.tighten_factor)
+        stats.check_interval = interval
+        return current, interval
@@ -0,0 +1,248 @@
+# api_monitor/core/async_engine.py
+import asyncio
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+
+from api_monitor.models.api import TIMING_PHASES, APIResponse, ErrorType
+from api_monitor.utils.body_inspector import BodyInspector
+from api_monitor.utils.dns_cache import DNSCache, get_dns_cache
+from api_monitor.utils.logger import setup_logger
+
+logger = setup_logger('async_engine')
+
+class CachingResolver(AbstractResolver):
+    """经进程内DNSCache解析的aiohttp解析器，与同步检查共用缓存和进行中的解析"""
+    def __init__(self, cache: DNSCache):
+        self.cache = cache
+
+    async def resolve(self, host: str, port: int = 0,
+                      family: socket.AddressFamily = socket.AF_INET) -> List[Dict]:
+        addresses = await self.cache.resolve_async(host, family)
+        return [{
+            'hostname': host,
+            'host': address,
+            'port': port,
+            'family': address_family,
+            'proto': 0,
+            'flags': socket.AI_NUMERICHOST
+        } for address_family, address in addresses]
+
+    async def close(self):
+        pass
+
+class AsyncCheckEngine:
+    """基于aiohttp的并发检查引擎
+
+    一个检查周期内同时发起所有请求，受全局并发上限和单主机并发上限约束，
+    周期耗时约等于最慢的单次检查。引擎只负责探测，结果交回APIMonitor处理。
+    响应体的读取方式与HTTPSessionPool一致：默认收到响应头即结束，按API配置流式读取并检查断言。
+    """
+    def __init__(self, max_concurrency: int = 100, max_per_host: int = 10,
+                 keepalive_timeout: float = 300, chunk_size: int = 8192,
+                 drain_bytes: int = 16384):
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.chunk_size = chunk_size
+        self.drain_bytes = drain_bytes
+        # 事件循环和会话跨周期保留，使keep-alive连接得以复用
+        self._loop = asyncio.new_event_loop()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def run(self, apis: List[Dict], deadline: Optional[float] = None) -> List[APIResponse]:
+        """并发检查所有API，按输入顺序返回检查结果
+
+        deadline为time.monotonic()时间点，到期仍未完成的检查被取消，结果为ErrorType.DEADLINE。
+        """
+        return self._loop.run_until_complete(self._run_cycle(apis, deadline))
+
+    def close(self):
+        """关闭会话和事件循环"""
+        if self._session is not None:
+            self._loop.run_until_complete(self._session.close())
+            self._session = None
+        self._loop.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取长连接会话，并注册连接复用追踪"""
+        if self._session is None or self._session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_start.append(self._on_request_start)
+            trace_config.on_dns_resolvehost_start.append(self._on_dns_start)
+            trace_config.on_dns_resolvehost_end.append(self._on_dns_end)
+            trace_config.on_connection_create_start.append(self._on_connection_create_start)
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+            trace_config.on_request_end.append(self._on_request_end)
+            dns_cache = get_dns_cache()
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.max_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                # 使用共享DNS缓存时关闭连接器自带的缓存，DNS追踪事件照常触发
+                resolver=CachingResolver(dns_cache) if dns_cache is not None else None,
+                use_dns_cache=dns_cache is None
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[trace_config]
+            )
+        return self._session
+
+    @staticmethod
+    async def _on_request_start(session, trace_ctx, params):
+        trace_ctx.trace_request_ctx['request_start'] = time.perf_counter()
+
+    @staticmethod
+    async def _on_dns_start(session, trace_ctx, params):
+        trace_ctx.trace_request_ctx['dns_start'] = time.perf_counter()
+
+    @staticmethod
+    async def _on_dns_end(session, trace_ctx, params):
+        ctx = trace_ctx.trace_request_ctx
+        ctx['dns'] = time.perf_counter() - ctx.get('dns_start', time.perf_counter())
+
+    @staticmethod
+    async def _on_connection_create_start(session, trace_ctx, params):
+        trace_ctx.trace_request_ctx['connect_start'] = time.perf_counter()
+
+    @staticmethod
+    async def _on_connection_created(session, trace_ctx, params):
+        ctx = trace_ctx.trace_request_ctx
+        ctx['reused'] = False
+        ctx['establish'] = time.perf_counter() - ctx.get('connect_start', time.perf_counter())
+
+    @staticmethod
+    async def _on_request_end(session, trace_ctx, params):
+        trace_ctx.trace_request_ctx['headers_received'] = time.perf_counter()
+
+    @staticmethod
+    def _phase_timings(ctx: Dict, finished: Optional[float]) -> Dict[str, Optional[float]]:
+        """由追踪时间点计算各阶段耗时
+
+        aiohttp在一次create_connection中同时完成TCP连接和TLS握手，无法拆分，
+        因此connect包含TLS握手时间，tls为None；DNS命中连接器缓存时dns为0。
+        finished为None表示没有读取响应体，transfer为None。
+        """
+        phases: Dict[str, Optional[float]] = dict.fromkeys(TIMING_PHASES)
+        establish = ctx.get('establish')
+        if establish is not None:
+            phases['dns'] = ctx.get('dns', 0.0)
+            phases['connect'] = max(0.0, establish - phases['dns'])
+        headers_received = ctx.get('headers_received')
+        if headers_received is not None and 'request_start' in ctx:
+            phases['ttfb'] = max(0.0, headers_received - ctx['request_start'] - (establish or 0.0))
+            if finished is not None:
+                phases['transfer'] = finished - headers_received
+        return phases
+
+    @staticmethod
+    async def _on_connection_reused(session, trace_ctx, params):
+        trace_ctx.trace_request_ctx['reused'] = True
+
+    async def _run_cycle(self, apis: List[Dict],
+                         deadline: Optional[float] = None) -> List[APIResponse]:
+        """执行一个检查周期"""
+        start_time = time.monotonic()
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        host_limits = defaultdict(lambda: asyncio.Semaphore(self.max_per_host))
+        session = self._get_session()
+        tasks = [
+            asyncio.ensure_future(self._probe(session, api_config, global_limit,
+                                              host_limits[urlsplit(api_config['url']).netloc]))
+            for api_config in apis
+        ]
+        if not tasks:
+            return []
+        timeout = max(0.0, deadline - start_time) if deadline is not None else None
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            # 取消仍在进行或排队的检查，并等待其释放连接和并发配额
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        elapsed = time.monotonic() - start_time
+        return [APIResponse.deadline_exceeded(elapsed) if task in pending else task.result()
+                for task in tasks]
+
+    async def _probe(self, session: aiohttp.ClientSession, api_config: Dict,
+                     global_limit: asyncio.Semaphore,
+                     host_limit: asyncio.Semaphore) -> APIResponse:
+        """检查单个API，计时从拿到并发配额后开始，不包含排队时间"""
+        async with global_limit, host_limit:
+            start_time = time.perf_counter()
+            trace_ctx = {}
+            try:
+                async with session.request(
+                    method=api_config['method'],
+                    url=api_config['url'],
+                    headers=api_config['headers'],
+                    timeout=aiohttp.ClientTimeout(total=api_config['timeout']),
+                    trace_request_ctx=trace_ctx
+                ) as response:
+                    inspector = BodyInspector.from_api_config(api_config)
+                    finished = None
+                    body_error = None
+                    if inspector is not None:
+                        async for chunk in response.content.iter_chunked(self.chunk_size):
+                            if inspector.feed(chunk):
+                                break
+                        finished = time.perf_counter()
+                        # 断言只针对200响应，其他状态码按状态码告警处理
+                        if response.status == 200:
+                            body_error = inspector.finish()
+                    response_time = time.perf_counter() - start_time
+                    await self._release(response)
+                    return APIResponse(
+                        status_code=response.status,
+                        response_time=response_time,
+                        timestamp=datetime.now(),
+                        error=body_error,
+                        success=response.status == 200 and body_error is None,
+                        error_type=ErrorType.ASSERTION if body_error is not None else None,
+                        connection_reused=trace_ctx.get('reused'),
+                        phase_timings=self._phase_timings(trace_ctx, finished),
+                        body_bytes=response.content.total_bytes
+                    )
+            except asyncio.TimeoutError as e:
+                return self._error_response(ErrorType.TIMEOUT, e, start_time)
+            except aiohttp.ClientConnectorError as e:
+                # 解析失败时os_error为解析器抛出的socket.gaierror
+                error_type = ErrorType.DNS if isinstance(e.os_error, socket.gaierror) \
+                    else ErrorType.REQUEST
+                return self._error_response(error_type, e, start_time)
+            except aiohttp.ClientError as e:
+                return self._error_response(ErrorType.REQUEST, e, start_time)
+            except Exception as e:
+                logger.error(f"Unexpected error checking {api_config['url']}: {str(e)}")
+                return self._error_response(ErrorType.UNEXPECTED, e, start_time)
+
+    async def _release(self, response: aiohttp.ClientResponse):
+        """处理未读完的响应体：声明的长度不超过drain_bytes时读完，使连接可以复用；
+        否则关闭连接，不再下载剩余部分"""
+        if response.content.at_eof():
+            return
+        if response.content_length is not None and response.content_length <= self.drain_bytes:
+            try:
+                await response.content.read()
+                return
+            except aiohttp.ClientError:
+                pass
+        response.close()
+
+    def _error_response(self, error_type: str, error: Exception, start_time: float) -> APIResponse:
+        """构建失败的检查结果"""
+        return APIResponse(
+            status_code=None,
+            response_time=time.perf_counter() - start_time,
+            timestamp=datetime.now(),
+            error=str(error) or error.__class__.__name__,
+            error_type=error_type
+        )
@@ -0,0 +1,215 @@
+# api_monitor/core/builder.py
+import atexit
+from typing import Dict, Optional
+
+from api_monitor.cluster.backend import SQLiteCoordinationBackend
+from api_monitor.cluster.coordinator import ClusterCoordinator
+from api_monitor.core.adaptive import AdaptiveIntervalPolicy
+from api_monitor.core.circuit_breaker import CircuitBreaker
+from api_monitor.core.monitor import APIMonitor
+from api_monitor.core.scheduler import MonitorScheduler
+from api_monitor.core.self_metrics import MetricsServer, SelfMetrics
+from api_monitor.notifications.aggregator import AlertAggregator
+from api_monitor.notifications.base import BaseNotifier
+from api_monitor.notifications.dispatcher import NotificationDispatcher
+from api_monitor.notifications.feishu import FeishuNotifier
+from api_monitor.storage.result_log import ResultLogWriter
+from api_monitor.storage.timeseries import TimeSeriesStore
+from api_monitor.utils.dns_cache import get_dns_cache
+from api_monitor.utils.http_pool import HTTPSessionPool
+from api_monitor.utils.rate_limit import get_rate_limiter
+
+def build_monitor(settings) -> APIMonitor:
+    """按配置（APIMonitorSettings）创建监控器及其依赖的组件
+
+    后台线程、会话和文件句柄在进程退出时按atexit注册的逆序关闭。
+    """
+    dispatcher = _build_dispatcher(settings)
+    check_workers = settings.MONITOR_CONFIG.get('check_workers', 1)
+    check_engine = None
+    engine_config = build_engine_config(settings)
+    if engine_config and check_workers <= 1:
+        from api_monitor.core.async_engine import AsyncCheckEngine
+        check_engine = AsyncCheckEngine(**engine_config)
+        atexit.register(check_engine.close)
+
+    return APIMonitor(
+        apis=settings.APIS,
+        notifier=_build_notifier(settings, dispatcher),
+        check_engine=check_engine,
+        statistics_backend=settings.MONITOR_CONFIG.get('statistics_backend', 'object'),
+        timeseries_store=_build_timeseries_store(settings),
+        cluster=_build_cluster(settings),
+        result_log=_build_result_log(settings),
+        self_metrics=_build_self_metrics(settings, dispatcher),
+        adaptive_interval=_build_adaptive_interval(settings),
+        circuit_breaker=_build_circuit_breaker(settings)
+    )
+
+def build_runner(monitor: APIMonitor, settings):
+    """创建驱动检查的调度器：check_workers大于1时为多进程分片监控，否则为MonitorScheduler"""
+    monitor_config = settings.MONITOR_CONFIG
+    check_workers = monitor_config.get('check_workers', 1)
+    if check_workers > 1:
+        from api_monitor.core.sharding import ShardedMonitor
+        return ShardedMonitor(
+            monitor=monitor,
+            workers=check_workers,
+            interval_seconds=monitor_config['check_interval'],
+            engine_config=build_engine_config(settings),
+            restart_delay=monitor_config['worker_restart_delay']
+        )
+    return MonitorScheduler(
+        monitor=monitor,
+        interval_seconds=monitor_config['check_interval'],
+        mode=monitor_config.get('scheduler', 'interval'),
+        wheel_config={
+            'tick_seconds': monitor_config['wheel_tick'],
+            'max_workers': monitor_config['wheel_workers'],
+            'late_tolerance': monitor_config['late_tolerance']
+        },
+        cycle_budget=monitor_config['cycle_budget']
+    )
+
+def build_engine_config(settings) -> Optional[Dict]:
+    """async检查引擎的参数，未选择async引擎时返回None"""
+    if settings.MONITOR_CONFIG.get('check_engine') != 'async':
+        return None
+    return {
+        'max_concurrency': settings.MONITOR_CONFIG['max_concurrency'],
+        'max_per_host': settings.MONITOR_CONFIG['max_per_host'],
+        'keepalive_timeout': settings.HTTP_POOL_CONFIG['idle_timeout'],
+        'chunk_size': settings.HTTP_POOL_CONFIG['chunk_size'],
+        'drain_bytes': settings.HTTP_POOL_CONFIG['drain_bytes']
+    }
+
+def _build_dispatcher(settings) -> Optional[NotificationDispatcher]:
+    notifier_config = settings.NOTIFIER_CONFIG
+    if not notifier_config['async_dispatch']:
+        return None
+    dispatcher = NotificationDispatcher(
+        workers=notifier_config['workers'],
+        queue_size=notifier_config['queue_size'],
+        max_retries=notifier_config['max_retries'],
+        backoff_base=notifier_config['backoff_base'],
+        backoff_max=notifier_config['backoff_max'],
+        overflow_policy=notifier_config['overflow_policy']
+    )
+    # 退出时等待队列中的通知发送完毕
+    atexit.register(dispatcher.shutdown)
+    return dispatcher
+
+def _build_notifier(settings, dispatcher: Optional[NotificationDispatcher]) -> BaseNotifier:
+    notifier_config = settings.NOTIFIER_CONFIG
+    # Webhook只有一个主机，每个投递线程最多占用一个连接
+    http_pool = HTTPSessionPool(
+        pool_maxsize=max(1, notifier_config['workers']),
+        max_hosts=1,
+        idle_timeout=settings.HTTP_POOL_CONFIG['idle_timeout']
+    )
+    notifier = FeishuNotifier(
+        webhook_url=settings.FEISHU_CONFIG['webhook'],
+        user_ids=settings.FEISHU_CONFIG['user_ids'],
+        dispatcher=dispatcher,
+        timeout=(notifier_config['connect_timeout'], notifier_config['read_timeout']),
+        rate_limiter=get_rate_limiter(
+            settings.FEISHU_CONFIG['webhook'],
+            rate=notifier_config['rate_limit_per_minute'] / 60,
+            capacity=notifier_config['rate_limit_burst']
+        ),
+        rate_limit_wait=notifier_config['rate_limit_wait'],
+        http_pool=http_pool
+    )
+    if notifier_config['aggregation_window'] > 0:
+        notifier = AlertAggregator(
+            notifier,
+            window_seconds=notifier_config['aggregation_window'],
+            max_items=notifier_config['digest_max_items']
+        )
+        # 退出时先发出窗口内尚未汇总的告警，再由调度器发送完毕（atexit按注册的逆序执行）
+        atexit.register(notifier.flush_all)
+    return notifier
+
+def _build_timeseries_store(settings) -> Optional[TimeSeriesStore]:
+    config = settings.TIMESERIES_CONFIG
+    if not config['enabled']:
+        return None
+    store = TimeSeriesStore(
+        path=config['path'],
+        batch_size=config['batch_size'],
+        flush_interval=config['flush_interval'],
+        segment_max_bytes=config['segment_max_bytes'],
+        segment_max_age=config['segment_max_age'],
+        fsync=config['fsync']
+    )
+    atexit.register(store.close)
+    return store
+
+def _build_result_log(settings) -> Optional[ResultLogWriter]:
+    config = settings.RESULT_LOG_CONFIG
+    if not config['enabled']:
+        return None
+    result_log = ResultLogWriter(
+        path=config['path'],
+        buffer_bytes=config['buffer_bytes'],
+        flush_interval=config['flush_interval'],
+        fsync=config['fsync'],
+        max_bytes=config['max_bytes'],
+        compress=config['compress']
+    )
+    atexit.register(result_log.close)
+    return result_log
+
+def _build_cluster(settings) -> Optional[ClusterCoordinator]:
+    """多节点部署时按租约划分端点"""
+    config = settings.CLUSTER_CONFIG
+    if not config['enabled']:
+        return None
+    cluster = ClusterCoordinator(
+        backend=SQLiteCoordinationBackend(config['path']),
+        node_id=config['node_id'],
+        partitions=config['partitions'],
+        lease_ttl=config['lease_ttl'],
+        renew_interval=config['renew_interval']
+    )
+    cluster.start()
+    atexit.register(cluster.stop)
+    return cluster
+
+def _build_self_metrics(settings,
+                        dispatcher: Optional[NotificationDispatcher]) -> Optional[SelfMetrics]:
+    """检查循环每个周期发布快照，/metrics只读快照"""
+    config = settings.METRICS_CONFIG
+    if not config['enabled']:
+        return None
+    self_metrics = SelfMetrics(dispatcher=dispatcher, dns_cache=get_dns_cache())
+    metrics_server = MetricsServer(self_metrics, config['host'], config['port'])
+    metrics_server.start()
+    atexit.register(metrics_server.stop)
+    return self_metrics
+
+def _build_adaptive_interval(settings) -> Optional[AdaptiveIntervalPolicy]:
+    config = settings.ADAPTIVE_INTERVAL_CONFIG
+    if not config['enabled']:
+        return None
+    return AdaptiveIntervalPolicy(
+        default_interval=settings.MONITOR_CONFIG['check_interval'],
+        min_interval=config['min_interval'],
+        max_interval=config['max_interval'],
+        tighten_factor=config['tighten_factor'],
+        relax_factor=config['relax_factor'],
+        stable_checks=config['stable_checks']
+    )
+
+def _build_circuit_breaker(settings) -> Optional[CircuitBreaker]:
+    config = settings.CIRCUIT_BREAKER_CONFIG
+    if not config['enabled']:
+        return None
+    circuit_breaker = CircuitBreaker(
+        failure_threshold=config['failure_threshold'],
+        probe_interval=config['probe_interval'],
+        probe_timeout=config['probe_timeout'],
+        probe_workers=config['probe_workers']
+    )
+    atexit.register(circuit_breaker.close)
+    return circuit_breaker
@@ -0,0 +1,217 @@
+# api_monitor/core/circuit_breaker.py
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from api_monitor.models.api import APIResponse, ErrorType
+from api_monitor.utils.dns_cache import get_dns_cache
+
+# 计为主机不可达的检查错误（收到任何HTTP响应都说明主机可达）
+HOST_FAILURES = (ErrorType.TIMEOUT, ErrorType.REQUEST, ErrorType.DNS)
+
+class BreakerState:
+    """熔断器状态常量"""
+    CLOSED = 'closed'  # 正常执行完整检查
+    OPEN = 'open'  # 跳过完整检查，按probe_interval做TCP探测
+    HALF_OPEN = 'half_open'  # TCP探测成功，下一次完整检查决定是否恢复
+
+class _HostBreaker:
+    """单个主机（host:port）的熔断状态"""
+    __slots__ = ('state', 'failures', 'next_probe', 'opened_at', 'last_error', 'open_count')
+
+    def __init__(self):
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.next_probe = 0.0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.open_count = 0
+
+class CircuitBreaker:
+    """按主机的熔断器
+
+    同一主机连续failure_threshold次检查超时、连接失败或DNS失败后熔断（open）：
+    该主机上的端点不再发起完整请求，每probe_interval秒最多做一次短超时的TCP连接探测，
+    其余检查立即失败；探测成功后进入半开（half_open），下一次完整检查成功则恢复（closed），
+    失败则重新熔断。收到任何HTTP响应都视为主机可达。
+    批量检查时到期的探测在最多probe_workers个线程中并发执行，多个熔断主机的探测耗时不叠加。
+    """
+    def __init__(self, failure_threshold: int = 3, probe_interval: float = 30,
+                 probe_timeout: float = 1.0, probe_workers: int = 16):
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.probe_workers = probe_workers
+        self._hosts: Dict[Tuple[str, int], _HostBreaker] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def host_key(url: str) -> Tuple[str, int]:
+        parts = urlsplit(url)
+        return parts.hostname or '', parts.port or (443 if parts.scheme == 'https' else 80)
+
+    def _breaker(self, key: Tuple[str, int]) -> _HostBreaker:
+        breaker = self._hosts.get(key)
+        if breaker is None:
+            breaker = self._hosts[key] = _HostBreaker()
+        return breaker
+
+    def state(self, url: str) -> str:
+        breaker = self._hosts.get(self.host_key(url))
+        return breaker.state if breaker is not None else BreakerState.CLOSED
+
+    def before_check(self, url: str) -> Tuple[Optional[str], bool]:
+        """检查前调用，返回(快速失败原因, 是否刚转为半开)
+
+        快速失败原因为None时照常执行完整检查；熔断期间到了探测时间则先做TCP探测，
+        探测成功时转为半开。
+        """
+        key = self.host_key(url)
+        decision = self._claim_probe(key)
+        if decision is not None:
+            return decision
+        return self._finish_probe(key, self._tcp_probe(key))
+
+    def before_checks(self, urls: List[str]) -> Dict[str, Tuple[Optional[str], bool]]:
+        """批量检查前调用，返回每个url的(快速失败原因, 是否刚转为半开)
+
+        到期的TCP探测按主机去重后并发执行，同一主机上的端点共用一次探测的结果。
+        """
+        keys = {url: self.host_key(url) for url in urls}
+        decisions: Dict[Tuple[str, int], Tuple[Optional[str], bool]] = {}
+        probes = []
+        for key in dict.fromkeys(keys.values()):
+            decision = self._claim_probe(key)
+            if decision is not None:
+                decisions[key] = decision
+            else:
+                probes.append(key)
+        if len(probes) == 1:
+            decisions[probes[0]] = self._finish_probe(probes[0], self._tcp_probe(probes[0]))
+        elif probes:
+            for key, error in zip(probes, self._get_executor().map(self._tcp_probe, probes)):
+                decisions[key] = self._finish_probe(key, error)
+        return {url: decisions[key] for url, key in keys.items()}
+
+    def _claim_probe(self, key: Tuple[str, int]) -> Optional[Tuple[Optional[str], bool]]:
+        """未熔断或未到探测时间时返回检查决定；需要探测时占用本次探测并返回None"""
+        now = time.monotonic()
+        with self._lock:
+            breaker = self._breaker(key)
+            if breaker.state != BreakerState.OPEN:
+                return None, False
+            if now < breaker.next_probe:
+                return (f"Circuit open for {key[0]}:{key[1]} ({breaker.last_error}), "
+                        f"next TCP probe in {breaker.next_probe - now:.0f}s"), False
+            # 先占用本次探测，并发的检查在探测期间直接失败
+            breaker.next_probe = now + self.probe_interval
+            return None
+
+    def _finish_probe(self, key: Tuple[str, int],
+                      error: Optional[str]) -> Tuple[Optional[str], bool]:
+        """按探测结果更新状态，探测成功时转为半开"""
+        with self._lock:
+            breaker = self._breaker(key)
+            if error is not None:
+                breaker.last_error = error
+                return f"Circuit open for {key[0]}:{key[1]}, TCP probe failed: {error}", False
+            if breaker.state != BreakerState.OPEN:
+                return None, False
+            breaker.state = BreakerState.HALF_OPEN
+            return None, True
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.probe_workers,
+                                                    thread_name_prefix='breaker-probe')
+            return self._executor
+
+    def _tcp_probe(self, key: Tuple[str, int]) -> Optional[str]:
+        """短超时的TCP连接探测，返回错误信息，连接成功时返回None
+
+        启用DNS缓存时经共享缓存解析主机名（失败结果有负缓存），再在probe_timeout内
+        依次尝试解析出的地址。
+        """
+        host, port = key
+        cache = get_dns_cache()
+        if cache is None:
+            try:
+                with socket.create_connection(key, timeout=self.probe_timeout):
+                    return None
+            except OSError as e:
+                return str(e) or e.__class__.__name__
+        deadline = time.monotonic() + self.probe_timeout
+        try:
+            addresses = cache.resolve(host)
+        except OSError as e:
+            return str(e) or e.__class__.__name__
+        error = f"No addresses resolved for {host}"
+        for family, address in addresses:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return f"TCP probe timed out after {self.probe_timeout:g}s"
+            try:
+                with socket.socket(family, socket.SOCK_STREAM) as sock:
+                    sock.settimeout(remaining)
+                    sock.connect((address, port))
+                    return None
+            except OSError as e:
+                error = str(e) or e.__class__.__name__
+        return error
+
+    def close(self):
+        """关闭探测线程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def record(self, url: str, result: APIResponse) -> Optional[Tuple[str, str]]:
+        """记录一次完整检查的结果，返回状态转换(原状态, 新状态)，无转换时返回None"""
+        if result.error_type == ErrorType.CIRCUIT_OPEN:
+            return None
+        failed = result.error_type in HOST_FAILURES
+        with self._lock:
+            breaker = self._breaker(self.host_key(url))
+            previous = breaker.state
+            if not failed:
+                breaker.failures = 0
+                breaker.state = BreakerState.CLOSED
+                breaker.opened_at = None
+            else:
+                breaker.failures += 1
+                breaker.last_error = result.error
+                if previous == BreakerState.HALF_OPEN or (
+                        previous == BreakerState.CLOSED
+                        and breaker.failures >= self.failure_threshold):
+                    breaker.state = BreakerState.OPEN
+                    breaker.next_probe = time.monotonic() + self.probe_interval
+                    if previous == BreakerState.CLOSED:
+                        breaker.opened_at = time.time()
+                        breaker.open_count += 1
+            if breaker.state == previous:
+                return None
+            return previous, breaker.state
+
+    def failures(self, url: str) -> int:
+        breaker = self._hosts.get(self.host_key(url))
+        return breaker.failures if breaker is not None else 0
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """获取各主机的熔断状态"""
+        with self._lock:
+            return {
+                f"{host}:{port}": {
+                    'state': breaker.state,
+                    'consecutive_failures': breaker.failures,
+                    'opened_at': breaker.opened_at,
+                    'open_count': breaker.open_count,
+                    'last_error': breaker.last_error
+                }
+                for (host, port), breaker in self._hosts.items()
+            }
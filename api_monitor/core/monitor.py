@@ -1,13 +1,22 @@
 # api_monitor/core/monitor.py
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 import time
 import requests
 from datetime import datetime
 
-from api_monitor.models.api import APIConfig
+from api_monitor.cluster.coordinator import ClusterCoordinator
+from api_monitor.core.adaptive import AdaptiveIntervalPolicy
+from api_monitor.core.circuit_breaker import BreakerState, CircuitBreaker
+from api_monitor.core.self_metrics import SelfMetrics
+from api_monitor.models.api import PHASE_LABELS, TIMING_PHASES, APIConfig, APIResponse, ErrorType
+from api_monitor.models.columnar import ColumnarEndpointStatistics, ColumnarStatisticsStore
 from api_monitor.models.statistics import APIStatistics
 from api_monitor.notifications.base import BaseNotifier
-from api_monitor.utils.logger import setup_logger
+from api_monitor.storage.result_log import ResultLogWriter
+from api_monitor.storage.timeseries import TimeSeriesStore
+from api_monitor.utils.body_inspector import BodyInspector
+from api_monitor.utils.http_pool import DNSLookupError, HTTPSessionPool, get_http_pool
+from api_monitor.utils.logger import SAMPLED, LazyStr, check_log_enabled, setup_logger
 
 logger = setup_logger('monitor')
 
@@ -20,48 +29,88 @@ class AlertType:
 
 class APIMonitor:
     """API监控核心类"""
-    def __init__(self, apis: List[Dict], notifier: BaseNotifier):
+    def __init__(self, apis: List[Dict], notifier: BaseNotifier, check_engine=None,
+                 http_pool: Optional[HTTPSessionPool] = None,
+                 statistics_backend: str = 'object',
+                 timeseries_store: Optional[TimeSeriesStore] = None,
+                 cluster: Optional[ClusterCoordinator] = None,
+                 result_log: Optional[ResultLogWriter] = None,
+                 clock: Optional[Callable[[], float]] = None,
+                 self_metrics: Optional[SelfMetrics] = None,
+                 adaptive_interval: Optional[AdaptiveIntervalPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
         self.apis = apis
         self.notifier = notifier
+        self.check_engine = check_engine  # 可选的并发检查引擎（如AsyncCheckEngine）
+        self.http_pool = http_pool or get_http_pool()
+        self.statistics_backend = statistics_backend  # object: 每个API一个APIStatistics; columnar: 列式存储
+        self.stats_stores: Dict[int, ColumnarStatisticsStore] = {}
+        self.timeseries_store = timeseries_store  # 可选的检查结果持久化存储
+        self.cluster = cluster  # 集群模式下只检查本节点持有租约的端点
+        self.result_log = result_log  # 可选的结构化检查结果日志
+        self.clock = clock or time.time  # 告警冷却使用的时钟，回放时可替换为虚拟时钟
+        self.self_metrics = self_metrics  # 可选的自身运行指标，每个周期发布一次快照
+        self.adaptive_interval = adaptive_interval  # 可选的自适应检查间隔策略
+        self.circuit_breaker = circuit_breaker  # 可选的按主机熔断器
         self.api_stats = {}
+        self.last_results: Dict[str, APIResponse] = {}  # url -> 最近一次检查结果
         self.initialize_statistics()
 
     def initialize_statistics(self):
         """初始化统计数据"""
         for api in self.apis:
-            self.api_stats[api['url']] = APIStatistics(
-                window_size=api.get('statistics_window', 60)
-            )
-
-    def calculate_statistics(self, api_url: str) -> Dict:
-        """计算API的统计指标"""
-        stats = self.api_stats[api_url]
-        stats.update_window_stats()
-        
-        if not stats.response_times:
-            return {}
+            window_size = api.get('statistics_window', 60)
+            if self.statistics_backend == 'columnar':
+                # 窗口大小相同的端点共用一个列式存储
+                if window_size not in self.stats_stores:
+                    self.stats_stores[window_size] = ColumnarStatisticsStore(
+                        window_size, capacity=len(self.apis)
+                    )
+                self.api_stats[api['url']] = ColumnarEndpointStatistics(
+                    self.stats_stores[window_size], api['url'],
+                    success_threshold=api.get('success_rate_threshold', 95),
+                    availability_threshold=api.get('availability_threshold', 98)
+                )
+            else:
+                self.api_stats[api['url']] = APIStatistics(window_size=window_size)
 
-        response_times = list(stats.response_times)
-        window_duration = len(response_times) * 30 / 60  # 转换为分钟
-        
+    def fleet_summary(self) -> Optional[Dict]:
+        """计算所有端点的聚合指标（仅列式存储支持，一次向量化计算）"""
+        if not self.stats_stores:
+            return None
+        summaries = [store.fleet_summary() for store in self.stats_stores.values()]
+        if len(summaries) == 1:
+            return summaries[0]
+        samples = sum(s['sample_count'] for s in summaries)
         return {
-            'avg_response_time': sum(response_times) / len(response_times),
-            'max_response_time': max(response_times),
-            'min_response_time': min(response_times),
-            'success_rate': (stats.window_successful_requests / 
-                           stats.window_total_requests * 100 if 
-                           stats.window_total_requests > 0 else 0),
-            'availability': (stats.window_available_requests / 
-                           stats.window_total_requests * 100 if 
-                           stats.window_total_requests > 0 else 0),
-            'request_count': stats.window_total_requests,
-            'window_duration_minutes': window_duration
+            'endpoint_count': sum(s['endpoint_count'] for s in summaries),
+            'sample_count': samples,
+            'success_rate': (sum(s['success_rate'] * s['sample_count'] for s in summaries)
+                             / samples if samples else 0),
+            'availability': (sum(s['availability'] * s['sample_count'] for s in summaries)
+                             / samples if samples else 0),
+            'avg_response_time': (sum(s['avg_response_time'] * s['sample_count'] for s in summaries)
+                                  / samples if samples else 0),
+            'max_response_time': max((s['max_response_time'] for s in summaries
+                                      if s['max_response_time'] is not None), default=None),
+            'endpoints_below_success_threshold': sum(
+                s['endpoints_below_success_threshold'] for s in summaries),
+            'endpoints_below_availability_threshold': sum(
+                s['endpoints_below_availability_threshold'] for s in summaries)
         }
 
+    def owns_endpoint(self, api_url: str) -> bool:
+        """本节点是否负责该端点（非集群模式下负责全部端点）"""
+        return self.cluster is None or self.cluster.owns(api_url)
+
+    def calculate_statistics(self, api_url: str) -> Dict:
+        """计算API的统计指标（由APIStatistics增量维护并缓存）"""
+        return self.api_stats[api_url].get_window_stats()
+
     def can_send_alert(self, api_url: str, alert_type: str) -> bool:
         """检查是否可以发送告警（基于冷却时间）"""
         stats = self.api_stats[api_url]
-        current_time = time.time()
+        current_time = self.clock()
         cooldown_seconds = 5 * 60  # 5分钟冷却时间
         
         if current_time - stats.last_alert_time[alert_type] >= cooldown_seconds:
@@ -72,10 +121,12 @@ class APIMonitor:
     def send_alert(self, api_config: dict, alert_type: str, content: str,
                 response_time: Optional[float] = None,
                 status_code: Optional[int] = None,
-                stats: Optional[dict] = None):
-        """发送告警"""
+                stats: Optional[dict] = None,
+                phase_timings: Optional[dict] = None,
+                cooldown_key: Optional[str] = None):
+        """发送告警（cooldown_key默认为告警类型，同一键共用冷却时间）"""
         try:
-            if not self.can_send_alert(api_config['url'], alert_type):
+            if not self.can_send_alert(api_config['url'], cooldown_key or alert_type):
                 logger.info(f"Alert suppressed for {api_config['name']} due to cooldown")
                 return
 
@@ -86,7 +137,8 @@ class APIMonitor:
                 response_time=response_time,
                 status_code=status_code,
                 stats=stats,
-                url=api_config['url']  # 添加 URL
+                url=api_config['url'],  # 添加 URL
+                phase_timings=phase_timings
             )
 
         except Exception as e:
@@ -106,20 +158,20 @@ class APIMonitor:
         except Exception as e:
             logger.error(f"Error sending recovery alert for {api_config['name']}: {str(e)}")
 
-    def _check_status_code(self, api_config: dict, response: requests.Response,
+    def _check_status_code(self, api_config: dict, status_code: int,
                           response_time: float, stats: APIStatistics):
         """检查状态码"""
         current_stats = self.calculate_statistics(api_config['url'])
         
-        if response.status_code != 200:
+        if status_code != 200:
             stats.error_counts['status_code'] += 1
             if stats.error_counts['status_code'] >= 10:  # 连续10次触发告警
                 self.send_alert(
                     api_config,
-                    AlertType.ERROR if response.status_code >= 500 else AlertType.WARNING,
-                    f"API returned non-200 status code ({response.status_code}) for 10 consecutive checks",
+                    AlertType.ERROR if status_code >= 500 else AlertType.WARNING,
+                    f"API returned non-200 status code ({status_code}) for 10 consecutive checks",
                     response_time=response_time,
-                    status_code=response.status_code,
+                    status_code=status_code,
                     stats=current_stats
                 )
         else:
@@ -132,83 +184,333 @@ class APIMonitor:
             stats.error_counts['status_code'] = 0
             stats.successful_requests += 1
 
+    @staticmethod
+    def _describe_slowest_phase(phase_timings: Optional[dict], current_stats: Dict) -> str:
+        """描述本次检查中耗时最长的阶段及其窗口分位数"""
+        measured = [(phase, phase_timings[phase]) for phase in TIMING_PHASES
+                    if phase_timings and phase_timings.get(phase) is not None]
+        if not measured:
+            return ""
+        phase, value = max(measured, key=lambda item: item[1])
+        p50 = current_stats.get(f'{phase}_p50_time') or 0.0
+        p95 = current_stats.get(f'{phase}_p95_time') or 0.0
+        return (f"Slowest phase: {PHASE_LABELS[phase]} {value * 1000:.0f}ms "
+                f"(window p50 {p50 * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms)")
+
+    def _phase_suffix(self, phase_timings: Optional[dict], current_stats: Dict) -> str:
+        description = self._describe_slowest_phase(phase_timings, current_stats)
+        return f". {description}" if description else ""
+
     def _check_response_time(self, api_config: dict, response_time: float,
-                           stats: APIStatistics):
-        """检查响应时间"""
+                           stats: APIStatistics, phase_timings: Optional[dict] = None):
+        """检查响应时间（配置了response_time_percentile时比较窗口分位数）"""
         current_stats = self.calculate_statistics(api_config['url'])
+        percentile = api_config.get('response_time_percentile')
+        measured = response_time
+        label = "Response time"
+        if percentile and current_stats.get(f'{percentile}_response_time') is not None:
+            measured = current_stats[f'{percentile}_response_time']
+            label = f"{percentile.upper()} response time"
         
-        if response_time > api_config['critical_response_time']:
+        if measured > api_config['critical_response_time']:
             stats.error_counts['response_time'] += 1
             if stats.error_counts['response_time'] >= 10:
                 self.send_alert(
                     api_config,
                     AlertType.ERROR,
-                    f"Response time ({response_time:.3f}s) exceeded critical threshold "
-                    f"({api_config['critical_response_time']}s) for 10 consecutive checks",
+                    f"{label} ({measured:.3f}s) exceeded critical threshold "
+                    f"({api_config['critical_response_time']}s) for 10 consecutive checks"
+                    + self._phase_suffix(phase_timings, current_stats),
                     response_time=response_time,
-                    stats=current_stats
+                    stats=current_stats,
+                    phase_timings=phase_timings
                 )
-        elif response_time > api_config['warning_response_time']:
+        elif measured > api_config['warning_response_time']:
             stats.error_counts['response_time'] += 1
             if stats.error_counts['response_time'] >= 10:
                 self.send_alert(
                     api_config,
                     AlertType.WARNING,
-                    f"Response time ({response_time:.3f}s) exceeded warning threshold "
-                    f"({api_config['warning_response_time']}s) for 10 consecutive checks",
+                    f"{label} ({measured:.3f}s) exceeded warning threshold "
+                    f"({api_config['warning_response_time']}s) for 10 consecutive checks"
+                    + self._phase_suffix(phase_timings, current_stats),
                     response_time=response_time,
-                    stats=current_stats
+                    stats=current_stats,
+                    phase_timings=phase_timings
                 )
         else:
             if stats.error_counts['response_time'] >= 10:
                 self.send_recovery_alert(
                     api_config,
                     'response_time',
-                    f"Response time has returned to normal: {response_time:.3f}s"
+                    f"{label} has returned to normal: {measured:.3f}s"
                 )
             stats.error_counts['response_time'] = 0
 
-    def check_api(self, api_config: dict):
-        """检查单个API状态"""
-        logger.info(f"Checking API: {api_config['name']} - {api_config['url']}")
-        start_time = time.time()
-        stats = self.api_stats[api_config['url']]
+    def check_api(self, api_config: dict,
+                  deadline: Optional[float] = None) -> Optional[APIResponse]:
+        """检查单个API状态，deadline为time.monotonic()时间点，返回检查结果"""
+        if not self.owns_endpoint(api_config['url']):
+            return None
+        result = self._circuit_open_result(api_config)
+        if result is None:
+            result = self.probe(api_config) if deadline is None \
+                else self._probe_before_deadline(api_config, deadline)
+        self.process_response(api_config, result)
+        return result
+
+    def _probe_before_deadline(self, api_config: dict, deadline: float) -> APIResponse:
+        """在截止时间前完成探测：剩余时间不足时缩短超时，因此超时的检查记为被截止时间取消"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return APIResponse.deadline_exceeded(0.0)
+        if remaining >= api_config['timeout']:
+            return self.probe(api_config)
+        result = self.probe(dict(api_config, timeout=remaining))
+        if result.error_type == ErrorType.TIMEOUT:
+            return APIResponse.deadline_exceeded(result.response_time)
+        return result
+
+    def _circuit_open_result(self, api_config: dict) -> Optional[APIResponse]:
+        """主机熔断期间返回快速失败的检查结果，需要执行完整检查时返回None"""
+        if self.circuit_breaker is None:
+            return None
+        start_time = time.perf_counter()
+        reason, half_open = self.circuit_breaker.before_check(api_config['url'])
+        return self._breaker_decision_result(api_config, reason, half_open,
+                                             time.perf_counter() - start_time)
+
+    def _circuit_open_results(self, apis: List[Dict]) -> Dict[str, APIResponse]:
+        """批量判断熔断（到期的TCP探测并发执行），返回熔断主机上端点的快速失败结果"""
+        if self.circuit_breaker is None:
+            return {}
+        start_time = time.perf_counter()
+        decisions = self.circuit_breaker.before_checks([api['url'] for api in apis])
+        elapsed = time.perf_counter() - start_time
+        results = {}
+        for api_config in apis:
+            reason, half_open = decisions[api_config['url']]
+            result = self._breaker_decision_result(api_config, reason, half_open, elapsed)
+            if result is not None:
+                results[api_config['url']] = result
+        return results
+
+    def _breaker_decision_result(self, api_config: dict, reason: Optional[str],
+                                 half_open: bool, elapsed: float) -> Optional[APIResponse]:
+        if half_open:
+            self._sync_breaker_state(api_config['url'])
+            logger.info(f"TCP probe succeeded, circuit for {api_config['name']} is half-open, "
+                        f"running a full check")
+        if reason is None:
+            return None
+        return APIResponse(
+            status_code=None,
+            response_time=elapsed,
+            timestamp=datetime.now(),
+            error=reason,
+            error_type=ErrorType.CIRCUIT_OPEN
+        )
+
+    def probe(self, api_config: dict) -> APIResponse:
+        """发起一次检查请求并返回结果，不更新统计也不告警"""
+        if check_log_enabled(logger):
+            logger.info("Checking API: %s - %s", api_config['name'], api_config['url'],
+                        extra=SAMPLED)
+        start_time = time.perf_counter()
 
         try:
-            response = requests.request(
+            response, reused = self.http_pool.request(
                 method=api_config['method'],
                 url=api_config['url'],
+                inspector=BodyInspector.from_api_config(api_config),
                 headers=api_config['headers'],
                 timeout=api_config['timeout']
             )
-            
-            response_time = time.time() - start_time
-            stats.add_response(response_time, response.status_code)
+            # 断言只针对200响应，其他状态码按状态码告警处理
+            body_error = getattr(response, 'body_error', None) \
+                if response.status_code == 200 else None
+            result = APIResponse(
+                status_code=response.status_code,
+                response_time=time.perf_counter() - start_time,
+                timestamp=datetime.now(),
+                error=body_error,
+                success=response.status_code == 200 and body_error is None,
+                error_type=ErrorType.ASSERTION if body_error is not None else None,
+                connection_reused=reused,
+                phase_timings=getattr(response, 'phase_timings', None),
+                body_bytes=getattr(response, 'body_bytes', None)
+            )
+        except DNSLookupError as e:
+            result = self._error_response(ErrorType.DNS, e, start_time)
+        except requests.Timeout as e:
+            result = self._error_response(ErrorType.TIMEOUT, e, start_time)
+        except requests.RequestException as e:
+            result = self._error_response(ErrorType.REQUEST, e, start_time)
+        except Exception as e:
+            result = self._error_response(ErrorType.UNEXPECTED, e, start_time)
+        return result
+
+    def _error_response(self, error_type: str, error: Exception, start_time: float) -> APIResponse:
+        """构建失败的检查结果"""
+        return APIResponse(
+            status_code=None,
+            response_time=time.perf_counter() - start_time,
+            timestamp=datetime.now(),
+            error=str(error),
+            error_type=error_type
+        )
+
+    def process_response(self, api_config: dict, result: APIResponse):
+        """将一次检查结果写入统计并执行告警判断"""
+        if not self.owns_endpoint(api_config['url']):
+            return  # 租约已转移，结果和告警归新的持有节点
+        stats = self.api_stats[api_config['url']]
+        # 被周期截止时间取消的检查没有端点的结果，不更新最近结果、检查间隔、熔断状态和时序存储
+        cancelled = result.error_type == ErrorType.DEADLINE
+        if not cancelled:
+            self.last_results[api_config['url']] = result
+        if self.adaptive_interval is not None and not cancelled:
+            # 在写入样本前更新，使随后计算的窗口统计包含新间隔
+            self._adapt_interval(api_config, result, stats)
+        if self.circuit_breaker is not None and not cancelled:
+            transition = self.circuit_breaker.record(api_config['url'], result)
+            stats.breaker_state = self.circuit_breaker.state(api_config['url'])
+            if transition is not None:
+                self._sync_breaker_state(api_config['url'])
+                self._report_breaker_transition(api_config, result, transition)
+        if self.timeseries_store is not None and not cancelled:
+            try:
+                self.timeseries_store.append(
+                    result.timestamp.timestamp(),
+                    api_config['url'],
+                    result.status_code,
+                    result.response_time,
+                    result.error_type
+                )
+            except Exception as e:
+                logger.error(f"Failed to persist check result for {api_config['name']}: {str(e)}")
+
+        try:
+            if cancelled:
+                self._handle_deadline_exceeded(api_config, result)
+                return
+            if result.error_type == ErrorType.TIMEOUT:
+                self._handle_timeout_error(api_config, result.response_time, stats)
+                return
+            if result.error_type == ErrorType.REQUEST:
+                self._handle_request_error(api_config, result.error, result.response_time, stats)
+                return
+            if result.error_type == ErrorType.CIRCUIT_OPEN:
+                self._handle_circuit_open(api_config, result, stats)
+                return
+            if result.error_type == ErrorType.DNS:
+                self._handle_dns_error(api_config, result.error, result.response_time, stats)
+                return
+            if result.error_type == ErrorType.ASSERTION:
+                self._handle_assertion_error(api_config, result, stats)
+                return
+            if result.error_type is not None:
+                self._handle_unexpected_error(api_config, result.error, result.response_time, stats)
+                return
+
+            response_time = result.response_time
+            stats.add_response(response_time, result.status_code, result.connection_reused,
+                               result.phase_timings)
+
+            self._check_status_code(api_config, result.status_code, response_time, stats)
+            self._check_response_time(api_config, response_time, stats, result.phase_timings)
 
-            self._check_status_code(api_config, response, response_time, stats)
-            self._check_response_time(api_config, response_time, stats)
+            # 记录检查结果（参数延迟格式化，并受逐次检查日志抽样限制）
+            if check_log_enabled(logger):
+                current_stats = self.calculate_statistics(api_config['url'])
+                connection = {True: 'warm', False: 'cold'}.get(result.connection_reused, 'unknown')
+                logger.info(
+                    "API check completed for %s - Status: %s, Response Time: %.3fs (%s), "
+                    "Avg Response Time: %.3fs, P95: %.3fs, Success Rate: %.1f%%, "
+                    "Availability: %.1f%%%s%s%s",
+                    api_config['name'], result.status_code, response_time, connection,
+                    current_stats.get('avg_response_time', 0),
+                    current_stats.get('p95_response_time') or 0,
+                    current_stats.get('success_rate', 0),
+                    current_stats.get('availability', 0),
+                    f", Interval: {stats.check_interval:g}s" if stats.check_interval else "",
+                    f", Body: {result.body_bytes}B" if result.body_bytes else "",
+                    LazyStr(self._format_phases, result.phase_timings),
+                    extra={
+                        'sampled': True,
+                        'fields': {
+                            'event': 'check_completed',
+                            'api': api_config['name'],
+                            'url': api_config['url'],
+                            'status': result.status_code,
+                            'response_time': response_time,
+                            'connection': connection,
+                            'check_interval': stats.check_interval,
+                            'body_bytes': result.body_bytes,
+                            'phases': result.phase_timings
+                        }
+                    }
+                )
+
+        except Exception as e:
+            self._handle_unexpected_error(api_config, str(e), result.response_time, stats)
+        finally:
+            if self.result_log is not None:
+                self._write_result_log(api_config, result)
 
-            # 记录检查结果
-            current_stats = self.calculate_statistics(api_config['url'])
+    def _adapt_interval(self, api_config: dict, result: APIResponse, stats: APIStatistics):
+        """按本次检查结果调整端点的检查间隔"""
+        previous, interval = self.adaptive_interval.update(api_config, stats, result)
+        if interval < previous:
+            logger.warning(
+                f"Check interval for {api_config['name']} tightened "
+                f"from {previous:g}s to {interval:g}s after an unhealthy check"
+            )
+        elif interval > previous:
             logger.info(
-                f"API check completed for {api_config['name']} - "
-                f"Status: {response.status_code}, "
-                f"Response Time: {response_time:.3f}s, "
-                f"Avg Response Time: {current_stats.get('avg_response_time', 0):.3f}s, "
-                f"Success Rate: {current_stats.get('success_rate', 0):.1f}%, "
-                f"Availability: {current_stats.get('availability', 0):.1f}%"
+                f"Check interval for {api_config['name']} relaxed from {previous:g}s "
+                f"to {interval:g}s after {stats.healthy_streak} healthy checks"
             )
 
-        except requests.Timeout:
-            self._handle_timeout_error(api_config, start_time, stats)
-        except requests.RequestException as e:
-            self._handle_request_error(api_config, e, start_time, stats)
+    def check_interval(self, api_config: dict) -> Optional[float]:
+        """端点当前的检查间隔（未启用自适应调度时为None）"""
+        if self.adaptive_interval is None:
+            return None
+        return (self.api_stats[api_config['url']].check_interval
+                or self.adaptive_interval.base_interval(api_config))
+
+    def _write_result_log(self, api_config: dict, result: APIResponse):
+        """写入一条结构化检查结果（含当前窗口统计快照）"""
+        try:
+            self.result_log.write({
+                'ts': result.timestamp.timestamp(),
+                'endpoint': api_config['url'],
+                'name': api_config['name'],
+                'status': result.status_code,
+                'response_time': result.response_time,
+                'error_class': result.error_type,
+                'error': result.error,
+                'connection_reused': result.connection_reused,
+                'phases': result.phase_timings,
+                'body_bytes': result.body_bytes,
+                'stats': self.calculate_statistics(api_config['url'])
+            })
         except Exception as e:
-            self._handle_unexpected_error(api_config, e, start_time, stats)
+            logger.error(f"Failed to write result log for {api_config['name']}: {str(e)}")
+
+    @staticmethod
+    def _format_phases(phase_timings: Optional[dict]) -> str:
+        """格式化日志中的阶段耗时，未测量的阶段显示为-"""
+        if not phase_timings:
+            return ""
+        parts = []
+        for phase in TIMING_PHASES:
+            value = phase_timings.get(phase)
+            parts.append(f"{phase}={value * 1000:.0f}ms" if value is not None else f"{phase}=-")
+        return ", Phases: " + " ".join(parts)
 
-    def _handle_timeout_error(self, api_config: dict, start_time: float, stats: APIStatistics):
+    def _handle_timeout_error(self, api_config: dict, error_time: float, stats: APIStatistics):
         """处理超时错误"""
-        error_time = time.time() - start_time
         stats.add_response(error_time, None)
         
         current_stats = self.calculate_statistics(api_config['url'])
@@ -220,44 +522,195 @@ class APIMonitor:
             stats=current_stats
         )
 
-    def _handle_request_error(self, api_config: dict, error: requests.RequestException,
-                            start_time: float, stats: APIStatistics):
+    def _handle_request_error(self, api_config: dict, error: str,
+                            error_time: float, stats: APIStatistics):
         """处理请求错误"""
-        error_time = time.time() - start_time
         stats.add_response(error_time, None)
         
         current_stats = self.calculate_statistics(api_config['url'])
         self.send_alert(
             api_config,
             AlertType.ERROR,
-            f"API request failed: {str(error)}",
+            f"API request failed: {error}",
             response_time=error_time,
             stats=current_stats
         )
 
-    def _handle_unexpected_error(self, api_config: dict, error: Exception,
-                                start_time: float, stats: APIStatistics):
+    def _sync_breaker_state(self, url: str):
+        """熔断状态转换后同步同一主机上所有端点的统计"""
+        host = CircuitBreaker.host_key(url)
+        state = self.circuit_breaker.state(url)
+        for api in self.apis:
+            if CircuitBreaker.host_key(api['url']) == host and api['url'] in self.api_stats:
+                self.api_stats[api['url']].breaker_state = state
+
+    def _report_breaker_transition(self, api_config: dict, result: APIResponse,
+                                   transition: tuple):
+        """熔断状态转换时告警或通知恢复"""
+        previous, state = transition
+        host, port = CircuitBreaker.host_key(api_config['url'])
+        if state == BreakerState.OPEN and previous == BreakerState.CLOSED:
+            self.send_alert(
+                api_config,
+                AlertType.ERROR,
+                f"Circuit breaker opened for {host}:{port} after "
+                f"{self.circuit_breaker.failures(api_config['url'])} consecutive failures "
+                f"({result.error}). Full checks are skipped and the host is probed over TCP "
+                f"every {self.circuit_breaker.probe_interval:g}s",
+                response_time=result.response_time,
+                stats=self.calculate_statistics(api_config['url']),
+                cooldown_key='circuit_open'
+            )
+        elif state == BreakerState.OPEN:
+            logger.warning(f"Full check for {api_config['name']} failed while half-open, "
+                           f"circuit for {host}:{port} opened again: {result.error}")
+        elif state == BreakerState.CLOSED:
+            logger.info(f"Circuit for {host}:{port} closed after a successful check of "
+                        f"{api_config['name']}")
+            self.send_recovery_alert(
+                api_config,
+                'circuit',
+                f"Host {host}:{port} is reachable again, circuit breaker closed"
+            )
+
+    def _handle_circuit_open(self, api_config: dict, result: APIResponse,
+                             stats: APIStatistics):
+        """处理熔断期间的快速失败：计入不可用，不再逐次告警"""
+        stats.add_response(result.response_time, None)
+        if check_log_enabled(logger):
+            logger.info("Check for %s failed fast: %s", api_config['name'], result.error,
+                        extra=SAMPLED)
+
+    def _handle_deadline_exceeded(self, api_config: dict, result: APIResponse):
+        """处理被周期截止时间取消的检查：是监控自身容量不足，不计入端点统计窗口，也不告警"""
+        if check_log_enabled(logger):
+            logger.info("Check for %s did not finish before the cycle deadline: %s",
+                        api_config['name'], result.error, extra=SAMPLED)
+
+    def _handle_dns_error(self, api_config: dict, error: str,
+                          error_time: float, stats: APIStatistics):
+        """处理DNS解析失败或超时"""
+        stats.add_response(error_time, None)
+
+        current_stats = self.calculate_statistics(api_config['url'])
+        self.send_alert(
+            api_config,
+            AlertType.ERROR,
+            f"DNS resolution failed: {error}",
+            response_time=error_time,
+            stats=current_stats
+        )
+
+    def _handle_assertion_error(self, api_config: dict, result: APIResponse,
+                                stats: APIStatistics):
+        """处理响应体断言失败（端点可用，但内容不符合预期，计为不成功）"""
+        stats.add_response(result.response_time, result.status_code, result.connection_reused,
+                           result.phase_timings, success=False)
+
+        current_stats = self.calculate_statistics(api_config['url'])
+        self.send_alert(
+            api_config,
+            AlertType.ERROR,
+            f"Response body assertion failed: {result.error}",
+            response_time=result.response_time,
+            status_code=result.status_code,
+            stats=current_stats
+        )
+
+    def _handle_unexpected_error(self, api_config: dict, error: str,
+                                error_time: float, stats: APIStatistics):
         """处理意外错误"""
-        error_time = time.time() - start_time
         stats.add_response(error_time, None)
         
         current_stats = self.calculate_statistics(api_config['url'])
         self.send_alert(
             api_config,
             AlertType.ERROR,
-            f"Unexpected error: {str(error)}",
+            f"Unexpected error: {error}",
             response_time=error_time,
             stats=current_stats
         )
     
 
-    def check_all_apis(self):
-        """检查所有配置的API"""
+    def check_all_apis(self, deadline: Optional[float] = None):
+        """检查所有配置的API
+
+        deadline为time.monotonic()时间点：到期仍在进行的检查被取消，尚未开始的检查不再发起，
+        两者都记为ErrorType.DEADLINE，并计为一次周期超限。
+        """
         logger.info("=== Starting API check cycle ===")
-        for api_config in self.apis:
+        cycle_start = time.perf_counter()
+        apis = [api for api in self.apis if self.owns_endpoint(api['url'])]
+        if len(apis) != len(self.apis):
+            logger.info(f"Checking {len(apis)} of {len(self.apis)} APIs owned by this node")
+        if self.check_engine is not None:
+            exceeded = self._check_all_concurrently(apis, deadline)
+        else:
+            exceeded = 0
+            fast_failed = self._circuit_open_results(apis)
+            for api_config in apis:
+                try:
+                    result = fast_failed.get(api_config['url'])
+                    if result is not None:
+                        self.process_response(api_config, result)
+                        continue
+                    result = self.check_api(api_config, deadline)
+                    if result is not None and result.error_type == ErrorType.DEADLINE:
+                        exceeded += 1
+                except Exception as e:
+                    logger.error(f"Failed to check API {api_config['name']}: {str(e)}", 
+                               exc_info=True)
+        self.log_fleet_summary()
+        duration = time.perf_counter() - cycle_start
+        overrun = deadline is not None and (exceeded > 0 or time.monotonic() > deadline)
+        if overrun:
+            logger.warning(
+                f"Check cycle exceeded its deadline after {duration:.3f}s: "
+                f"{exceeded} of {len(apis)} checks cancelled or not started"
+            )
+        if self.self_metrics is not None:
+            self.self_metrics.observe_cycle(duration, overrun, exceeded)
+            self.publish_metrics()
+        logger.info("=== API check cycle completed ===")
+
+    def publish_metrics(self):
+        """发布自身运行指标快照"""
+        if self.self_metrics is None:
+            return
+        try:
+            self.self_metrics.publish(self)
+        except Exception as e:
+            logger.error(f"Failed to publish self metrics: {str(e)}", exc_info=True)
+
+    def log_fleet_summary(self):
+        """记录所有端点的聚合指标（仅列式存储）"""
+        summary = self.fleet_summary()
+        if summary and summary['sample_count']:
+            logger.info(
+                f"Fleet summary - Endpoints: {summary['endpoint_count']}, "
+                f"Success Rate: {summary['success_rate']:.1f}%, "
+                f"Availability: {summary['availability']:.1f}%, "
+                f"Avg Response Time: {summary['avg_response_time']:.3f}s, "
+                f"Below Success Threshold: {summary['endpoints_below_success_threshold']}, "
+                f"Below Availability Threshold: {summary['endpoints_below_availability_threshold']}"
+            )
+
+    def _check_all_concurrently(self, apis: List[Dict], deadline: Optional[float] = None) -> int:
+        """通过并发引擎同时检查所有API，再依次处理结果（熔断主机上的端点不发起请求），
+        返回被截止时间取消的检查数"""
+        start_time = time.time()
+        fast_failed = self._circuit_open_results(apis)
+        probed = iter(self.check_engine.run(
+            [api for api in apis if api['url'] not in fast_failed], deadline))
+        results = [fast_failed.get(api['url']) or next(probed) for api in apis]
+        logger.info(
+            f"Concurrent checks finished for {len(apis)} APIs "
+            f"in {time.time() - start_time:.3f}s"
+        )
+        for api_config, result in zip(apis, results):
             try:
-                self.check_api(api_config)
+                self.process_response(api_config, result)
             except Exception as e:
                 logger.error(f"Failed to check API {api_config['name']}: {str(e)}", 
                            exc_info=True)
-        logger.info("=== API check cycle completed ===")
\ No newline at end of file
+        return sum(1 for result in results if result.error_type == ErrorType.DEADLINE)
@@ -1,29 +1,277 @@
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
 from apscheduler.schedulers.blocking import BlockingScheduler
 from api_monitor.core.monitor import APIMonitor
+from api_monitor.core.timing_wheel import HierarchicalTimingWheel, TimerEntry
 from api_monitor.utils.logger import setup_logger
 
 logger = setup_logger('scheduler')
 
 class MonitorScheduler:
-    """监控调度器"""
-    def __init__(self, monitor: APIMonitor, interval_seconds: int):
+    """监控调度器
+
+    interval模式下每个周期有时间预算（检查间隔乘以cycle_budget），到期仍未完成的检查被取消，
+    使周期在下一次计划运行前结束；仍因超时被APScheduler跳过的运行会被计数并记录警告。
+    自适应检查间隔需要按端点调度，只能与wheel模式一起使用。
+    """
+    def __init__(self, monitor: APIMonitor, interval_seconds: int,
+                 mode: str = 'interval', wheel_config: Optional[Dict] = None,
+                 cycle_budget: float = 0.9):
+        if monitor.adaptive_interval is not None and mode != 'wheel':
+            raise ValueError(
+                f"Adaptive check intervals require the 'wheel' scheduler, got '{mode}': "
+                f"a fixed interval cycle cannot check tightened endpoints any sooner"
+            )
         self.monitor = monitor
         self.interval = interval_seconds
+        self.mode = mode  # interval: 单个APScheduler任务; wheel: 按端点错峰的时间轮
+        self.wheel_config = wheel_config or {}
+        self.cycle_budget = cycle_budget  # 周期时间预算占检查间隔的比例，0为不限制
+        self.skipped_runs = 0
         self.scheduler = BlockingScheduler()
+        self.wheel_scheduler: Optional[WheelScheduler] = None
+        self._next_due: Optional[float] = None
 
     def start(self):
         """启动调度器"""
         try:
+            if self.mode == 'wheel':
+                self.wheel_scheduler = WheelScheduler(
+                    monitor=self.monitor,
+                    default_interval=self.interval,
+                    **self.wheel_config
+                )
+                self.wheel_scheduler.run()
+                return
+
             logger.info(f"Starting scheduler with {self.interval}s interval")
+            self.scheduler.add_listener(self._on_run_skipped,
+                                        EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
             self.scheduler.add_job(
-                self.monitor.check_all_apis,
+                self._run_cycle,
                 'interval',
                 seconds=self.interval
             )
-            self.monitor.check_all_apis()  # 立即执行一次
+            self._run_cycle()  # 立即执行一次
             self.scheduler.start()
         except (KeyboardInterrupt, SystemExit):
             logger.info("Scheduler stopped by user")
         except Exception as e:
             logger.error(f"Scheduler error: {str(e)}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
+
+    def _run_cycle(self):
+        """执行一个检查周期，并记录实际开始时间相对计划时间的滞后"""
+        now = time.time()
+        if self._next_due is None:
+            self._next_due = now
+        # 上一个周期超时导致跳过的计划时间不计入滞后
+        while self._next_due + self.interval <= now:
+            self._next_due += self.interval
+        if self.monitor.self_metrics is not None:
+            self.monitor.self_metrics.observe_lag(now - self._next_due)
+        self._next_due += self.interval
+        deadline = None
+        if self.cycle_budget:
+            deadline = time.monotonic() + self.interval * self.cycle_budget
+        self.monitor.check_all_apis(deadline)
+
+    def _on_run_skipped(self, event):
+        """APScheduler因上一周期仍在执行（或错过执行时间）而跳过运行"""
+        # 达到实例上限的事件带scheduled_run_times，错过执行时间的事件带scheduled_run_time
+        run_times = getattr(event, 'scheduled_run_times', None) or [event.scheduled_run_time]
+        for run_time in run_times:
+            self.skipped_runs += 1
+            logger.warning(f"Check cycle scheduled at {run_time} was skipped, "
+                           f"{self.skipped_runs} skipped so far")
+            if self.monitor.self_metrics is not None:
+                self.monitor.self_metrics.observe_skipped_run()
+
+@dataclass
+class EndpointSchedule:
+    """单个端点的调度状态"""
+    api_config: dict
+    interval_ticks: int
+    phase_ticks: int
+    next_tick: int = 0
+    running: bool = False
+    fired: int = 0
+    missed: int = 0
+    late: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    reported_missed: int = 0
+    reported_late: int = 0
+
+class WheelScheduler:
+    """基于分层时间轮的按端点调度器
+
+    每个API有自己的检查间隔（api_config['check_interval']，缺省为全局间隔），
+    并按URL哈希得到稳定的相位偏移，使检查均匀分布在整个周期内。
+    单个驱动线程推进时间轮，到期的检查交给线程池执行。
+    上一次检查尚未结束时到期记为missed，开始执行时滞后超过late_tolerance记为late。
+    """
+    def __init__(self, monitor: APIMonitor, default_interval: float,
+                 tick_seconds: float = 0.1, max_workers: int = 32,
+                 late_tolerance: float = 1.0, report_interval: float = 60):
+        self.monitor = monitor
+        self.default_interval = default_interval
+        self.tick_seconds = tick_seconds
+        self.late_tolerance = late_tolerance
+        self.report_interval = report_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='wheel-check')
+        self.wheel = HierarchicalTimingWheel(self._current_tick())
+        self.endpoints: Dict[str, EndpointSchedule] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        for api_config in monitor.apis:
+            self.add_endpoint(api_config)
+
+    def _current_tick(self) -> int:
+        """以epoch为基准的tick编号，使相位在重启后保持不变"""
+        return int(time.time() / self.tick_seconds)
+
+    def add_endpoint(self, api_config: dict):
+        """注册端点并安排首次检查"""
+        interval = api_config.get('check_interval', self.default_interval)
+        interval_ticks = max(1, int(round(interval / self.tick_seconds)))
+        phase_ticks = zlib.crc32(api_config['url'].encode('utf-8')) % interval_ticks
+        schedule = EndpointSchedule(api_config, interval_ticks, phase_ticks)
+        now = self.wheel.current_tick
+        schedule.next_tick = now + 1 + (phase_ticks - now - 1) % interval_ticks
+        with self._lock:
+            self.endpoints[api_config['url']] = schedule
+            self.wheel.add(TimerEntry(schedule.next_tick, schedule))
+
+    def run(self):
+        """驱动时间轮直到stop()被调用"""
+        logger.info(
+            f"Starting wheel scheduler for {len(self.endpoints)} endpoints "
+            f"(tick {self.tick_seconds}s, default interval {self.default_interval}s)"
+        )
+        last_report = time.time()
+        last_publish = time.time()
+        try:
+            while not self._stop_event.is_set():
+                target = self._current_tick()
+                with self._lock:
+                    expired = self.wheel.advance(target)
+                for entry in expired:
+                    self._dispatch(entry, target)
+
+                if time.time() - last_report >= self.report_interval:
+                    self._log_report()
+                    last_report = time.time()
+                # 按端点调度没有整体周期，按默认间隔发布指标快照
+                if time.time() - last_publish >= self.default_interval:
+                    self.monitor.publish_metrics()
+                    last_publish = time.time()
+
+                next_tick_time = (target + 1) * self.tick_seconds
+                self._stop_event.wait(max(0.0, next_tick_time - time.time()))
+        finally:
+            self.executor.shutdown(wait=False)
+
+    def stop(self):
+        """停止调度"""
+        self._stop_event.set()
+
+    def _dispatch(self, entry: TimerEntry, now_tick: int):
+        """提交到期的检查，并安排下一次"""
+        schedule: EndpointSchedule = entry.payload
+        with self._lock:
+            if entry.deadline != schedule.next_tick:
+                return  # 自适应间隔缩短后被提前替代的旧定时项
+            scheduled_tick = schedule.next_tick
+            # 驱动线程落后多个周期时，跳过的周期计为missed
+            skipped = max(0, (now_tick - scheduled_tick) // schedule.interval_ticks)
+            schedule.missed += skipped
+            scheduled_tick += skipped * schedule.interval_ticks
+            schedule.next_tick = scheduled_tick + schedule.interval_ticks
+            self.wheel.add(TimerEntry(schedule.next_tick, schedule))
+        if self.monitor.self_metrics is not None:
+            self.monitor.self_metrics.observe_lag((now_tick - scheduled_tick) * self.tick_seconds)
+
+        if schedule.running:
+            schedule.missed += 1
+            logger.warning(
+                f"Missed check for {schedule.api_config['name']}: previous check still running"
+            )
+            return
+        schedule.running = True
+        self.executor.submit(self._run_check, schedule, scheduled_tick)
+
+    def _run_check(self, schedule: EndpointSchedule, scheduled_tick: int):
+        """在线程池中执行一次检查"""
+        try:
+            lag = time.time() - scheduled_tick * self.tick_seconds
+            schedule.fired += 1
+            schedule.last_lag = lag
+            schedule.max_lag = max(schedule.max_lag, lag)
+            if lag > self.late_tolerance:
+                schedule.late += 1
+            self.monitor.check_api(schedule.api_config)
+            interval = self.monitor.check_interval(schedule.api_config)
+            if interval is not None:
+                self._apply_interval(schedule, scheduled_tick, interval)
+        except Exception as e:
+            logger.error(f"Failed to check API {schedule.api_config['name']}: {str(e)}",
+                         exc_info=True)
+        finally:
+            schedule.running = False
+
+    def _apply_interval(self, schedule: EndpointSchedule, scheduled_tick: int, interval: float):
+        """应用自适应间隔：缩短时把下一次检查提前，放宽时从下一次之后生效"""
+        interval_ticks = max(1, int(round(interval / self.tick_seconds)))
+        if interval_ticks == schedule.interval_ticks:
+            return
+        with self._lock:
+            schedule.interval_ticks = interval_ticks
+            next_tick = max(scheduled_tick + interval_ticks, self.wheel.current_tick + 1)
+            if next_tick < schedule.next_tick:
+                schedule.next_tick = next_tick
+                self.wheel.add(TimerEntry(next_tick, schedule))
+
+    def get_tick_stats(self) -> Dict[str, Dict]:
+        """获取每个端点的调度统计"""
+        return {
+            url: {
+                'interval_seconds': schedule.interval_ticks * self.tick_seconds,
+                'phase_offset_seconds': schedule.phase_ticks * self.tick_seconds,
+                'fired': schedule.fired,
+                'missed': schedule.missed,
+                'late': schedule.late,
+                'last_lag_seconds': schedule.last_lag,
+                'max_lag_seconds': schedule.max_lag
+            }
+            for url, schedule in self.endpoints.items()
+        }
+
+    def _log_report(self):
+        """输出missed/late汇总，并列出上次汇报以来新增missed/late的端点"""
+        schedules = list(self.endpoints.values())
+        logger.info(
+            f"Wheel scheduler report - endpoints: {len(schedules)}, "
+            f"missed: {sum(s.missed for s in schedules)}, "
+            f"late: {sum(s.late for s in schedules)}"
+        )
+        problems: List[EndpointSchedule] = [
+            s for s in schedules
+            if s.missed != s.reported_missed or s.late != s.reported_late
+        ]
+        for schedule in problems:
+            logger.warning(
+                f"Endpoint {schedule.api_config['name']} - "
+                f"missed: +{schedule.missed - schedule.reported_missed}, "
+                f"late: +{schedule.late - schedule.reported_late}, "
+                f"max lag: {schedule.max_lag:.3f}s"
+            )
+            schedule.reported_missed = schedule.missed
+            schedule.reported_late = schedule.late
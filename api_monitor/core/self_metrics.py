@@ -0,0 +1,375 @@
+# api_monitor/core/self_metrics.py
+import bisect
+import json
+import resource
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from api_monitor.core.circuit_breaker import BreakerState
+from api_monitor.models.api import TIMING_PHASES
+from api_monitor.models.statistics import LATENCY_PERCENTILES
+from api_monitor.utils.logger import setup_logger
+
+try:
+    import psutil
+except ImportError:  # psutil为可选依赖，缺失时用resource统计
+    psutil = None
+
+logger = setup_logger('self_metrics')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+CYCLE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# 每个端点导出的窗口响应时间统计：(stat标签, 统计键)
+RESPONSE_STATS = (('avg', 'avg_response_time'), ('max', 'max_response_time')) + tuple(
+    (name, f'{name}_response_time') for name, _ in LATENCY_PERCENTILES)
+PHASE_STATS = ('p50', 'p95')
+BREAKER_STATE_VALUES = {BreakerState.CLOSED: 0, BreakerState.HALF_OPEN: 1, BreakerState.OPEN: 2}
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+class Histogram:
+    """分桶直方图，只由检查循环所在线程写入，快照时复制计数"""
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Tuple[Tuple[int, ...], float, int]:
+        """返回(累积计数, 总和, 次数)"""
+        cumulative = []
+        total = 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return tuple(cumulative), self.sum, self.count
+
+class MetricsSnapshot:
+    """检查循环每个周期发布一次的只读快照，抓取时只读取不加锁"""
+    __slots__ = ('timestamp', 'endpoints', 'cycle', 'lag', 'cycles', 'overruns', 'skipped_runs',
+                 'deadline_exceeded', 'notifier', 'rate_limited', 'dns', 'cpu_seconds',
+                 'rss_bytes')
+
+    def __init__(self, timestamp: float, endpoints: List[Tuple[str, str, Optional[object], Dict]],
+                 cycle, lag, cycles: int, overruns: int, skipped_runs: int,
+                 deadline_exceeded: int, notifier: Optional[Dict], rate_limited: Optional[int],
+                 dns: Optional[Dict], cpu_seconds: float, rss_bytes: int):
+        self.timestamp = timestamp
+        self.endpoints = endpoints  # (name, url, 最近一次检查结果, 窗口统计)
+        self.cycle = cycle
+        self.lag = lag
+        self.cycles = cycles
+        self.overruns = overruns
+        self.skipped_runs = skipped_runs
+        self.deadline_exceeded = deadline_exceeded
+        self.notifier = notifier
+        self.rate_limited = rate_limited  # 因Webhook限流未发送的次数
+        self.dns = dns
+        self.cpu_seconds = cpu_seconds
+        self.rss_bytes = rss_bytes
+
+class SelfMetrics:
+    """监控进程自身的运行指标
+
+    检查循环在每个周期结束时调用publish()，读取各端点已缓存的窗口统计、
+    周期耗时和调度延迟直方图、通知队列状态以及进程CPU/RSS，生成不可变快照并整体替换引用。
+    抓取只读取当前快照并拼接文本，标签编码按端点缓存，不获取锁也不重新计算统计。
+    """
+    def __init__(self, dispatcher=None, cycle_buckets: Sequence[float] = CYCLE_BUCKETS,
+                 lag_buckets: Sequence[float] = LAG_BUCKETS, dns_cache=None):
+        self.dispatcher = dispatcher  # 可选的NotificationDispatcher，导出队列深度和投递计数
+        self.dns_cache = dns_cache  # 可选的DNSCache，导出缓存命中和解析失败计数
+        self.cycle_duration = Histogram(cycle_buckets)
+        self.scheduler_lag = Histogram(lag_buckets)
+        self.cycles = 0
+        self.overruns = 0  # 超过截止时间的周期数
+        self.skipped_runs = 0  # 因上一周期仍在执行而被调度器跳过的周期数
+        self.deadline_exceeded = 0  # 被截止时间取消或未开始的检查数
+        self.start_time = time.time()
+        self._process = psutil.Process() if psutil is not None else None
+        self._labels: Dict[str, str] = {}  # url -> 已编码的端点标签
+        self._snapshot: Optional[MetricsSnapshot] = None
+
+    def observe_cycle(self, duration: float, overrun: bool = False, deadline_exceeded: int = 0):
+        self.cycle_duration.observe(duration)
+        self.cycles += 1
+        self.overruns += overrun
+        self.deadline_exceeded += deadline_exceeded
+
+    def observe_skipped_run(self):
+        """由调度器线程调用，计数在下一次发布快照时导出"""
+        self.skipped_runs += 1
+
+    def observe_lag(self, lag: float):
+        self.scheduler_lag.observe(max(0.0, lag))
+
+    def _rss_bytes(self) -> int:
+        if self._process is not None:
+            return self._process.memory_info().rss
+        # 没有psutil时只能取峰值RSS（Linux上单位为KB）
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def publish(self, monitor):
+        """由检查循环调用，发布新的指标快照"""
+        endpoints = []
+        for api in monitor.apis:
+            url = api['url']
+            stats = monitor.api_stats.get(url)
+            endpoints.append((api['name'], url, monitor.last_results.get(url),
+                              stats.get_window_stats() if stats is not None else {}))
+        try:
+            notifier = self.dispatcher.get_stats() if self.dispatcher is not None else None
+            rate_limited = monitor.notifier.get_stats().get('rate_limited')
+        except Exception as e:
+            logger.error(f"Failed to read notifier stats: {str(e)}")
+            notifier = rate_limited = None
+        dns = self.dns_cache.get_stats() if self.dns_cache is not None else None
+        self._snapshot = MetricsSnapshot(
+            timestamp=time.time(),
+            endpoints=endpoints,
+            cycle=self.cycle_duration.snapshot(),
+            lag=self.scheduler_lag.snapshot(),
+            cycles=self.cycles,
+            overruns=self.overruns,
+            skipped_runs=self.skipped_runs,
+            deadline_exceeded=self.deadline_exceeded,
+            notifier=notifier,
+            rate_limited=rate_limited,
+            dns=dns,
+            cpu_seconds=time.process_time(),
+            rss_bytes=self._rss_bytes()
+        )
+
+    def _endpoint_labels(self, name: str, url: str) -> str:
+        labels = self._labels.get(url)
+        if labels is None:
+            labels = f'name="{_escape(name)}",url="{_escape(url)}"'
+            self._labels[url] = labels
+        return labels
+
+    def render(self) -> str:
+        """把当前快照编码为Prometheus文本格式"""
+        snapshot = self._snapshot
+        lines: List[str] = []
+        add = lines.append
+
+        def family(name: str, metric_type: str, help_text: str):
+            add(f'# HELP {name} {help_text}')
+            add(f'# TYPE {name} {metric_type}')
+
+        def histogram(name: str, buckets: Sequence[float], data):
+            cumulative, total, count = data
+            for bound, value in zip(buckets, cumulative):
+                add(f'{name}_bucket{{le="{bound}"}} {value}')
+            add(f'{name}_bucket{{le="+Inf"}} {cumulative[-1]}')
+            add(f'{name}_sum {_format_value(total)}')
+            add(f'{name}_count {count}')
+
+        family('process_start_time_seconds', 'gauge', 'Start time of the process since unix epoch.')
+        add(f'process_start_time_seconds {_format_value(self.start_time)}')
+        if snapshot is None:
+            return '\n'.join(lines) + '\n'
+
+        family('process_cpu_seconds_total', 'counter', 'Total user and system CPU time spent.')
+        add(f'process_cpu_seconds_total {_format_value(snapshot.cpu_seconds)}')
+        family('process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes.')
+        add(f'process_resident_memory_bytes {snapshot.rss_bytes}')
+        family('api_monitor_snapshot_timestamp_seconds', 'gauge',
+               'When the check loop last published metrics.')
+        add(f'api_monitor_snapshot_timestamp_seconds {_format_value(snapshot.timestamp)}')
+
+        family('api_monitor_check_cycles_total', 'counter', 'Completed check cycles.')
+        add(f'api_monitor_check_cycles_total {snapshot.cycles}')
+        family('api_monitor_check_cycle_duration_seconds', 'histogram',
+               'Wall time of a full check cycle.')
+        histogram('api_monitor_check_cycle_duration_seconds', self.cycle_duration.buckets,
+                  snapshot.cycle)
+        family('api_monitor_check_cycle_overruns_total', 'counter',
+               'Check cycles that reached their deadline.')
+        add(f'api_monitor_check_cycle_overruns_total {snapshot.overruns}')
+        family('api_monitor_check_cycles_skipped_total', 'counter',
+               'Scheduled check cycles skipped because the previous cycle was still running.')
+        add(f'api_monitor_check_cycles_skipped_total {snapshot.skipped_runs}')
+        family('api_monitor_checks_deadline_exceeded_total', 'counter',
+               'Checks cancelled or not started because the cycle reached its deadline.')
+        add(f'api_monitor_checks_deadline_exceeded_total {snapshot.deadline_exceeded}')
+        family('api_monitor_scheduler_lag_seconds', 'histogram',
+               'Delay between the scheduled and the actual start of a check.')
+        histogram('api_monitor_scheduler_lag_seconds', self.scheduler_lag.buckets, snapshot.lag)
+
+        if snapshot.notifier is not None:
+            notifier = snapshot.notifier
+            family('api_monitor_notifier_queue_depth', 'gauge', 'Notifications waiting for delivery.')
+            add(f'api_monitor_notifier_queue_depth {notifier["queue_depth"]}')
+            family('api_monitor_notifier_deliveries_total', 'counter',
+                   'Finished notification deliveries by outcome.')
+            for outcome in ('delivered', 'failed', 'dropped'):
+                add(f'api_monitor_notifier_deliveries_total{{outcome="{outcome}"}} {notifier[outcome]}')
+            family('api_monitor_notifier_retries_total', 'counter', 'Notification delivery retries.')
+            add(f'api_monitor_notifier_retries_total {notifier["retries"]}')
+        if snapshot.rate_limited is not None:
+            family('api_monitor_notifier_rate_limited_total', 'counter',
+                   'Webhook sends refused by the rate limiter.')
+            add(f'api_monitor_notifier_rate_limited_total {snapshot.rate_limited}')
+
+        if snapshot.dns is not None:
+            dns = snapshot.dns
+            family('api_monitor_dns_cache_lookups_total', 'counter', 'DNS cache lookups by result.')
+            for result in ('hits', 'stale_hits', 'negative_hits', 'misses', 'coalesced'):
+                add(f'api_monitor_dns_cache_lookups_total{{result="{result}"}} {dns[result]}')
+            family('api_monitor_dns_resolutions_failed_total', 'counter',
+                   'DNS resolutions that failed or exceeded the lookup timeout.')
+            for reason in ('failures', 'timeouts'):
+                add(f'api_monitor_dns_resolutions_failed_total{{reason="{reason}"}} {dns[reason]}')
+            family('api_monitor_dns_cache_entries', 'gauge', 'Host names in the DNS cache.')
+            add(f'api_monitor_dns_cache_entries {dns["entries"]}')
+
+        endpoints = [(self._endpoint_labels(name, url), result, stats)
+                     for name, url, result, stats in snapshot.endpoints]
+        family('api_monitor_endpoint_up', 'gauge', 'Whether the last check returned HTTP 200.')
+        for labels, result, _ in endpoints:
+            if result is not None:
+                add(f'api_monitor_endpoint_up{{{labels}}} {1 if result.success else 0}')
+        family('api_monitor_endpoint_last_response_seconds', 'gauge',
+               'Response time of the last check.')
+        for labels, result, _ in endpoints:
+            if result is not None:
+                add(f'api_monitor_endpoint_last_response_seconds{{{labels}}} '
+                    f'{_format_value(result.response_time)}')
+        family('api_monitor_endpoint_window_response_seconds', 'gauge',
+               'Response time statistics over the endpoint statistics window.')
+        for labels, _, stats in endpoints:
+            for stat, key in RESPONSE_STATS:
+                value = stats.get(key)
+                if value is not None:
+                    add(f'api_monitor_endpoint_window_response_seconds{{{labels},stat="{stat}"}} '
+                        f'{_format_value(value)}')
+        family('api_monitor_endpoint_window_phase_seconds', 'gauge',
+               'Request phase timings over the endpoint statistics window.')
+        for labels, _, stats in endpoints:
+            for phase in TIMING_PHASES:
+                for stat in PHASE_STATS:
+                    value = stats.get(f'{phase}_{stat}_time')
+                    if value is not None:
+                        add(f'api_monitor_endpoint_window_phase_seconds'
+                            f'{{{labels},phase="{phase}",stat="{stat}"}} {_format_value(value)}')
+        family('api_monitor_endpoint_window_success_ratio', 'gauge',
+               'Share of HTTP 200 responses in the window.')
+        for labels, _, stats in endpoints:
+            if stats:
+                add(f'api_monitor_endpoint_window_success_ratio{{{labels}}} '
+                    f'{_format_value(stats["success_rate"] / 100)}')
+        family('api_monitor_endpoint_window_availability_ratio', 'gauge',
+               'Share of checks that got any HTTP response in the window.')
+        for labels, _, stats in endpoints:
+            if stats:
+                add(f'api_monitor_endpoint_window_availability_ratio{{{labels}}} '
+                    f'{_format_value(stats["availability"] / 100)}')
+        family('api_monitor_endpoint_check_interval_seconds', 'gauge',
+               'Current adaptive check interval of the endpoint.')
+        for labels, _, stats in endpoints:
+            if stats.get('check_interval') is not None:
+                add(f'api_monitor_endpoint_check_interval_seconds{{{labels}}} '
+                    f'{_format_value(stats["check_interval"])}')
+        family('api_monitor_endpoint_circuit_state', 'gauge',
+               'Circuit breaker state of the endpoint host (0 closed, 1 half-open, 2 open).')
+        for labels, _, stats in endpoints:
+            if stats.get('breaker_state') is not None:
+                add(f'api_monitor_endpoint_circuit_state{{{labels}}} '
+                    f'{BREAKER_STATE_VALUES[stats["breaker_state"]]}')
+        family('api_monitor_endpoint_window_requests', 'gauge', 'Checks in the window.')
+        for labels, _, stats in endpoints:
+            if stats:
+                add(f'api_monitor_endpoint_window_requests{{{labels}}} {stats["request_count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def state(self) -> Dict:
+        """当前快照的JSON结构"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'published': False, 'start_time': self.start_time}
+        return {
+            'published': True,
+            'timestamp': snapshot.timestamp,
+            'start_time': self.start_time,
+            'cycles': snapshot.cycles,
+            'cycle_overruns': snapshot.overruns,
+            'skipped_cycles': snapshot.skipped_runs,
+            'checks_deadline_exceeded': snapshot.deadline_exceeded,
+            'cycle_duration': {'sum': snapshot.cycle[1], 'count': snapshot.cycle[2]},
+            'scheduler_lag': {'sum': snapshot.lag[1], 'count': snapshot.lag[2]},
+            'notifier': snapshot.notifier,
+            'notifier_rate_limited': snapshot.rate_limited,
+            'dns': snapshot.dns,
+            'process': {'cpu_seconds': snapshot.cpu_seconds, 'rss_bytes': snapshot.rss_bytes},
+            'endpoints': [{
+                'name': name,
+                'url': url,
+                'last_status': result.status_code if result is not None else None,
+                'last_response_time': result.response_time if result is not None else None,
+                'last_error': result.error if result is not None else None,
+                'stats': stats
+            } for name, url, result, stats in snapshot.endpoints]
+        }
+
+class MetricsServer:
+    """在后台线程提供/metrics（Prometheus文本）和/state（JSON）"""
+    def __init__(self, metrics: SelfMetrics, host: str = '0.0.0.0', port: int = 9108):
+        self.metrics = metrics
+        handler = self._handler_class(metrics)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _handler_class(metrics: SelfMetrics):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    self._reply(200, CONTENT_TYPE, metrics.render())
+                elif path == '/state':
+                    self._reply(200, 'application/json',
+                                json.dumps(metrics.state(), default=str))
+                elif path == '/health':
+                    self._reply(200, 'application/json', '{"status": "healthy"}')
+                else:
+                    self._reply(404, 'text/plain; charset=utf-8', 'not found\n')
+
+            def _reply(self, status: int, content_type: str, body: str):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # 抓取请求不写访问日志
+        return Handler
+
+    def start(self):
+        host, port = self.httpd.server_address[:2]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server',
+                                        daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,276 @@
+# api_monitor/core/sharding.py
+import bisect
+import hashlib
+import multiprocessing
+import time
+from datetime import datetime
+from multiprocessing.connection import Connection, wait
+from typing import Dict, List, Optional, Tuple
+
+from api_monitor.core.monitor import APIMonitor
+from api_monitor.models.api import TIMING_PHASES, APIResponse
+from api_monitor.utils.logger import setup_logger
+
+logger = setup_logger('sharding')
+
+# 工作进程发回的紧凑结果记录：
+# (url, 状态码, 响应时间, 时间戳, 错误信息, 错误类型, 是否复用连接, 各阶段耗时, 响应体字节数)
+ResultRecord = Tuple[str, Optional[int], float, float, Optional[str], Optional[str],
+                     Optional[bool], Optional[Tuple[Optional[float], ...]], Optional[int]]
+
+def encode_result(url: str, result: APIResponse) -> ResultRecord:
+    """把检查结果压缩成可跨进程传输的元组"""
+    phases = None
+    if result.phase_timings:
+        phases = tuple(result.phase_timings.get(phase) for phase in TIMING_PHASES)
+    return (url, result.status_code, result.response_time, result.timestamp.timestamp(),
+            result.error, result.error_type, result.connection_reused, phases, result.body_bytes)
+
+def decode_result(record: ResultRecord) -> APIResponse:
+    """从元组还原检查结果"""
+    (url, status_code, response_time, timestamp, error, error_type, reused, phases,
+     body_bytes) = record
+    return APIResponse(
+        status_code=status_code,
+        response_time=response_time,
+        timestamp=datetime.fromtimestamp(timestamp),
+        error=error,
+        success=status_code == 200 and error_type is None,
+        error_type=error_type,
+        connection_reused=reused,
+        phase_timings=dict(zip(TIMING_PHASES, phases)) if phases else None,
+        body_bytes=body_bytes
+    )
+
+class ConsistentHashRing:
+    """一致性哈希环：每个节点占据replicas个虚拟节点，增删节点只影响相邻区间的键"""
+    def __init__(self, replicas: int = 100):
+        self.replicas = replicas
+        self._positions: List[int] = []
+        self._owners: Dict[int, int] = {}
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def add_node(self, node: int):
+        for replica in range(self.replicas):
+            position = self._hash(f"{node}#{replica}")
+            if position not in self._owners:
+                bisect.insort(self._positions, position)
+                self._owners[position] = node
+
+    def remove_node(self, node: int):
+        for replica in range(self.replicas):
+            position = self._hash(f"{node}#{replica}")
+            if self._owners.get(position) == node:
+                del self._owners[position]
+                self._positions.pop(bisect.bisect_left(self._positions, position))
+
+    def get_node(self, key: str) -> Optional[int]:
+        """返回负责key的节点，环为空时返回None"""
+        if not self._positions:
+            return None
+        index = bisect.bisect(self._positions, self._hash(key)) % len(self._positions)
+        return self._owners[self._positions[index]]
+
+def _worker_main(shard_id: int, apis: List[Dict], conn: Connection, interval: float,
+                 engine_config: Optional[Dict]):
+    """工作进程：按周期探测分配到的API，把结果记录发回协调进程"""
+    check_engine = None
+    if engine_config:
+        from api_monitor.core.async_engine import AsyncCheckEngine
+        check_engine = AsyncCheckEngine(**engine_config)
+    # 工作进程只负责探测，统计与告警由协调进程完成
+    prober = APIMonitor([], notifier=None)
+    next_run = time.monotonic()
+    try:
+        while True:
+            if conn.poll(max(0.0, next_run - time.monotonic())):
+                message = conn.recv()
+                if message[0] == 'stop':
+                    break
+                if message[0] == 'assign':
+                    apis = message[1]
+                    logger.info(f"Shard {shard_id} now owns {len(apis)} APIs")
+                continue
+
+            next_run = max(next_run + interval, time.monotonic())
+            if not apis:
+                continue
+            if check_engine is not None:
+                results = check_engine.run(apis)
+            else:
+                results = [prober.probe(api_config) for api_config in apis]
+            conn.send(('results', shard_id,
+                       [encode_result(api_config['url'], result)
+                        for api_config, result in zip(apis, results)]))
+    except (EOFError, BrokenPipeError, KeyboardInterrupt):
+        pass  # 协调进程已退出
+    finally:
+        if check_engine is not None:
+            check_engine.close()
+
+class _Shard:
+    """协调进程中记录的工作进程状态"""
+    def __init__(self, shard_id: int, process, conn: Connection):
+        self.shard_id = shard_id
+        self.process = process
+        self.conn = conn
+        self.urls: frozenset = frozenset()
+
+class ShardedMonitor:
+    """多进程分片监控
+
+    按URL一致性哈希把API分配给多个工作进程并发探测，工作进程通过管道发回紧凑的
+    结果记录；协调进程持有唯一的APIMonitor，统一更新统计、判断告警和发送通知，
+    因此冷却和去重在全局范围内保持正确。工作进程退出时只把它负责的分片重新分配，
+    重启后再收回。
+    """
+    def __init__(self, monitor: APIMonitor, workers: int, interval_seconds: float,
+                 engine_config: Optional[Dict] = None, restart_delay: float = 5,
+                 replicas: int = 100):
+        if monitor.adaptive_interval is not None:
+            raise ValueError("Adaptive check intervals are not supported in sharded mode, "
+                             "use the 'wheel' scheduler with check_workers = 1")
+        self.monitor = monitor
+        self.workers = workers
+        self.interval_seconds = interval_seconds
+        self.engine_config = engine_config  # 非空时工作进程使用AsyncCheckEngine
+        self.restart_delay = restart_delay
+        self.apis_by_url = {api['url']: api for api in monitor.apis}
+        self.ring = ConsistentHashRing(replicas)
+        self.shards: Dict[int, _Shard] = {}
+        self._pending_restarts: Dict[int, float] = {}
+        self._context = multiprocessing.get_context('spawn')
+        self._running = False
+        self.results_processed = 0
+
+    def start(self):
+        """启动所有工作进程并在当前线程运行协调循环"""
+        logger.info(f"Starting {self.workers} check workers for {len(self.apis_by_url)} APIs")
+        for shard_id in range(self.workers):
+            self.add_worker(shard_id, rebalance=False)
+        self._rebalance()
+        self._running = True
+        try:
+            self._run()
+        except KeyboardInterrupt:
+            logger.info("Sharded monitor stopped by user")
+        finally:
+            self.stop()
+
+    def add_worker(self, shard_id: int, rebalance: bool = True):
+        """启动工作进程并把它加入哈希环"""
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(shard_id, [], child_conn, self.interval_seconds, self.engine_config),
+            name=f'check-worker-{shard_id}',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.shards[shard_id] = _Shard(shard_id, process, parent_conn)
+        self.ring.add_node(shard_id)
+        if rebalance:
+            self._rebalance()
+
+    def remove_worker(self, shard_id: int, restart: bool = False):
+        """把工作进程移出哈希环并停止它，其分片交给其余工作进程"""
+        shard = self.shards.pop(shard_id, None)
+        if shard is None:
+            return
+        self.ring.remove_node(shard_id)
+        try:
+            shard.conn.send(('stop',))
+        except (OSError, BrokenPipeError):
+            pass
+        shard.conn.close()
+        shard.process.join(timeout=5)
+        if shard.process.is_alive():
+            shard.process.terminate()
+        self._rebalance()
+        if restart:
+            self._pending_restarts[shard_id] = time.monotonic() + self.restart_delay
+
+    def _rebalance(self):
+        """按哈希环重新计算分配，只通知分片发生变化的工作进程"""
+        assignment: Dict[int, List[Dict]] = {shard_id: [] for shard_id in self.shards}
+        for url, api_config in self.apis_by_url.items():
+            owner = self.ring.get_node(url)
+            if owner is not None:
+                assignment[owner].append(api_config)
+
+        moved = 0
+        for shard_id, apis in assignment.items():
+            shard = self.shards[shard_id]
+            urls = frozenset(api['url'] for api in apis)
+            if urls == shard.urls:
+                continue
+            moved += len(urls - shard.urls)
+            shard.urls = urls
+            try:
+                shard.conn.send(('assign', apis))
+            except (OSError, BrokenPipeError) as e:
+                logger.error(f"Failed to send assignment to shard {shard_id}: {str(e)}")
+        if moved:
+            logger.info(f"Rebalanced {moved} APIs across {len(self.shards)} workers")
+
+    def _run(self):
+        while self._running:
+            connections = {shard.conn: shard for shard in self.shards.values()}
+            for conn in wait(list(connections), timeout=1.0):
+                shard = connections[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    logger.error(f"Check worker {shard.shard_id} exited unexpectedly")
+                    self.remove_worker(shard.shard_id, restart=True)
+                    continue
+                if message[0] == 'results':
+                    self._process_results(message[1], message[2])
+
+            for shard in list(self.shards.values()):
+                if not shard.process.is_alive():
+                    logger.error(f"Check worker {shard.shard_id} is not alive "
+                                 f"(exit code {shard.process.exitcode})")
+                    self.remove_worker(shard.shard_id, restart=True)
+
+            now = time.monotonic()
+            for shard_id, restart_at in list(self._pending_restarts.items()):
+                if now >= restart_at:
+                    del self._pending_restarts[shard_id]
+                    logger.info(f"Restarting check worker {shard_id}")
+                    self.add_worker(shard_id)
+
+    def _process_results(self, shard_id: int, records: List[ResultRecord]):
+        """在协调进程中处理工作进程发回的检查结果"""
+        for record in records:
+            api_config = self.apis_by_url.get(record[0])
+            if api_config is None:
+                continue
+            try:
+                self.monitor.process_response(api_config, decode_result(record))
+            except Exception as e:
+                logger.error(f"Failed to process result for {api_config['name']}: {str(e)}",
+                             exc_info=True)
+        self.results_processed += len(records)
+        logger.info(f"Processed {len(records)} results from shard {shard_id}")
+        self.monitor.log_fleet_summary()
+        self.monitor.publish_metrics()
+
+    def stop(self):
+        """停止所有工作进程"""
+        self._running = False
+        self._pending_restarts.clear()
+        for shard_id in list(self.shards):
+            shard = self.shards.pop(shard_id)
+            try:
+                shard.conn.send(('stop',))
+            except (OSError, BrokenPipeError):
+                pass
+            shard.process.join(timeout=5)
+            if shard.process.is_alive():
+                shard.process.terminate()
+            shard.conn.close()
@@ -0,0 +1,76 @@
+# api_monitor/core/timing_wheel.py
+from typing import Any, List
+
+class TimerEntry:
+    """时间轮中的定时项"""
+    __slots__ = ('deadline', 'payload')
+
+    def __init__(self, deadline: int, payload: Any):
+        self.deadline = deadline  # 到期的绝对tick
+        self.payload = payload
+
+class HierarchicalTimingWheel:
+    """分层时间轮
+
+    第i层每个槽覆盖 slots^i 个tick，共levels层；插入和每tick推进都是O(1)
+    （摊还），到期项在上层槽位轮到时逐级下沉到第0层。
+    超出最大跨度的项先放在最高层，到期检查时若未真正到期会重新插入。
+    """
+    def __init__(self, start_tick: int, slot_bits: int = 6, levels: int = 4):
+        self.slot_bits = slot_bits
+        self.slots = 1 << slot_bits
+        self.mask = self.slots - 1
+        self.levels = levels
+        self.max_span = 1 << (slot_bits * levels)
+        self.current_tick = start_tick
+        self._wheels: List[List[List[TimerEntry]]] = [
+            [[] for _ in range(self.slots)] for _ in range(levels)
+        ]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, entry: TimerEntry):
+        """插入定时项，已过期的项放入下一个tick"""
+        self._size += 1
+        self._place(entry, self.current_tick + 1)
+
+    def _place(self, entry: TimerEntry, earliest: int):
+        deadline = max(entry.deadline, earliest)
+        delta = min(deadline - self.current_tick, self.max_span - 1)
+        deadline = self.current_tick + delta
+        for level in range(self.levels):
+            if delta < 1 << (self.slot_bits * (level + 1)):
+                index = (deadline >> (self.slot_bits * level)) & self.mask
+                self._wheels[level][index].append(entry)
+                return
+
+    def advance(self, target_tick: int) -> List[TimerEntry]:
+        """推进到target_tick，返回期间到期的所有定时项"""
+        expired: List[TimerEntry] = []
+        while self.current_tick < target_tick:
+            self.current_tick += 1
+            tick = self.current_tick
+            # 上层槽位轮到时，把其中的项下沉
+            for level in range(1, self.levels):
+                if tick & ((1 << (self.slot_bits * level)) - 1):
+                    break
+                index = (tick >> (self.slot_bits * level)) & self.mask
+                bucket = self._wheels[level][index]
+                if bucket:
+                    self._wheels[level][index] = []
+                    for entry in bucket:
+                        self._place(entry, tick)
+            index = tick & self.mask
+            bucket = self._wheels[0][index]
+            if not bucket:
+                continue
+            self._wheels[0][index] = []
+            for entry in bucket:
+                if entry.deadline > tick:
+                    self._place(entry, tick + 1)  # 超出跨度被截断的项，尚未到期
+                else:
+                    self._size -= 1
+                    expired.append(entry)
+        return expired
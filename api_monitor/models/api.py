@@ -1,7 +1,35 @@
-from dataclasses import dataclass
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 from datetime import datetime
 
+# 单次请求的计时阶段，复用连接时dns/connect/tls为None
+TIMING_PHASES = ('dns', 'connect', 'tls', 'ttfb', 'transfer')
+PHASE_LABELS = {
+    'dns': 'DNS lookup',
+    'connect': 'TCP connect',
+    'tls': 'TLS handshake',
+    'ttfb': 'TTFB',
+    'transfer': 'Body transfer'
+}
+
+class ErrorType:
+    """检查错误类型常量
+
+    时序存储按声明顺序给错误类型编码，新类型只能追加在末尾，已有类型不能删除或调整顺序。
+    """
+    TIMEOUT = 'timeout'
+    REQUEST = 'request'
+    UNEXPECTED = 'unexpected'
+    ASSERTION = 'assertion'  # 响应体断言失败
+    DNS = 'dns'  # DNS解析失败或超时
+    CIRCUIT_OPEN = 'circuit_open'  # 主机熔断期间未发起完整请求，直接失败
+    DEADLINE = 'deadline_exceeded'  # 检查周期到达截止时间，检查被取消或未开始
+
+    @classmethod
+    def values(cls) -> List[str]:
+        """按声明顺序返回所有错误类型"""
+        return [value for name, value in vars(cls).items() if name.isupper()]
+
 @dataclass
 class APIResponse:
     """API响应数据模型"""
@@ -10,6 +38,21 @@ class APIResponse:
     timestamp: datetime
     error: Optional[str] = None
     success: bool = False
+    error_type: Optional[str] = None  # 见ErrorType
+    connection_reused: Optional[bool] = None  # 是否复用了keep-alive连接
+    phase_timings: Optional[Dict[str, Optional[float]]] = None  # 各阶段耗时（秒），见TIMING_PHASES
+    body_bytes: Optional[int] = None  # 本次检查下载的响应体字节数
+
+    @classmethod
+    def deadline_exceeded(cls, elapsed: float) -> 'APIResponse':
+        """检查周期截止时仍未完成（或未开始）的检查结果"""
+        return cls(
+            status_code=None,
+            response_time=elapsed,
+            timestamp=datetime.now(),
+            error=f"Check cancelled at the cycle deadline after {elapsed:.3f}s",
+            error_type=ErrorType.DEADLINE
+        )
 
 @dataclass
 class APIConfig:
@@ -23,6 +66,9 @@ class APIConfig:
     headers: Dict[str, str]
     success_rate_threshold: float
     availability_threshold: float
+    response_time_percentile: Optional[str] = None  # 如'p95'，响应时间阈值改为比较窗口分位数
+    max_body_bytes: int = 0  # 响应体读取上限，0表示收到响应头即结束
+    body_assertions: List[Dict] = field(default_factory=list)  # 响应体断言，见AssertionType
 
     @classmethod
     def from_dict(cls, data: Dict) -> 'APIConfig':
@@ -0,0 +1,441 @@
+# api_monitor/models/columnar.py
+import math
+import threading
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from api_monitor.models.api import TIMING_PHASES
+from api_monitor.models.statistics import PhaseWindowStats, ResponseWindowStats
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖，缺失时使用array实现
+    np = None
+
+# status_codes/connection_reused中表示"无值"的哨兵
+NO_STATUS = -1
+UNKNOWN_REUSE = -1
+
+# 端点未配置阈值时使用的默认成功率/可用性阈值（%）
+DEFAULT_SUCCESS_THRESHOLD = 95
+DEFAULT_AVAILABILITY_THRESHOLD = 98
+
+# 被覆盖的样本：(响应时间, 状态码, 是否成功, 连接复用, 各阶段耗时)
+EvictedSample = Tuple[float, Optional[int], bool, Optional[bool], Dict[str, float]]
+
+def _reuse_flag(value) -> Optional[bool]:
+    return None if value == UNKNOWN_REUSE else bool(value)
+
+class ColumnarStatisticsStore:
+    """列式（结构数组）统计存储
+
+    所有端点的滑动窗口保存在预分配的连续环形缓冲区中，按端点id索引：
+    响应时间为double，状态码为int16，成功标记和连接复用标记为int8，各阶段耗时为double（缺失为NaN）。
+    安装了numpy时使用二维ndarray，整个集群的聚合指标一次向量化计算完成；
+    否则使用array('d')/array('h')/array('b')逐端点计算。
+    扩容会替换整个数组，因此注册、写入和读取都在存储级的锁内进行。
+    """
+    def __init__(self, window_size: int, capacity: int = 64):
+        self.window_size = window_size
+        self.capacity = 0
+        self._lock = threading.Lock()
+        self.endpoint_ids: Dict[str, int] = {}
+        # 告警状态等稀疏字段按(端点id, 键)集中存放，避免每个端点一组dict
+        self.error_counts: Dict = defaultdict(int)
+        self.last_alert_time: Dict = defaultdict(float)
+        self.last_recovery_time: Dict = defaultdict(float)
+        self.alert_states: Dict = defaultdict(bool)
+        if np is not None:
+            self.response_times = np.zeros((0, window_size), dtype=np.float64)
+            self.status_codes = np.full((0, window_size), NO_STATUS, dtype=np.int16)
+            self.successes = np.zeros((0, window_size), dtype=np.int8)
+            self.connection_reused = np.full((0, window_size), UNKNOWN_REUSE, dtype=np.int8)
+            self.heads = np.zeros(0, dtype=np.int64)
+            self.counts = np.zeros(0, dtype=np.int64)
+            self.totals = np.zeros((0, 3), dtype=np.int64)  # 累计 总数/成功/可用
+            # 各端点自己配置的成功率/可用性阈值，聚合时逐端点比较
+            self.success_thresholds = np.zeros(0, dtype=np.float64)
+            self.availability_thresholds = np.zeros(0, dtype=np.float64)
+            self.phase_times = {phase: np.zeros((0, window_size), dtype=np.float64)
+                                for phase in TIMING_PHASES}
+        else:
+            self.response_times = array('d')
+            self.status_codes = array('h')
+            self.successes = array('b')
+            self.connection_reused = array('b')
+            self.heads = array('l')
+            self.counts = array('l')
+            self.totals = array('q')
+            self.success_thresholds = array('d')
+            self.availability_thresholds = array('d')
+            self.phase_times = {phase: array('d') for phase in TIMING_PHASES}
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        """扩容到capacity个端点（调用方需持有锁，构造时除外）"""
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        window = self.window_size
+        if np is not None:
+            self.response_times = np.vstack([self.response_times,
+                                             np.zeros((extra, window), dtype=np.float64)])
+            self.status_codes = np.vstack([self.status_codes,
+                                           np.full((extra, window), NO_STATUS, dtype=np.int16)])
+            self.successes = np.vstack([self.successes, np.zeros((extra, window), dtype=np.int8)])
+            self.connection_reused = np.vstack([self.connection_reused,
+                                                np.full((extra, window), UNKNOWN_REUSE,
+                                                        dtype=np.int8)])
+            self.heads = np.concatenate([self.heads, np.zeros(extra, dtype=np.int64)])
+            self.counts = np.concatenate([self.counts, np.zeros(extra, dtype=np.int64)])
+            self.totals = np.vstack([self.totals, np.zeros((extra, 3), dtype=np.int64)])
+            self.success_thresholds = np.concatenate([
+                self.success_thresholds, np.full(extra, DEFAULT_SUCCESS_THRESHOLD, dtype=np.float64)])
+            self.availability_thresholds = np.concatenate([
+                self.availability_thresholds,
+                np.full(extra, DEFAULT_AVAILABILITY_THRESHOLD, dtype=np.float64)])
+            for phase in TIMING_PHASES:
+                self.phase_times[phase] = np.vstack([self.phase_times[phase],
+                                                     np.full((extra, window), np.nan)])
+        else:
+            self.response_times.extend([0.0] * (extra * window))
+            self.status_codes.extend([NO_STATUS] * (extra * window))
+            self.successes.extend([0] * (extra * window))
+            self.connection_reused.extend([UNKNOWN_REUSE] * (extra * window))
+            self.heads.extend([0] * extra)
+            self.counts.extend([0] * extra)
+            self.totals.extend([0] * (extra * 3))
+            self.success_thresholds.extend([DEFAULT_SUCCESS_THRESHOLD] * extra)
+            self.availability_thresholds.extend([DEFAULT_AVAILABILITY_THRESHOLD] * extra)
+            for phase in TIMING_PHASES:
+                self.phase_times[phase].extend([math.nan] * (extra * window))
+        self.capacity = capacity
+
+    def register(self, url: str, success_threshold: float = DEFAULT_SUCCESS_THRESHOLD,
+                 availability_threshold: float = DEFAULT_AVAILABILITY_THRESHOLD) -> int:
+        """注册端点（记录其成功率/可用性阈值）并返回端点id"""
+        with self._lock:
+            endpoint_id = self.endpoint_ids.get(url)
+            if endpoint_id is None:
+                endpoint_id = len(self.endpoint_ids)
+                if endpoint_id >= self.capacity:
+                    self._grow(max(self.capacity * 2, 64))
+                self.endpoint_ids[url] = endpoint_id
+            self.success_thresholds[endpoint_id] = success_threshold
+            self.availability_thresholds[endpoint_id] = availability_threshold
+            return endpoint_id
+
+    def add(self, endpoint_id: int, response_time: float, status_code: Optional[int],
+            connection_reused: Optional[bool] = None,
+            phase_timings: Optional[Dict[str, Optional[float]]] = None,
+            success: Optional[bool] = None) -> Optional[EvictedSample]:
+        """写入一个样本（success为None时按状态码是否为200判断）
+
+        窗口已满时覆盖环形缓冲区中最旧的样本，并返回被覆盖的样本，否则返回None。
+        """
+        with self._lock:
+            evicted = self._sample(endpoint_id, int(self.heads[endpoint_id])) \
+                if self.counts[endpoint_id] == self.window_size else None
+            self._write(endpoint_id, response_time, status_code, connection_reused,
+                        phase_timings, success)
+            return evicted
+
+    def _sample(self, endpoint_id: int, head: int) -> EvictedSample:
+        if np is not None:
+            values = (self.response_times[endpoint_id, head],
+                      self.status_codes[endpoint_id, head],
+                      self.successes[endpoint_id, head],
+                      self.connection_reused[endpoint_id, head])
+            phases = {phase: float(column[endpoint_id, head])
+                      for phase, column in self.phase_times.items()}
+        else:
+            offset = endpoint_id * self.window_size + head
+            values = (self.response_times[offset], self.status_codes[offset],
+                      self.successes[offset], self.connection_reused[offset])
+            phases = {phase: column[offset] for phase, column in self.phase_times.items()}
+        response_time, code, ok, reuse = values
+        return (float(response_time), None if code == NO_STATUS else int(code), bool(ok),
+                _reuse_flag(reuse), phases)
+
+    def _write(self, endpoint_id: int, response_time: float, status_code: Optional[int],
+               connection_reused: Optional[bool],
+               phase_timings: Optional[Dict[str, Optional[float]]], success: Optional[bool]):
+        head = int(self.heads[endpoint_id])
+        offset = endpoint_id * self.window_size + head
+        for phase, column in self.phase_times.items():
+            value = phase_timings.get(phase) if phase_timings else None
+            if np is not None:
+                column[endpoint_id, head] = math.nan if value is None else value
+            else:
+                column[offset] = math.nan if value is None else value
+        code = NO_STATUS if status_code is None else status_code
+        ok = int(status_code == 200 if success is None else success)
+        reuse = UNKNOWN_REUSE if connection_reused is None else int(connection_reused)
+        if np is not None:
+            self.response_times[endpoint_id, head] = response_time
+            self.status_codes[endpoint_id, head] = code
+            self.successes[endpoint_id, head] = ok
+            self.connection_reused[endpoint_id, head] = reuse
+            self.totals[endpoint_id] += (1, ok, code != NO_STATUS)
+        else:
+            self.response_times[offset] = response_time
+            self.status_codes[offset] = code
+            self.successes[offset] = ok
+            self.connection_reused[offset] = reuse
+            base = endpoint_id * 3
+            self.totals[base] += 1
+            self.totals[base + 1] += ok
+            self.totals[base + 2] += code != NO_STATUS
+        self.heads[endpoint_id] = (head + 1) % self.window_size
+        if self.counts[endpoint_id] < self.window_size:
+            self.counts[endpoint_id] += 1
+
+    def window(self, endpoint_id: int):
+        """返回端点窗口内的(响应时间, 状态码, 成功标记, 连接复用)序列的副本（不保证时间顺序）"""
+        with self._lock:
+            return self._window(endpoint_id)
+
+    def _window(self, endpoint_id: int):
+        count = int(self.counts[endpoint_id])
+        if np is not None:
+            return (self.response_times[endpoint_id, :count].copy(),
+                    self.status_codes[endpoint_id, :count].copy(),
+                    self.successes[endpoint_id, :count].copy(),
+                    self.connection_reused[endpoint_id, :count].copy())
+        offset = endpoint_id * self.window_size
+        return (self.response_times[offset:offset + count],
+                self.status_codes[offset:offset + count],
+                self.successes[offset:offset + count],
+                self.connection_reused[offset:offset + count])
+
+    def phase_window(self, endpoint_id: int) -> Dict:
+        """返回端点窗口内各阶段耗时序列的副本（缺失为NaN）"""
+        with self._lock:
+            count = int(self.counts[endpoint_id])
+            if np is not None:
+                return {phase: column[endpoint_id, :count].copy()
+                        for phase, column in self.phase_times.items()}
+            offset = endpoint_id * self.window_size
+            return {phase: column[offset:offset + count]
+                    for phase, column in self.phase_times.items()}
+
+    def total(self, endpoint_id: int, index: int) -> int:
+        """累计计数，index为0总数/1成功/2可用"""
+        with self._lock:
+            if np is not None:
+                return int(self.totals[endpoint_id, index])
+            return self.totals[endpoint_id * 3 + index]
+
+    def set_total(self, endpoint_id: int, index: int, value: int):
+        with self._lock:
+            if np is not None:
+                self.totals[endpoint_id, index] = value
+            else:
+                self.totals[endpoint_id * 3 + index] = value
+
+    def fleet_summary(self) -> Dict:
+        """一次计算全部端点的聚合指标，低于阈值的端点数按各端点自己的阈值统计"""
+        with self._lock:
+            endpoints = len(self.endpoint_ids)
+            if np is not None:
+                return self._fleet_summary_numpy(endpoints)
+            return self._fleet_summary_python(endpoints)
+
+    def _fleet_summary_python(self, endpoints: int) -> Dict:
+
+        samples = successes = available = 0
+        latency_sum = 0.0
+        latency_max = None
+        below_success = below_availability = 0
+        for endpoint_id in range(endpoints):
+            response_times, status_codes, succeeded, _ = self._window(endpoint_id)
+            count = len(response_times)
+            if not count:
+                continue
+            ok = sum(succeeded)
+            up = sum(1 for code in status_codes if code != NO_STATUS)
+            samples += count
+            successes += ok
+            available += up
+            latency_sum += sum(response_times)
+            window_max = max(response_times)
+            latency_max = window_max if latency_max is None else max(latency_max, window_max)
+            below_success += ok / count * 100 < self.success_thresholds[endpoint_id]
+            below_availability += up / count * 100 < self.availability_thresholds[endpoint_id]
+        return self._summary_dict(endpoints, samples, successes, available, latency_sum,
+                                  latency_max, below_success, below_availability)
+
+    def _fleet_summary_numpy(self, endpoints: int) -> Dict:
+        counts = self.counts[:endpoints]
+        valid = np.arange(self.window_size)[None, :] < counts[:, None]
+        ok = ((self.successes[:endpoints] == 1) & valid).sum(axis=1)
+        up = ((self.status_codes[:endpoints] != NO_STATUS) & valid).sum(axis=1)
+        latencies = self.response_times[:endpoints]
+        active = counts > 0
+        safe_counts = np.maximum(counts, 1)
+        samples = int(counts.sum())
+        return self._summary_dict(
+            endpoints,
+            samples,
+            int(ok.sum()),
+            int(up.sum()),
+            float((latencies * valid).sum()),
+            float(latencies[valid].max()) if samples else None,
+            int((active & (ok / safe_counts * 100
+                           < self.success_thresholds[:endpoints])).sum()),
+            int((active & (up / safe_counts * 100
+                           < self.availability_thresholds[:endpoints])).sum())
+        )
+
+    @staticmethod
+    def _summary_dict(endpoints: int, samples: int, successes: int, available: int,
+                      latency_sum: float, latency_max: Optional[float],
+                      below_success: int, below_availability: int) -> Dict:
+        return {
+            'endpoint_count': endpoints,
+            'sample_count': samples,
+            'success_rate': successes / samples * 100 if samples else 0,
+            'availability': available / samples * 100 if samples else 0,
+            'avg_response_time': latency_sum / samples if samples else 0,
+            'max_response_time': latency_max,
+            'endpoints_below_success_threshold': below_success,
+            'endpoints_below_availability_threshold': below_availability
+        }
+
+class _KeyedView:
+    """把存储中按(端点id, 键)存放的字段映射成单个端点的dict接口"""
+    __slots__ = ('_data', '_endpoint_id')
+
+    def __init__(self, data: Dict, endpoint_id: int):
+        self._data = data
+        self._endpoint_id = endpoint_id
+
+    def __getitem__(self, key):
+        return self._data[(self._endpoint_id, key)]
+
+    def __setitem__(self, key, value):
+        self._data[(self._endpoint_id, key)] = value
+
+    def get(self, key, default=None):
+        return self._data.get((self._endpoint_id, key), default)
+
+class ColumnarEndpointStatistics:
+    """列式存储上单个端点的统计视图，接口与APIStatistics一致
+
+    样本本身保存在列式存储中，窗口统计量与APIStatistics一样随写入和覆盖增量维护
+    （ResponseWindowStats/PhaseWindowStats），读取统计不排序窗口。
+    """
+    def __init__(self, store: ColumnarStatisticsStore, url: str,
+                 success_threshold: float = DEFAULT_SUCCESS_THRESHOLD,
+                 availability_threshold: float = DEFAULT_AVAILABILITY_THRESHOLD):
+        self.store = store
+        self.endpoint_id = store.register(url, success_threshold, availability_threshold)
+        self.window_size = store.window_size
+        self.error_counts = _KeyedView(store.error_counts, self.endpoint_id)
+        self.last_alert_time = _KeyedView(store.last_alert_time, self.endpoint_id)
+        self.last_recovery_time = _KeyedView(store.last_recovery_time, self.endpoint_id)
+        self.alert_states = _KeyedView(store.alert_states, self.endpoint_id)
+        self.check_interval: Optional[float] = None  # 自适应调度下的当前检查间隔（秒）
+        self.healthy_streak = 0  # 连续正常检查次数
+        self.breaker_state: Optional[str] = None  # 所在主机的熔断状态，见BreakerState
+        self.response_stats = ResponseWindowStats()
+        self.phase_stats = PhaseWindowStats()
+        self._count = 0  # 窗口内样本数
+        self._window_successes = 0
+        self._window_available = 0
+        self._added = 0
+        self._stats_cache: Optional[Dict] = None
+        # 写入和读取同一端点的统计互斥，wheel调度下驱动线程发布快照时检查线程可能正在写入
+        self._lock = threading.Lock()
+
+    @property
+    def total_requests(self) -> int:
+        return self.store.total(self.endpoint_id, 0)
+
+    @property
+    def successful_requests(self) -> int:
+        return self.store.total(self.endpoint_id, 1)
+
+    @successful_requests.setter
+    def successful_requests(self, value: int):
+        self.store.set_total(self.endpoint_id, 1, value)
+
+    @property
+    def available_requests(self) -> int:
+        return self.store.total(self.endpoint_id, 2)
+
+    @property
+    def response_times(self) -> List[float]:
+        return list(self.store.window(self.endpoint_id)[0])
+
+    def update_window_stats(self):
+        """与APIStatistics兼容，列式存储无需单独更新"""
+        pass
+
+    def add_response(self, response_time: float, status_code: Optional[int],
+                     connection_reused: Optional[bool] = None,
+                     phase_timings: Optional[Dict[str, Optional[float]]] = None,
+                     success: Optional[bool] = None):
+        """添加新的响应记录（success为None时按状态码是否为200判断成功）"""
+        if success is None:
+            success = status_code == 200
+        with self._lock:
+            evicted = self.store.add(self.endpoint_id, response_time, status_code,
+                                     connection_reused, phase_timings, success)
+            if evicted is not None:
+                old_time, old_status, old_success, old_reused, old_phases = evicted
+                self.response_stats.remove(old_time, old_reused)
+                self.phase_stats.remove(old_phases)
+                self._window_successes -= old_success
+                self._window_available -= old_status is not None
+            else:
+                self._count += 1
+            self.response_stats.add(response_time, connection_reused)
+            self.phase_stats.add(phase_timings)
+            self._window_successes += success
+            self._window_available += status_code is not None
+            self._added += 1
+            # 每满一个窗口重新求和一次，避免浮点累加误差漂移（摊还O(1)）
+            if self._added % self.window_size == 0:
+                response_times, _, _, reused = self.store.window(self.endpoint_id)
+                self.response_stats.resync((float(t) for t in response_times),
+                                           (_reuse_flag(flag) for flag in reused))
+                self.phase_stats.resync(self.store.phase_window(self.endpoint_id))
+            self._stats_cache = None
+
+    def get_window_stats(self) -> Dict:
+        """获取滑动窗口统计指标（结果在下一个样本到来前缓存，调用方不应修改）"""
+        with self._lock:
+            if self._stats_cache is None:
+                self._stats_cache = self._compute_window_stats()
+            return self._stats_cache
+
+    def _compute_window_stats(self) -> Dict:
+        count = self._count
+        if not count:
+            return {}
+
+        stats = self.response_stats.stats(count)
+        stats.update({
+            'success_rate': self._window_successes / count * 100,
+            'availability': self._window_available / count * 100,
+            'request_count': count,
+            'window_duration_minutes': count * 30 / 60,  # 转换为分钟
+            'check_interval': self.check_interval,
+            'breaker_state': self.breaker_state
+        })
+        stats.update(self.phase_stats.stats())
+        return stats
+
+    def increment_error_count(self, error_type: str):
+        """增加错误计数"""
+        self.error_counts[error_type] += 1
+        self.alert_states[error_type] = True
+
+    def reset_error_count(self, error_type: str):
+        """重置错误计数"""
+        self.error_counts[error_type] = 0
+        self.alert_states[error_type] = False
+        self.last_recovery_time[error_type] = datetime.now().timestamp()
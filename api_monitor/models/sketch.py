@@ -0,0 +1,111 @@
+# api_monitor/models/sketch.py
+import math
+from typing import Dict, Iterable, List, Optional
+
+class LatencySketch:
+    """DDSketch风格的可合并分位数草图
+
+    按对数分桶计数，分位数估计的相对误差不超过relative_accuracy；
+    桶数超过max_buckets时把最低的桶合并，内存有界。
+    计数可加可减，因此既能统计累计分布，也能配合滑动窗口在样本淘汰时remove。
+    """
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048,
+                 min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0  # 不大于min_value的样本
+        self.count = 0
+        self._floor_key: Optional[int] = None  # 合并后的最低桶
+
+    def _key(self, value: float) -> int:
+        key = math.ceil(math.log(value) / self._log_gamma)
+        if self._floor_key is not None and key < self._floor_key:
+            return self._floor_key
+        return key
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """加入样本"""
+        self.count += count
+        if value <= self.min_value:
+            self.zero_count += count
+            return
+        key = self._key(value)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def remove(self, value: float, count: int = 1):
+        """移除之前加入过的样本"""
+        self.count -= count
+        if value <= self.min_value:
+            self.zero_count -= count
+            return
+        key = self._key(value)
+        remaining = self.buckets.get(key, 0) - count
+        if remaining > 0:
+            self.buckets[key] = remaining
+        else:
+            self.buckets.pop(key, None)
+
+    def _collapse(self):
+        """合并最低的桶，使桶数回到上限内"""
+        keys = sorted(self.buckets)
+        excess = len(keys) - self.max_buckets
+        floor_key = keys[excess]
+        for key in keys[:excess]:
+            self.buckets[floor_key] += self.buckets.pop(key)
+        self._floor_key = floor_key
+
+    def merge(self, other: 'LatencySketch'):
+        """合并另一个相同精度的草图"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        if other._floor_key is not None and (self._floor_key is None
+                                             or other._floor_key > self._floor_key):
+            self._floor_key = other._floor_key
+            for key in [k for k in self.buckets if k < self._floor_key]:
+                self.buckets[self._floor_key] = (self.buckets.get(self._floor_key, 0)
+                                                 + self.buckets.pop(key))
+        for key, bucket_count in other.buckets.items():
+            key = self._floor_key if self._floor_key is not None and key < self._floor_key else key
+            self.buckets[key] = self.buckets.get(key, 0) + bucket_count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """一次遍历计算多个分位数（qs需升序），草图为空时返回None"""
+        qs = list(qs)
+        if self.count <= 0:
+            return [None] * len(qs)
+
+        results: List[Optional[float]] = []
+        ranks = [q * (self.count - 1) for q in qs]
+        index = 0
+        cumulative = self.zero_count
+        while index < len(ranks) and ranks[index] < cumulative:
+            results.append(0.0)
+            index += 1
+        for key in sorted(self.buckets):
+            cumulative += self.buckets[key]
+            while index < len(ranks) and ranks[index] < cumulative:
+                results.append(self._value(key))
+                index += 1
+            if index == len(ranks):
+                break
+        while index < len(ranks):
+            results.append(self._value(max(self.buckets)) if self.buckets else 0.0)
+            index += 1
+        return results
+
+    def quantile(self, q: float) -> Optional[float]:
+        """计算单个分位数"""
+        return self.quantiles([q])[0]
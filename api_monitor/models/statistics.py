@@ -1,15 +1,163 @@
 # api_monitor/models/statistics.py
+import threading
 from dataclasses import dataclass, field
 from collections import deque, defaultdict
-from typing import Dict, Deque, Optional
+from typing import Dict, Deque, Iterable, Mapping, Optional, Tuple
 from datetime import datetime
 
+from api_monitor.models.api import TIMING_PHASES
+from api_monitor.models.sketch import LatencySketch
+
+# 统计结果中输出的延迟分位数
+LATENCY_PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p95', 0.95), ('p99', 0.99))
+
+def _has_value(value: Optional[float]) -> bool:
+    """None/NaN表示该次检查没有这个阶段"""
+    return value is not None and value == value
+
+class PhaseWindowStats:
+    """各阶段耗时窗口的增量统计
+
+    每个阶段维护总和、计数和LatencySketch，样本进入窗口时add、被淘汰时remove，
+    读取平均值、p50和p95不需要排序窗口。
+    """
+    def __init__(self):
+        self.sums = {phase: 0.0 for phase in TIMING_PHASES}
+        self.counts = {phase: 0 for phase in TIMING_PHASES}
+        self.sketches = {phase: LatencySketch() for phase in TIMING_PHASES}
+
+    def add(self, phase_timings: Optional[Mapping[str, Optional[float]]]):
+        if not phase_timings:
+            return
+        for phase in TIMING_PHASES:
+            value = phase_timings.get(phase)
+            if _has_value(value):
+                self.sums[phase] += value
+                self.counts[phase] += 1
+                self.sketches[phase].add(value)
+
+    def remove(self, phase_timings: Optional[Mapping[str, Optional[float]]]):
+        if not phase_timings:
+            return
+        for phase in TIMING_PHASES:
+            value = phase_timings.get(phase)
+            if _has_value(value):
+                self.sums[phase] -= value
+                self.counts[phase] -= 1
+                self.sketches[phase].remove(value)
+
+    def resync(self, phase_windows: Mapping[str, Iterable[Optional[float]]]):
+        """按窗口内容重新求和，避免浮点累加误差漂移"""
+        for phase in TIMING_PHASES:
+            self.sums[phase] = float(sum(v for v in phase_windows[phase] if _has_value(v)))
+
+    def stats(self) -> Dict:
+        """各阶段的平均值、p50和p95，窗口内没有该阶段时为None"""
+        stats = {}
+        for phase in TIMING_PHASES:
+            count = self.counts[phase]
+            p50, p95 = self.sketches[phase].quantiles((0.5, 0.95)) if count else (None, None)
+            stats[f'{phase}_avg_time'] = float(self.sums[phase]) / count if count else None
+            stats[f'{phase}_p50_time'] = p50
+            stats[f'{phase}_p95_time'] = p95
+        return stats
+
+class ResponseWindowStats:
+    """滑动窗口响应时间的增量统计
+
+    总和与热/冷连接延迟在样本进入和淘汰时O(1)增减，最小/最大值使用单调队列，
+    分位数由LatencySketch维护。样本按加入顺序编号，remove必须按先进先出淘汰最旧的样本。
+    """
+    def __init__(self):
+        self.sum = 0.0
+        self.warm_sum = 0.0
+        self.warm_count = 0
+        self.cold_sum = 0.0
+        self.cold_count = 0
+        self.sketch = LatencySketch()
+        self._sequence = 0  # 最新样本的序号
+        self._oldest = 1  # 窗口内最旧样本的序号
+        # 单调队列，元素为(样本序号, 响应时间)
+        self._max_queue: Deque[Tuple[int, float]] = deque()
+        self._min_queue: Deque[Tuple[int, float]] = deque()
+
+    def add(self, response_time: float, connection_reused: Optional[bool]):
+        self._sequence += 1
+        self.sum += response_time
+        self.sketch.add(response_time)
+        if connection_reused is True:
+            self.warm_sum += response_time
+            self.warm_count += 1
+        elif connection_reused is False:
+            self.cold_sum += response_time
+            self.cold_count += 1
+
+        while self._max_queue and self._max_queue[-1][1] <= response_time:
+            self._max_queue.pop()
+        self._max_queue.append((self._sequence, response_time))
+        while self._min_queue and self._min_queue[-1][1] >= response_time:
+            self._min_queue.pop()
+        self._min_queue.append((self._sequence, response_time))
+
+    def remove(self, response_time: float, connection_reused: Optional[bool]):
+        """淘汰窗口内最旧的样本"""
+        self.sum -= response_time
+        self.sketch.remove(response_time)
+        if connection_reused is True:
+            self.warm_sum -= response_time
+            self.warm_count -= 1
+        elif connection_reused is False:
+            self.cold_sum -= response_time
+            self.cold_count -= 1
+
+        if self._max_queue and self._max_queue[0][0] <= self._oldest:
+            self._max_queue.popleft()
+        if self._min_queue and self._min_queue[0][0] <= self._oldest:
+            self._min_queue.popleft()
+        self._oldest += 1
+
+    def resync(self, response_times: Iterable[float],
+               connection_reused: Iterable[Optional[bool]]):
+        """按窗口内容重新计算浮点累加和"""
+        self.sum = self.warm_sum = self.cold_sum = 0.0
+        for response_time, reused in zip(response_times, connection_reused):
+            self.sum += response_time
+            if reused is True:
+                self.warm_sum += response_time
+            elif reused is False:
+                self.cold_sum += response_time
+
+    def stats(self, count: int) -> Dict:
+        """窗口内count个样本的平均、最大、最小值、热/冷连接平均值和延迟分位数"""
+        stats = {
+            'avg_response_time': self.sum / count,
+            'max_response_time': self._max_queue[0][1],
+            'min_response_time': self._min_queue[0][1],
+            'warm_avg_response_time': self.warm_sum / self.warm_count if self.warm_count else None,
+            'cold_avg_response_time': self.cold_sum / self.cold_count if self.cold_count else None,
+            'warm_request_count': self.warm_count,
+            'cold_request_count': self.cold_count
+        }
+        percentiles = self.sketch.quantiles(q for _, q in LATENCY_PERCENTILES)
+        for (name, _), value in zip(LATENCY_PERCENTILES, percentiles):
+            stats[f'{name}_response_time'] = value
+        return stats
+
 @dataclass
 class APIStatistics:
-    """API统计数据模型"""
+    """API统计数据模型
+
+    滑动窗口的统计量（总和、成功/可用计数、热/冷连接延迟、最小/最大值）在
+    add_response和样本淘汰时以O(1)增量维护（见ResponseWindowStats），
+    窗口延迟分位数和各阶段耗时统计由LatencySketch维护（淘汰样本时从草图中移除）。
+    get_window_stats的结果缓存到下一个样本到来为止。
+    写入和读取统计在同一把锁内进行，wheel调度下检查线程写入时驱动线程可以同时发布快照。
+    """
     window_size: int
     response_times: Deque[float] = field(default_factory=deque)
     status_codes: Deque[Optional[int]] = field(default_factory=deque)
+    successes: Deque[bool] = field(default_factory=deque)
+    connection_reused: Deque[Optional[bool]] = field(default_factory=deque)
     error_counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
     last_alert_time: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
     last_recovery_time: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
@@ -20,29 +168,126 @@ class APIStatistics:
     window_total_requests: int = field(default=0)
     window_successful_requests: int = field(default=0)
     window_available_requests: int = field(default=0)
+    check_interval: Optional[float] = field(default=None)  # 自适应调度下的当前检查间隔（秒）
+    healthy_streak: int = field(default=0)  # 连续正常检查次数
+    breaker_state: Optional[str] = field(default=None)  # 所在主机的熔断状态，见BreakerState
 
     def __post_init__(self):
-        """初始化限制队列长度"""
+        """初始化限制队列长度及增量统计状态"""
         self.response_times = deque(maxlen=self.window_size)
         self.status_codes = deque(maxlen=self.window_size)
+        self.successes = deque(maxlen=self.window_size)  # 样本是否计为成功
+        self.connection_reused = deque(maxlen=self.window_size)
+        # 各阶段耗时窗口，与response_times逐样本对齐，没有该阶段时为None
+        self.phase_times: Dict[str, Deque[Optional[float]]] = {
+            phase: deque(maxlen=self.window_size) for phase in TIMING_PHASES
+        }
+        self._sequence = 0  # 已加入的样本序号
+        self.response_stats = ResponseWindowStats()
+        self.phase_stats = PhaseWindowStats()
+        self._stats_cache: Optional[Dict] = None
+        self._lock = threading.Lock()
 
     def update_window_stats(self):
-        """更新滑动窗口统计数据"""
+        """更新滑动窗口统计数据（计数已增量维护，这里只同步窗口大小）"""
         self.window_total_requests = len(self.response_times)
-        self.window_successful_requests = sum(1 for code in self.status_codes if code == 200)
-        self.window_available_requests = sum(1 for code in self.status_codes if code is not None)
 
-    def add_response(self, response_time: float, status_code: Optional[int]):
-        """添加新的响应记录"""
+    def add_response(self, response_time: float, status_code: Optional[int],
+                     connection_reused: Optional[bool] = None,
+                     phase_timings: Optional[Dict[str, Optional[float]]] = None,
+                     success: Optional[bool] = None):
+        """添加新的响应记录
+
+        connection_reused为None表示未知；success为None时按状态码是否为200判断成功，
+        收到响应但内容不符合预期时传False，计为可用但不成功。
+        """
+        if success is None:
+            success = status_code == 200
+        with self._lock:
+            self._add_response(response_time, status_code, connection_reused, phase_timings,
+                               success)
+
+    def _add_response(self, response_time: float, status_code: Optional[int],
+                      connection_reused: Optional[bool],
+                      phase_timings: Optional[Dict[str, Optional[float]]], success: bool):
+        if len(self.response_times) == self.window_size:
+            self._evict_oldest()
+
         self.response_times.append(response_time)
         self.status_codes.append(status_code)
+        self.successes.append(success)
+        self.connection_reused.append(connection_reused)
+        for phase, window in self.phase_times.items():
+            window.append(phase_timings.get(phase) if phase_timings else None)
+        self.phase_stats.add(phase_timings)
+        self._sequence += 1
+        self._add_window_sample(response_time, status_code, connection_reused, success)
         self.total_requests += 1
-        
-        if status_code == 200:
+
+        if success:
             self.successful_requests += 1
         if status_code is not None:
             self.available_requests += 1
 
+        # 每满一个窗口重新求和一次，避免浮点累加误差漂移（摊还O(1)）
+        if self._sequence % self.window_size == 0:
+            self._resync_sums()
+
+        self.window_total_requests = len(self.response_times)
+        self._stats_cache = None
+
+    def _add_window_sample(self, response_time: float, status_code: Optional[int],
+                           connection_reused: Optional[bool], success: bool):
+        """把新样本计入窗口统计"""
+        self.response_stats.add(response_time, connection_reused)
+        if success:
+            self.window_successful_requests += 1
+        if status_code is not None:
+            self.window_available_requests += 1
+
+    def _resync_sums(self):
+        """按窗口内容重新计算浮点累加和"""
+        self.response_stats.resync(self.response_times, self.connection_reused)
+        self.phase_stats.resync(self.phase_times)
+
+    def _evict_oldest(self):
+        """从窗口统计中扣除即将被淘汰的最旧样本"""
+        response_time = self.response_times[0]
+        status_code = self.status_codes[0]
+        success = self.successes[0]
+        connection_reused = self.connection_reused[0]
+
+        self.response_stats.remove(response_time, connection_reused)
+        self.phase_stats.remove({phase: window[0] for phase, window in self.phase_times.items()})
+        if success:
+            self.window_successful_requests -= 1
+        if status_code is not None:
+            self.window_available_requests -= 1
+
+    def get_window_stats(self) -> Dict:
+        """获取滑动窗口统计指标（结果在下一个样本到来前缓存，调用方不应修改）"""
+        with self._lock:
+            if self._stats_cache is None:
+                self._stats_cache = self._compute_window_stats()
+            return self._stats_cache
+
+    def _compute_window_stats(self) -> Dict:
+        count = len(self.response_times)
+        if not count:
+            return {}
+
+        stats = self.response_stats.stats(count)
+        stats.update({
+            'success_rate': self.window_successful_requests / count * 100,
+            'availability': self.window_available_requests / count * 100,
+            'request_count': count,
+            'window_duration_minutes': count * 30 / 60,  # 转换为分钟
+            'check_interval': self.check_interval,
+            'breaker_state': self.breaker_state
+        })
+        stats.update(self.phase_stats.stats())
+        return stats
+
     def increment_error_count(self, error_type: str):
         """增加错误计数"""
         self.error_counts[error_type] += 1
@@ -52,4 +297,4 @@ class APIStatistics:
         """重置错误计数"""
         self.error_counts[error_type] = 0
         self.alert_states[error_type] = False
-        self.last_recovery_time[error_type] = datetime.now().timestamp()
\ No newline at end of file
+        self.last_recovery_time[error_type] = datetime.now().timestamp()
@@ -0,0 +1,113 @@
+# api_monitor/notifications/aggregator.py
+import threading
+from typing import Dict, List, Tuple
+
+from .base import BaseNotifier
+from .dispatcher import DeliveryHandle, DeliveryStatus
+from api_monitor.utils.logger import setup_logger
+
+logger = setup_logger('alert_aggregator')
+
+RECOVERY = 'recovery'
+
+class _PendingAlert:
+    """窗口内等待合并的告警"""
+    __slots__ = ('title', 'content', 'kwargs', 'handle')
+
+    def __init__(self, title: str, content: str, kwargs: Dict, handle: DeliveryHandle):
+        self.title = title
+        self.content = content
+        self.kwargs = kwargs
+        self.handle = handle
+
+class AlertAggregator(BaseNotifier):
+    """告警合并层
+
+    位于APIMonitor与实际通知器之间：同一严重级别在window_seconds内收到的告警
+    合并成一张摘要卡片发送（恢复通知同理），窗口内只有一条时原样转发。
+    返回的DeliveryHandle在摘要投递完成后随之完成；flush只提交摘要，不等待投递结果，
+    因此Webhook无响应时也不会阻塞定时器线程或退出时的flush_all。
+    """
+    def __init__(self, notifier: BaseNotifier, window_seconds: float = 10,
+                 max_items: int = 20):
+        self.notifier = notifier
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self._pending: Dict[str, List[_PendingAlert]] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def send_alert(self, title: str, content: str, alert_type: str, **kwargs) -> DeliveryHandle:
+        """把告警加入所属级别的合并窗口"""
+        handle = DeliveryHandle(f"{alert_type} alert: {title}")
+        with self._lock:
+            self._pending.setdefault(alert_type, []).append(
+                _PendingAlert(title, content, kwargs, handle)
+            )
+            if alert_type not in self._timers:
+                timer = threading.Timer(self.window_seconds, self.flush, args=(alert_type,))
+                timer.daemon = True
+                self._timers[alert_type] = timer
+                timer.start()
+        return handle
+
+    def send_recovery(self, title: str, content: str, **kwargs) -> DeliveryHandle:
+        """把恢复通知加入恢复合并窗口"""
+        return self.send_alert(title, content, RECOVERY, **kwargs)
+
+    def flush(self, alert_type: str):
+        """发送某个级别窗口内积累的告警"""
+        with self._lock:
+            items = self._pending.pop(alert_type, [])
+            timer = self._timers.pop(alert_type, None)
+        if timer is not None:
+            timer.cancel()
+        if not items:
+            return
+
+        def finish_items(digest_handle: DeliveryHandle):
+            for item in items:
+                item.handle.attempts = 1
+                item.handle._finish(digest_handle.status, digest_handle.error)
+
+        try:
+            if len(items) == 1:
+                item = items[0]
+                digest_handle = self._forward(alert_type, item.title, item.content, item.kwargs)
+            else:
+                title, content = self._build_digest(alert_type, items)
+                logger.info(f"Coalesced {len(items)} {alert_type} alerts into one digest")
+                digest_handle = self._forward(alert_type, title, content, {})
+        except Exception as e:
+            logger.error(f"Error flushing {alert_type} alerts: {str(e)}")
+            digest_handle = DeliveryHandle(f"{alert_type} digest")
+            digest_handle._finish(DeliveryStatus.FAILED, str(e))
+        digest_handle.add_done_callback(finish_items)
+
+    def flush_all(self):
+        """立即提交所有窗口内的告警（用于停止前，投递由调度器的shutdown等待）"""
+        with self._lock:
+            alert_types = list(self._pending)
+        for alert_type in alert_types:
+            self.flush(alert_type)
+
+    def get_stats(self) -> Dict:
+        return self.notifier.get_stats()
+
+    def _forward(self, alert_type: str, title: str, content: str,
+                 kwargs: Dict) -> DeliveryHandle:
+        if alert_type == RECOVERY:
+            return self.notifier.send_recovery(title, content, **kwargs)
+        return self.notifier.send_alert(title, content, alert_type, **kwargs)
+
+    def _build_digest(self, alert_type: str, items: List[_PendingAlert]) -> Tuple[str, str]:
+        """构建摘要卡片的标题和内容"""
+        title = f"API Monitor {alert_type.upper()} digest: {len(items)} notifications"
+        lines = []
+        for item in items[:self.max_items]:
+            url = item.kwargs.get('url')
+            suffix = f" ({url})" if url else ""
+            lines.append(f"- **{item.title}**{suffix}: {item.content}")
+        if len(items) > self.max_items:
+            lines.append(f"- ... and {len(items) - self.max_items} more")
+        return title, "\n".join(lines)
@@ -2,14 +2,23 @@ from abc import ABC, abstractmethod
 from typing import Dict, Any
 from datetime import datetime
 
+from .dispatcher import DeliveryHandle
+
 class BaseNotifier(ABC):
-    """通知服务基类"""
+    """通知服务基类
+
+    send_alert/send_recovery应尽快返回DeliveryHandle，实际投递可以在后台完成。
+    """
     @abstractmethod
-    def send_alert(self, title: str, content: str, alert_type: str, **kwargs) -> bool:
+    def send_alert(self, title: str, content: str, alert_type: str, **kwargs) -> DeliveryHandle:
         """发送告警"""
         pass
 
     @abstractmethod
-    def send_recovery(self, title: str, content: str, **kwargs) -> bool:
+    def send_recovery(self, title: str, content: str, **kwargs) -> DeliveryHandle:
         """发送恢复通知"""
-        pass
\ No newline at end of file
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取通知器自身的计数（如被限流未发送的消息数）"""
+        return {}
\ No newline at end of file
@@ -0,0 +1,205 @@
+# api_monitor/notifications/dispatcher.py
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from api_monitor.utils.logger import setup_logger
+
+logger = setup_logger('notification_dispatcher')
+
+class DeliveryStatus:
+    """投递状态常量"""
+    PENDING = 'pending'
+    DELIVERED = 'delivered'
+    FAILED = 'failed'
+    DROPPED = 'dropped'
+
+class OverflowPolicy:
+    """队列满时的处理策略"""
+    DROP_NEW = 'drop_new'  # 丢弃新消息
+    DROP_OLDEST = 'drop_oldest'  # 丢弃队列中最旧的消息
+
+class DeliveryHandle:
+    """一次通知投递的句柄，可用于查询或等待投递结果"""
+    def __init__(self, description: str, send: Optional[Callable[[], bool]] = None):
+        self.description = description
+        self.send = send
+        self.status = DeliveryStatus.PENDING
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.enqueued_at = time.monotonic()
+        self.completed_at: Optional[float] = None
+        self._done = threading.Event()
+        self._callbacks: List[Callable[['DeliveryHandle'], None]] = []
+        self._callbacks_lock = threading.Lock()
+
+    @classmethod
+    def completed(cls, description: str, success: bool,
+                  error: Optional[str] = None) -> 'DeliveryHandle':
+        """构造已完成的句柄（用于同步发送）"""
+        handle = cls(description)
+        handle.attempts = 1
+        handle._finish(DeliveryStatus.DELIVERED if success else DeliveryStatus.FAILED, error)
+        return handle
+
+    def _finish(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.completed_at = time.monotonic()
+        with self._callbacks_lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback: Callable[['DeliveryHandle'], None]):
+        """投递完成时调用callback(handle)，已完成时立即调用"""
+        with self._callbacks_lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == DeliveryStatus.DELIVERED
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待投递完成，返回是否投递成功"""
+        self._done.wait(timeout)
+        return self.succeeded
+
+class NotificationDispatcher:
+    """后台通知分发器
+
+    通知放入有界内存队列后立即返回DeliveryHandle，由后台工作线程发送；
+    发送失败按指数退避加随机抖动重试，队列满时按overflow_policy丢弃。
+    """
+    def __init__(self, workers: int = 2, queue_size: int = 1000, max_retries: int = 3,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 overflow_policy: str = OverflowPolicy.DROP_OLDEST):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.overflow_policy = overflow_policy
+        self._queue: 'queue.Queue[DeliveryHandle]' = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            'enqueued': 0,
+            'delivered': 0,
+            'failed': 0,
+            'dropped': 0,
+            'retries': 0
+        }
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._workers: List[threading.Thread] = []
+        for index in range(workers):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f'notification-worker-{index}',
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, send: Callable[[], bool], description: str) -> DeliveryHandle:
+        """提交一次投递，立即返回句柄"""
+        handle = DeliveryHandle(description, send)
+        try:
+            self._queue.put_nowait(handle)
+        except queue.Full:
+            if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                try:
+                    self._drop(self._queue.get_nowait())
+                    self._queue.task_done()
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(handle)
+                except queue.Full:
+                    self._drop(handle)
+                    return handle
+            else:
+                self._drop(handle)
+                return handle
+        self._count('enqueued')
+        return handle
+
+    def _drop(self, handle: DeliveryHandle):
+        logger.warning(f"Notification queue full, dropped: {handle.description}")
+        handle._finish(DeliveryStatus.DROPPED, 'queue full')
+        self._count('dropped')
+
+    def _count(self, name: str, value: int = 1):
+        with self._stats_lock:
+            self._counters[name] += value
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                handle = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._deliver(handle)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, handle: DeliveryHandle):
+        """发送一条通知，失败时退避重试"""
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count('retries')
+                # 全抖动指数退避
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+                if self._stop_event.wait(delay):
+                    break
+            handle.attempts += 1
+            try:
+                if handle.send():
+                    self._record_latency(handle)
+                    handle._finish(DeliveryStatus.DELIVERED)
+                    self._count('delivered')
+                    return
+                error = 'rejected by receiver'
+            except Exception as e:
+                error = str(e)
+            logger.warning(f"Delivery attempt {handle.attempts} failed for "
+                           f"{handle.description}: {error}")
+
+        logger.error(f"Giving up on {handle.description} after {handle.attempts} attempts")
+        handle._finish(DeliveryStatus.FAILED, error)
+        self._count('failed')
+
+    def _record_latency(self, handle: DeliveryHandle):
+        latency = time.monotonic() - handle.enqueued_at
+        with self._stats_lock:
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+
+    def get_stats(self) -> Dict:
+        """获取队列深度、投递计数和投递延迟"""
+        with self._stats_lock:
+            stats = dict(self._counters)
+            delivered = stats['delivered']
+            stats['avg_delivery_latency'] = self._latency_total / delivered if delivered else 0.0
+            stats['max_delivery_latency'] = self._latency_max
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    def shutdown(self, timeout: float = 10.0):
+        """等待队列中的通知发送完毕（最多timeout秒）后停止工作线程"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout=1)
@@ -1,9 +1,14 @@
 # api_monitor/notifications/feishu.py
-import requests
+import threading
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from .base import BaseNotifier
+from .dispatcher import DeliveryHandle, NotificationDispatcher
 from api_monitor.config.settings import APIMonitorSettings
+from api_monitor.models.api import PHASE_LABELS, TIMING_PHASES
+from api_monitor.models.statistics import LATENCY_PERCENTILES
+from api_monitor.utils.http_pool import HTTPSessionPool
+from api_monitor.utils.rate_limit import TokenBucket
 from api_monitor.utils.logger import setup_logger
 
 logger = setup_logger('feishu_notifier')
@@ -22,15 +27,29 @@ class AlertTemplate:
 
 class FeishuNotifier(BaseNotifier):
     """飞书通知实现"""
-    def __init__(self, webhook_url: str, user_ids: list):
+    def __init__(self, webhook_url: str, user_ids: list,
+                 dispatcher: Optional[NotificationDispatcher] = None,
+                 timeout: Tuple[float, float] = (3, 10),
+                 rate_limiter: Optional[TokenBucket] = None,
+                 rate_limit_wait: float = 30,
+                 http_pool: Optional[HTTPSessionPool] = None):
         self.webhook_url = webhook_url
         self.user_ids = user_ids
+        self.dispatcher = dispatcher  # 为None时在调用线程同步发送
+        self.timeout = timeout  # (连接超时, 读取超时)
+        self.rate_limiter = rate_limiter  # 按Webhook共享的令牌桶
+        self.rate_limit_wait = rate_limit_wait  # 后台投递时等待令牌的最长时间（秒）
+        self.rate_limited = 0  # 因限流未发送的次数（后台投递时会重试）
+        self._stats_lock = threading.Lock()
+        # 通知使用独立的会话池，不占用检查的连接，也不计入检查的建连/复用统计
+        self.http_pool = http_pool if http_pool is not None else HTTPSessionPool(max_hosts=1)
 
     def _build_message(self, title: str, content: str, alert_type: str, 
                     response_time: Optional[float] = None,
                     status_code: Optional[int] = None,
                     stats: Optional[Dict] = None,
-                    url: Optional[str] = None) -> Dict:
+                    url: Optional[str] = None,
+                    phase_timings: Optional[Dict] = None) -> Dict:
         """构建飞书消息"""
         color = {
             AlertType.ERROR: AlertTemplate.ERROR,
@@ -63,11 +82,20 @@ class FeishuNotifier(BaseNotifier):
         if stats:
             content_lines.extend([
                 f"**Average Response Time**: {stats.get('avg_response_time', 0):.3f}s",
+                "**Percentiles**: " + " / ".join(
+                    f"{name.upper()} {stats[f'{name}_response_time']:.3f}s"
+                    for name, _ in LATENCY_PERCENTILES
+                    if stats.get(f'{name}_response_time') is not None
+                ),
                 f"**Success Rate**: {stats.get('success_rate', 0):.1f}%",
                 f"**Availability**: {stats.get('availability', 0):.1f}%",
                 f"**Total Requests**: {stats.get('request_count', 0)}"
             ])
 
+        phases = self._format_phases(phase_timings, stats or {})
+        if phases:
+            content_lines.append(f"**Phases**: {phases}")
+
         content_lines.extend([
             "",  # 空行作为分隔
             f"**Details**: {content}"
@@ -108,25 +136,77 @@ class FeishuNotifier(BaseNotifier):
 
         return message
 
-    def send_alert(self, title: str, content: str, alert_type: str, **kwargs) -> bool:
-        """发送告警消息"""
+    @staticmethod
+    def _format_phases(phase_timings: Optional[Dict], stats: Dict) -> str:
+        """各阶段本次耗时及窗口p95"""
+        parts = []
+        for phase in TIMING_PHASES:
+            value = (phase_timings or {}).get(phase)
+            p95 = stats.get(f'{phase}_p95_time')
+            if value is None and p95 is None:
+                continue
+            current = f"{value * 1000:.0f}ms" if value is not None else "-"
+            window = f" (p95 {p95 * 1000:.0f}ms)" if p95 is not None else ""
+            parts.append(f"{PHASE_LABELS[phase]} {current}{window}")
+        return " / ".join(parts)
+
+    def send_alert(self, title: str, content: str, alert_type: str, **kwargs) -> DeliveryHandle:
+        """发送告警消息（配置了dispatcher时放入队列后立即返回）"""
+        description = f"{alert_type} alert: {title}"
         try:
             message = self._build_message(title, content, alert_type, **kwargs)
-            response = requests.post(
-                self.webhook_url,
-                json=message,
-                headers={'Content-Type': 'application/json'}
-            )
-            success = response.status_code == 200
-            if success:
-                logger.info(f"Successfully sent {alert_type} alert: {title}")
-            else:
-                logger.error(f"Failed to send alert: {response.text}")
-            return success
+        except Exception as e:
+            logger.error(f"Error building alert message: {str(e)}")
+            return DeliveryHandle.completed(description, False, str(e))
+
+        if self.dispatcher is not None:
+            return self.dispatcher.submit(lambda: self._post_message(message, description),
+                                          description)
+
+        try:
+            return DeliveryHandle.completed(description, self._post_message(message, description))
         except Exception as e:
             logger.error(f"Error sending alert: {str(e)}")
-            return False
+            return DeliveryHandle.completed(description, False, str(e))
+
+    def _post_message(self, message: Dict, description: str) -> bool:
+        """通过通知专用的连接池投递消息到Webhook"""
+        if self.rate_limiter is not None:
+            # 同步发送时不在检查路径上等待令牌
+            wait = self.rate_limit_wait if self.dispatcher is not None else 0
+            if not self.rate_limiter.acquire(timeout=wait):
+                with self._stats_lock:
+                    self.rate_limited += 1
+                    rate_limited = self.rate_limited
+                logger.warning(f"Webhook rate limit reached, not sending {description} "
+                               f"({rate_limited} rate limited so far)")
+                return False
 
-    def send_recovery(self, title: str, content: str, **kwargs) -> bool:
+        response, _ = self.http_pool.request(
+            'POST',
+            self.webhook_url,
+            json=message,
+            headers={'Content-Type': 'application/json'},
+            timeout=self.timeout,
+            read_body=True  # 需要响应体里的code判断是否投递成功
+        )
+        success = response.status_code == 200
+        if success:
+            # 飞书在HTTP 200的响应体里用非0 code表示失败（如限流）
+            try:
+                success = response.json().get('code', 0) == 0
+            except ValueError:
+                pass
+        if success:
+            logger.info(f"Successfully sent {description}")
+        else:
+            logger.error(f"Failed to send alert: {response.text}")
+        return success
+
+    def send_recovery(self, title: str, content: str, **kwargs) -> DeliveryHandle:
         """发送恢复通知"""
-        return self.send_alert(title, content, AlertType.RECOVERY, **kwargs)
\ No newline at end of file
+        return self.send_alert(title, content, AlertType.RECOVERY, **kwargs)
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            return {'rate_limited': self.rate_limited}
\ No newline at end of file
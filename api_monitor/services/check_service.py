@@ -4,26 +4,30 @@ from datetime import datetime
 from typing import Tuple, Optional
 from api_monitor.models.api import APIConfig, APIResponse
 from api_monitor.models.statistics import APIStatistics
+from api_monitor.utils.http_pool import HTTPSessionPool, get_http_pool
 from api_monitor.utils.logger import setup_logger
 
 logger = setup_logger('check_service')
 
 class APICheckService:
     """API检查服务"""
-    def __init__(self, api_config: APIConfig, statistics: APIStatistics):
+    def __init__(self, api_config: APIConfig, statistics: APIStatistics,
+                 http_pool: Optional[HTTPSessionPool] = None):
         self.api_config = api_config
         self.statistics = statistics
+        self.http_pool = http_pool or get_http_pool()
 
     def check(self) -> APIResponse:
         """执行API检查"""
         start_time = time.time()
         try:
-            response = self._make_request()
+            response, reused = self._make_request()
             response_time = time.time() - start_time
             return self._create_response(
                 status_code=response.status_code,
                 response_time=response_time,
-                success=response.status_code == 200
+                success=response.status_code == 200,
+                connection_reused=reused
             )
         except requests.Timeout:
             return self._create_response(
@@ -41,9 +45,9 @@ class APICheckService:
                 error=f"Unexpected error: {str(e)}"
             )
 
-    def _make_request(self) -> requests.Response:
-        """发送HTTP请求"""
-        return requests.request(
+    def _make_request(self) -> Tuple[requests.Response, bool]:
+        """通过共享连接池发送HTTP请求，返回(响应, 是否复用连接)"""
+        return self.http_pool.request(
             method=self.api_config.method,
             url=self.api_config.url,
             headers=self.api_config.headers,
@@ -51,12 +55,14 @@ class APICheckService:
         )
 
     def _create_response(self, response_time: float, status_code: Optional[int] = None,
-                        success: bool = False, error: Optional[str] = None) -> APIResponse:
+                        success: bool = False, error: Optional[str] = None,
+                        connection_reused: Optional[bool] = None) -> APIResponse:
         """创建API响应对象"""
         return APIResponse(
             status_code=status_code,
             response_time=response_time,
             timestamp=datetime.now(),
             error=error,
-            success=success
+            success=success,
+            connection_reused=connection_reused
         )
@@ -13,6 +13,10 @@ setup(
         'python-dateutil>=2.8.1',
         'typing-extensions>=3.7.4'
     ],
+    extras_require={
+        'async': ['aiohttp>=3.8.0'],
+        'benchmark': ['aiohttp>=3.8.0', 'psutil>=5.8.0'],
+    },
     entry_points={
         'console_scripts': [
             'api_monitor=api_monitor.__main__:main',
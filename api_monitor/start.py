@@ -10,9 +10,8 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
-from api_monitor.core.monitor import APIMonitor
+from api_monitor.core.builder import build_monitor, build_runner
 from api_monitor.core.scheduler import MonitorScheduler
-from api_monitor.notifications.feishu import FeishuNotifier
 from api_monitor.config.settings import APIMonitorSettings
 from api_monitor.utils.logger import setup_logger
 
@@ -22,32 +21,21 @@ logger = setup_logger('main')
 def main():
     """主程序入口"""
     try:
-        # 初始化通知服务
-        notifier = FeishuNotifier(
-            webhook_url=APIMonitorSettings.FEISHU_CONFIG['webhook'],
-            user_ids=APIMonitorSettings.FEISHU_CONFIG['user_ids']
-        )
-
-        # 初始化监控器
-        monitor = APIMonitor(
-            apis=APIMonitorSettings.APIS,
-            notifier=notifier
-        )
-
-        # 初始化并启动调度器
-        scheduler = MonitorScheduler(
-            monitor=monitor,
-            interval_seconds=APIMonitorSettings.MONITOR_CONFIG['check_interval']
-        )
+        # 按配置初始化监控器及通知、存储、集群等组件
+        monitor = build_monitor(APIMonitorSettings)
+
+        # 初始化调度器（check_workers大于1时为多进程分片监控）
+        runner = build_runner(monitor, APIMonitorSettings)
 
         logger.info("=== API Monitoring Service Starting ===")
         logger.info(f"Monitoring {len(APIMonitorSettings.APIS)} APIs")
         
-        # 立即执行一次检查
-        monitor.check_all_apis()
+        if isinstance(runner, MonitorScheduler):
+            # 立即执行一次检查
+            monitor.check_all_apis()
         
         # 启动调度器
-        scheduler.start()
+        runner.start()
 
     except Exception as e:
         logger.error(f"Service error: {str(e)}", exc_info=True)
@@ -0,0 +1,200 @@
+# api_monitor/storage/result_log.py
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from api_monitor.utils.logger import setup_logger
+
+logger = setup_logger('result_log')
+
+# 已封存文件名：<前缀>-<首条时间毫秒>-<末条时间毫秒>.jsonl[.gz]
+SEALED_PATTERN = re.compile(r'^(?P<prefix>.+)-(?P<first>\d+)-(?P<last>\d+)\.jsonl(?P<gz>\.gz)?$')
+
+class ResultLogWriter:
+    """检查结果JSONL日志
+
+    每次检查写一行JSON，先进入内存缓冲，累计buffer_bytes或超过flush_interval秒后
+    一次性写入活动文件（fsync=True时每批只fsync一次）。活动文件超过max_bytes后封存，
+    文件名记录首末记录时间，compress=True时在后台线程压缩为gzip。
+    """
+    def __init__(self, path: str, prefix: str = 'results', buffer_bytes: int = 1024 * 1024,
+                 flush_interval: float = 1.0, fsync: bool = False,
+                 max_bytes: int = 100 * 1024 * 1024, compress: bool = True):
+        self.path = path
+        self.prefix = prefix
+        self.buffer_bytes = buffer_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.compress = compress
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._first_ts: Optional[float] = None
+        self._last_ts: Optional[float] = None
+        self._active_path = os.path.join(path, f'{prefix}.jsonl')
+        self._recover_active_file()
+        self._file = open(self._active_path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name='result-log-flusher',
+                                         daemon=True)
+        self._flusher.start()
+
+    def _recover_active_file(self):
+        """读取上次遗留活动文件的首末时间，以便封存时命名"""
+        if not os.path.exists(self._active_path):
+            return
+        for record in _iter_file(self._active_path):
+            ts = record.get('ts')
+            if ts is None:
+                continue
+            if self._first_ts is None:
+                self._first_ts = ts
+            self._last_ts = ts
+
+    def write(self, record: Dict):
+        """追加一条记录，record需包含ts（时间戳）和endpoint字段"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered += len(line)
+            ts = record.get('ts')
+            if ts is not None:
+                if self._first_ts is None:
+                    self._first_ts = ts
+                self._last_ts = ts
+            if self._buffered >= self.buffer_bytes:
+                self._flush_locked()
+
+    def flush(self):
+        """把缓冲写入活动文件"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._size = self._file.tell()
+        if self._size >= self.max_bytes:
+            self._rotate_locked()
+
+    def _rotate_locked(self):
+        """封存活动文件并打开新文件"""
+        self._file.close()
+        first_ms = int((self._first_ts or time.time()) * 1000)
+        last_ms = int((self._last_ts or time.time()) * 1000)
+        sealed_path = os.path.join(self.path, f'{self.prefix}-{first_ms}-{last_ms}.jsonl')
+        os.replace(self._active_path, sealed_path)
+        self._first_ts = self._last_ts = None
+        self._file = open(self._active_path, 'a', encoding='utf-8')
+        self._size = 0
+        logger.info(f"Rotated result log to {os.path.basename(sealed_path)}")
+        if self.compress:
+            threading.Thread(target=_compress_file, args=(sealed_path,),
+                             name='result-log-compress', daemon=True).start()
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing result log: {str(e)}")
+
+    def close(self):
+        """写入剩余缓冲并关闭文件"""
+        self._stop_event.set()
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+
+def _compress_file(path: str):
+    """把封存文件压缩为gzip，完成后删除原文件"""
+    try:
+        tmp_path = path + '.gz.tmp'
+        with open(path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, path + '.gz')
+        os.remove(path)
+    except Exception as e:
+        logger.error(f"Failed to compress {path}: {str(e)}")
+
+def _iter_file(file_path: str) -> Iterator[Dict]:
+    opener = gzip.open if file_path.endswith('.gz') else open
+    with opener(file_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break  # 写入中断留下的不完整行
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def read_results(path: str, start_ts: Optional[float] = None, end_ts: Optional[float] = None,
+                 endpoints: Optional[Sequence[str]] = None,
+                 prefix: str = 'results') -> Iterator[Dict]:
+    """按时间顺序逐行读取结果日志（含gzip封存文件），按时间范围和端点过滤
+
+    封存文件名中的时间范围与查询不重叠时整个文件跳过。
+    """
+    sealed = {}
+    for name in os.listdir(path):
+        match = SEALED_PATTERN.match(name)
+        if not match or match.group('prefix') != prefix:
+            continue
+        base = name[:-3] if match.group('gz') else name
+        # 压缩过程中可能同时存在原文件和.gz.tmp，优先读完整的.gz
+        if base in sealed and not match.group('gz'):
+            continue
+        sealed[base] = (int(match.group('first')) / 1000, int(match.group('last')) / 1000, name)
+
+    files = []
+    for first, last, name in sorted(sealed.values()):
+        if start_ts is not None and last < start_ts:
+            continue
+        if end_ts is not None and first > end_ts:
+            continue
+        files.append(name)
+    if os.path.exists(os.path.join(path, f'{prefix}.jsonl')):
+        files.append(f'{prefix}.jsonl')
+
+    endpoint_set = set(endpoints) if endpoints is not None else None
+    for name in files:
+        for record in _iter_sealed(path, name):
+            ts = record.get('ts')
+            if start_ts is not None and (ts is None or ts < start_ts):
+                continue
+            if end_ts is not None and (ts is None or ts > end_ts):
+                continue
+            if endpoint_set is not None and record.get('endpoint') not in endpoint_set:
+                continue
+            yield record
+
+def _iter_sealed(path: str, name: str) -> Iterator[Dict]:
+    """读取一个日志文件；列目录后被压缩替换的封存文件改读对应的.gz"""
+    # 文件只在首次迭代时打开，FileNotFoundError发生在产出任何记录之前，重试不会重复
+    try:
+        yield from _iter_file(os.path.join(path, name))
+        return
+    except FileNotFoundError:
+        if name.endswith('.gz') or not SEALED_PATTERN.match(name):
+            return  # 活动文件和.gz没有对应的压缩文件
+    try:
+        yield from _iter_file(os.path.join(path, name + '.gz'))
+    except FileNotFoundError:
+        return
@@ -0,0 +1,298 @@
+# api_monitor/storage/timeseries.py
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from api_monitor.models.api import ErrorType
+from api_monitor.utils.logger import setup_logger
+
+logger = setup_logger('timeseries_store')
+
+# 记录格式：时间戳(float64) 端点id(uint32) 状态码(int16, -1为无) 延迟(float32) 错误类别(uint8)
+RECORD_FORMAT = struct.Struct('<dIhfB')
+RECORD_SIZE = RECORD_FORMAT.size
+NO_STATUS = -1
+
+# 错误类别编码：0为无错误，其余按ErrorType的声明顺序（ErrorType只能在末尾追加以保持已有文件可读）
+ERROR_CLASSES: List[Optional[str]] = [None, *ErrorType.values()]
+ERROR_CODES: Dict[Optional[str], int] = {
+    error_class: code for code, error_class in enumerate(ERROR_CLASSES)
+}
+
+# 稀疏索引块大小（记录数），扫描时整块跳过不在时间范围内的数据
+INDEX_BLOCK_RECORDS = 4096
+
+class CheckRecord(NamedTuple):
+    """一条检查结果记录"""
+    timestamp: float
+    endpoint: str
+    status_code: Optional[int]
+    latency: float
+    error_class: Optional[str]
+
+class TimeSeriesStore:
+    """分段、只追加的二进制时序存储
+
+    写入先进入内存批次，满batch_size条或超过flush_interval秒后一次性追加到活动段；
+    活动段超过segment_max_bytes或segment_max_age后封存，封存段的时间范围和
+    按块的稀疏时间索引记录在manifest.json中。范围查询只打开与时间范围重叠的段，
+    通过mmap按块扫描。
+    """
+    def __init__(self, path: str, batch_size: int = 1000, flush_interval: float = 5,
+                 segment_max_bytes: int = 64 * 1024 * 1024, segment_max_age: float = 3600,
+                 fsync: bool = False):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
+        self.fsync = fsync
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._buffer: List[bytes] = []
+        self._endpoint_ids: Dict[str, int] = self._load_json('endpoints.json', {})
+        self._endpoint_names: Dict[int, str] = {v: k for k, v in self._endpoint_ids.items()}
+        self._endpoints_dirty = False
+        self._manifest: List[Dict] = self._load_json('manifest.json', [])
+        self._active_file = None
+        self._active_name: Optional[str] = None
+        self._active_opened = 0.0
+        self._active_size = 0
+        self._active_blocks: List[List[float]] = []  # 活动段每块的[最小时间, 最大时间]
+        self._last_segment_ms = 0
+        self._recover_active_segments()
+
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name='timeseries-flusher',
+                                         daemon=True)
+        self._flusher.start()
+
+    def _load_json(self, name: str, default):
+        file_path = os.path.join(self.path, name)
+        if not os.path.exists(file_path):
+            return default
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_json(self, name: str, data):
+        """先写临时文件再原子替换"""
+        file_path = os.path.join(self.path, name)
+        tmp_path = file_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, file_path)
+
+    def _endpoint_id(self, endpoint: str) -> int:
+        endpoint_id = self._endpoint_ids.get(endpoint)
+        if endpoint_id is None:
+            endpoint_id = len(self._endpoint_ids)
+            self._endpoint_ids[endpoint] = endpoint_id
+            self._endpoint_names[endpoint_id] = endpoint
+            self._endpoints_dirty = True  # 在写入引用它的记录前落盘
+        return endpoint_id
+
+    def append(self, timestamp: float, endpoint: str, status_code: Optional[int],
+               latency: float, error_class: Optional[str] = None):
+        """追加一条记录（进入内存批次），error_class必须是ErrorType中的类型或None"""
+        error_code = ERROR_CODES.get(error_class)
+        if error_code is None:
+            raise ValueError(f"Unknown error class {error_class!r}, add it to ErrorType first")
+        with self._lock:
+            self._buffer.append(RECORD_FORMAT.pack(
+                timestamp,
+                self._endpoint_id(endpoint),
+                NO_STATUS if status_code is None else status_code,
+                latency,
+                error_code
+            ))
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """把内存批次写入活动段"""
+        with self._lock:
+            if not self._buffer:
+                return
+            if self._endpoints_dirty:
+                self._save_json('endpoints.json', self._endpoint_ids)
+                self._endpoints_dirty = False
+            if self._active_file is None:
+                self._open_segment()
+            records = self._buffer
+            self._buffer = []
+            start_index = self._active_size // RECORD_SIZE
+            for offset, record in enumerate(records):
+                timestamp = RECORD_FORMAT.unpack_from(record)[0]
+                block = (start_index + offset) // INDEX_BLOCK_RECORDS
+                if block == len(self._active_blocks):
+                    self._active_blocks.append([timestamp, timestamp])
+                else:
+                    bounds = self._active_blocks[block]
+                    bounds[0] = min(bounds[0], timestamp)
+                    bounds[1] = max(bounds[1], timestamp)
+            data = b''.join(records)
+            self._active_file.write(data)
+            self._active_file.flush()
+            if self.fsync:
+                os.fsync(self._active_file.fileno())
+            self._active_size += len(data)
+
+            if (self._active_size >= self.segment_max_bytes
+                    or time.time() - self._active_opened >= self.segment_max_age):
+                self._seal_active()
+
+    def _open_segment(self):
+        self._active_opened = time.time()
+        # 段名按毫秒时间戳递增，保证同一毫秒内连续封存的段不会重名
+        self._last_segment_ms = max(int(self._active_opened * 1000), self._last_segment_ms + 1)
+        self._active_name = f"seg-{self._last_segment_ms:013d}.active"
+        self._active_file = open(os.path.join(self.path, self._active_name), 'ab')
+        self._active_size = 0
+        self._active_blocks = []
+
+    def _seal_active(self):
+        """封存活动段并写入manifest"""
+        if self._active_file is None:
+            return
+        if self.fsync:
+            os.fsync(self._active_file.fileno())
+        self._active_file.close()
+        self._active_file = None
+        self._register_sealed(self._active_name, self._active_blocks)
+        self._active_name = None
+        self._active_blocks = []
+
+    def _register_sealed(self, active_name: str, blocks: List[List[float]]):
+        active_path = os.path.join(self.path, active_name)
+        if not blocks:
+            os.remove(active_path)
+            return
+        sealed_name = active_name.replace('.active', '.dat')
+        os.replace(active_path, os.path.join(self.path, sealed_name))
+        self._manifest.append({
+            'file': sealed_name,
+            'min_ts': min(b[0] for b in blocks),
+            'max_ts': max(b[1] for b in blocks),
+            'count': os.path.getsize(os.path.join(self.path, sealed_name)) // RECORD_SIZE,
+            'blocks': blocks
+        })
+        self._manifest.sort(key=lambda seg: seg['min_ts'])
+        self._save_json('manifest.json', self._manifest)
+        logger.info(f"Sealed segment {sealed_name}")
+
+    def _recover_active_segments(self):
+        """封存上次异常退出遗留的活动段（截掉不完整的尾部记录）"""
+        for name in sorted(os.listdir(self.path)):
+            if not name.endswith('.active'):
+                continue
+            file_path = os.path.join(self.path, name)
+            size = os.path.getsize(file_path)
+            usable = size - size % RECORD_SIZE
+            if usable != size:
+                with open(file_path, 'r+b') as f:
+                    f.truncate(usable)
+            blocks = []
+            with open(file_path, 'rb') as f:
+                while True:
+                    chunk = f.read(RECORD_SIZE * INDEX_BLOCK_RECORDS)
+                    if not chunk:
+                        break
+                    stamps = [rec[0] for rec in RECORD_FORMAT.iter_unpack(chunk)]
+                    blocks.append([min(stamps), max(stamps)])
+            self._register_sealed(name, blocks)
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+                with self._lock:
+                    if (self._active_file is not None
+                            and time.time() - self._active_opened >= self.segment_max_age):
+                        self._seal_active()
+            except Exception as e:
+                logger.error(f"Error flushing time series store: {str(e)}")
+
+    def scan(self, start_ts: float = 0, end_ts: float = float('inf'),
+             endpoints: Optional[Sequence[str]] = None) -> Iterator[CheckRecord]:
+        """按时间范围（含起止）和端点过滤扫描记录，已落盘的数据通过mmap读取"""
+        with self._lock:
+            self.flush()
+            segments = [(seg['file'], seg['blocks']) for seg in self._manifest
+                        if seg['max_ts'] >= start_ts and seg['min_ts'] <= end_ts]
+            if self._active_name is not None and self._active_size:
+                segments.append((self._active_name, [list(b) for b in self._active_blocks]))
+            active_limit = self._active_size
+            names = dict(self._endpoint_names)
+
+        endpoint_ids = None
+        if endpoints is not None:
+            endpoint_ids = {self._endpoint_ids[e] for e in endpoints if e in self._endpoint_ids}
+
+        for file_name, blocks in segments:
+            limit = active_limit if file_name.endswith('.active') else None
+            yield from self._scan_segment(file_name, blocks, limit, start_ts, end_ts,
+                                          endpoint_ids, names)
+
+    def _scan_segment(self, file_name: str, blocks: List[List[float]], limit: Optional[int],
+                      start_ts: float, end_ts: float, endpoint_ids, names: Dict[int, str]):
+        file_path = os.path.join(self.path, file_name)
+        try:
+            f = open(file_path, 'rb')
+        except FileNotFoundError:
+            return  # 段在扫描期间被封存或删除
+        with f:
+            size = limit if limit is not None else os.fstat(f.fileno()).st_size
+            if size < RECORD_SIZE:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    block_bytes = RECORD_SIZE * INDEX_BLOCK_RECORDS
+                    for index, (block_min, block_max) in enumerate(blocks):
+                        if block_max < start_ts or block_min > end_ts:
+                            continue
+                        begin = index * block_bytes
+                        end = min(begin + block_bytes, size)
+                        for timestamp, endpoint_id, status, latency, error_code in \
+                                RECORD_FORMAT.iter_unpack(view[begin:end]):
+                            if timestamp < start_ts or timestamp > end_ts:
+                                continue
+                            if endpoint_ids is not None and endpoint_id not in endpoint_ids:
+                                continue
+                            yield CheckRecord(
+                                timestamp,
+                                names.get(endpoint_id, str(endpoint_id)),
+                                None if status == NO_STATUS else status,
+                                latency,
+                                ERROR_CLASSES[error_code] if error_code < len(ERROR_CLASSES)
+                                else 'unexpected'
+                            )
+                finally:
+                    view.release()
+
+    def delete_before(self, timestamp: float) -> int:
+        """删除最大时间早于timestamp的封存段，返回删除的段数"""
+        with self._lock:
+            expired = [seg for seg in self._manifest if seg['max_ts'] < timestamp]
+            if not expired:
+                return 0
+            self._manifest = [seg for seg in self._manifest if seg['max_ts'] >= timestamp]
+            self._save_json('manifest.json', self._manifest)
+        for seg in expired:
+            try:
+                os.remove(os.path.join(self.path, seg['file']))
+            except FileNotFoundError:
+                pass
+        return len(expired)
+
+    def close(self):
+        """落盘剩余数据并封存活动段"""
+        self._stop_event.set()
+        with self._lock:
+            self.flush()
+            self._seal_active()
@@ -0,0 +1,146 @@
+# api_monitor/utils/body_inspector.py
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# 配置了断言但未设置max_body_bytes时的读取上限
+DEFAULT_ASSERTION_MAX_BYTES = 64 * 1024
+
+class AssertionType:
+    """响应体断言类型常量"""
+    CONTAINS = 'contains'  # {'type': 'contains', 'value': 'ok'}
+    REGEX = 'regex'  # {'type': 'regex', 'pattern': '"status":\\s*"UP"'}
+    JSON = 'json'  # {'type': 'json', 'path': 'data.status', 'equals': 'UP'}，省略equals时只要求字段存在
+
+def _within(limit: Optional[int]) -> str:
+    return f" within the first {limit} bytes" if limit is not None else ""
+
+class _ContainsAssertion:
+    """子串断言，只保留上一块末尾可能跨块的部分"""
+    needs_body = False
+
+    def __init__(self, spec: Dict):
+        self.value = spec['value']
+        self.needle = self.value.encode('utf-8')
+        self.tail = b''
+        self.passed = False
+
+    def feed(self, chunk: bytes, body: bytearray):
+        data = self.tail + chunk
+        if self.needle in data:
+            self.passed = True
+        elif len(self.needle) > 1:
+            self.tail = data[-(len(self.needle) - 1):]
+
+    def failure(self, limit: Optional[int], body: bytearray) -> str:
+        return f"body does not contain {self.value!r}" + _within(limit)
+
+class _RegexAssertion:
+    """正则断言，在已读取的响应体上匹配"""
+    needs_body = True
+
+    def __init__(self, spec: Dict):
+        self.pattern = spec['pattern']
+        self.regex = re.compile(self.pattern.encode('utf-8'))
+        self.passed = False
+
+    def feed(self, chunk: bytes, body: bytearray):
+        if self.regex.search(body):
+            self.passed = True
+
+    def failure(self, limit: Optional[int], body: bytearray) -> str:
+        return f"body does not match /{self.pattern}/" + _within(limit)
+
+class _JSONAssertion:
+    """JSON字段断言，需要完整的响应体，读完后才能判定"""
+    needs_body = True
+
+    def __init__(self, spec: Dict):
+        self.path = spec['path']
+        self.keys = self.path.split('.')
+        self.has_expected = 'equals' in spec
+        self.expected = spec.get('equals')
+        self.passed = False
+
+    def feed(self, chunk: bytes, body: bytearray):
+        pass
+
+    def _lookup(self, document: Any) -> Any:
+        for key in self.keys:
+            if isinstance(document, list):
+                document = document[int(key)]
+            else:
+                document = document[key]
+        return document
+
+    def failure(self, limit: Optional[int], body: bytearray) -> Optional[str]:
+        if limit is not None:
+            return f"body exceeds {limit} bytes, cannot check JSON field {self.path}"
+        try:
+            document = json.loads(bytes(body))
+        except ValueError as e:
+            return f"body is not valid JSON: {str(e)}"
+        try:
+            value = self._lookup(document)
+        except (KeyError, IndexError, TypeError, ValueError):
+            return f"JSON field {self.path} is missing"
+        if self.has_expected and value != self.expected:
+            return f"JSON field {self.path} is {value!r}, expected {self.expected!r}"
+        return None
+
+_ASSERTIONS = {
+    AssertionType.CONTAINS: _ContainsAssertion,
+    AssertionType.REGEX: _RegexAssertion,
+    AssertionType.JSON: _JSONAssertion
+}
+
+class BodyInspector:
+    """增量读取并检查响应体
+
+    HTTP客户端每读到一块就调用feed()，feed()返回True时停止读取：
+    读取量超过max_bytes，或所有断言都已通过（子串和正则断言一旦命中即通过，
+    JSON断言要等响应体读完才能判定）。读取结束后由finish()给出失败原因。
+    """
+    def __init__(self, max_bytes: int, assertions: Optional[List[Dict]] = None):
+        self.max_bytes = max_bytes
+        self.assertions = [_ASSERTIONS[spec['type']](spec) for spec in assertions or []]
+        self.keep_body = any(assertion.needs_body for assertion in self.assertions)
+        self.body = bytearray()
+        self.bytes_read = 0
+        self.truncated = False
+
+    @classmethod
+    def from_api_config(cls, api_config: Dict) -> Optional['BodyInspector']:
+        """按API配置创建，既不读取响应体也没有断言时返回None（收到响应头即结束）"""
+        assertions = api_config.get('body_assertions') or []
+        max_bytes = api_config.get('max_body_bytes', 0)
+        if not max_bytes and not assertions:
+            return None
+        return cls(max_bytes or DEFAULT_ASSERTION_MAX_BYTES, assertions)
+
+    def feed(self, chunk: bytes) -> bool:
+        """处理一块响应体，返回是否可以停止读取"""
+        remaining = self.max_bytes - self.bytes_read
+        if len(chunk) > remaining:
+            chunk = chunk[:remaining]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+        if self.keep_body:
+            self.body += chunk
+        pending = False
+        for assertion in self.assertions:
+            if not assertion.passed:
+                assertion.feed(chunk, self.body)
+                pending = pending or not assertion.passed
+        return self.truncated or (bool(self.assertions) and not pending)
+
+    def finish(self) -> Optional[str]:
+        """读取结束后判定尚未通过的断言，返回第一条失败原因，全部通过时返回None"""
+        limit = self.max_bytes if self.truncated else None
+        for assertion in self.assertions:
+            if assertion.passed:
+                continue
+            failure = assertion.failure(limit, self.body)
+            if failure is not None:
+                return failure
+        return None
@@ -0,0 +1,185 @@
+# api_monitor/utils/dns_cache.py
+import asyncio
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Tuple
+
+from api_monitor.config.settings import APIMonitorSettings
+from api_monitor.utils.logger import setup_logger
+
+logger = setup_logger('dns_cache')
+
+# 解析结果：(地址族, IP)
+Address = Tuple[int, str]
+
+class DNSResolutionError(socket.gaierror):
+    """DNS解析失败或超时"""
+
+class _Entry:
+    """一个主机名的缓存项，addresses为None时是负缓存"""
+    __slots__ = ('addresses', 'error', 'expires', 'stale_until')
+
+    def __init__(self, addresses: Optional[List[Address]], error: Optional[DNSResolutionError],
+                 expires: float, stale_until: float):
+        self.addresses = addresses
+        self.error = error
+        self.expires = expires
+        self.stale_until = stale_until
+
+class DNSCache:
+    """进程内共享的DNS缓存
+
+    解析在固定大小的线程池中调用系统getaddrinfo，同步调用方等待Future，
+    异步调用方在事件循环中await同一个Future，因此同一主机名的并发查询只解析一次。
+    系统解析器不返回记录的TTL，成功结果按ttl缓存；过期后stale_ttl内仍直接返回旧结果，
+    同时在后台刷新，刷新失败时继续使用旧结果；解析失败按negative_ttl缓存。
+    等待超过timeout视为解析过慢，按解析失败处理，后台解析完成后照常写入缓存。
+    """
+    def __init__(self, ttl: float = 60, negative_ttl: float = 10, stale_ttl: float = 300,
+                 timeout: float = 5, max_entries: int = 10000, workers: int = 8):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dns')
+        self._entries: 'OrderedDict[Tuple[str, int], _Entry]' = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'failures': 0,
+            'timeouts': 0
+        }
+
+    def resolve(self, host: str, family: int = socket.AF_UNSPEC) -> List[Address]:
+        """同步解析，命中缓存时不阻塞"""
+        addresses, future = self._lookup(host, family)
+        if future is None:
+            return addresses
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            raise self._timeout_error(host) from None
+
+    async def resolve_async(self, host: str, family: int = socket.AF_UNSPEC) -> List[Address]:
+        """在事件循环中解析，命中缓存时不切换线程"""
+        addresses, future = self._lookup(host, family)
+        if future is None:
+            return addresses
+        try:
+            # shield避免一个调用方取消时连带取消其他调用方共享的解析
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                          self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timeout_error(host) from None
+
+    def _timeout_error(self, host: str) -> DNSResolutionError:
+        with self._lock:
+            self.stats['timeouts'] += 1
+        return DNSResolutionError(socket.EAI_AGAIN,
+                                  f"DNS lookup for {host} timed out after {self.timeout}s")
+
+    def _lookup(self, host: str, family: int) -> Tuple[Optional[List[Address]], Optional[Future]]:
+        """查缓存，返回(地址, None)或(None, 解析中的Future)"""
+        key = (host.rstrip('.').lower(), family)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if now < entry.expires:
+                    if entry.error is not None:
+                        self.stats['negative_hits'] += 1
+                        raise DNSResolutionError(*entry.error.args)
+                    self.stats['hits'] += 1
+                    return entry.addresses, None
+                if entry.addresses is not None and now < entry.stale_until:
+                    self.stats['stale_hits'] += 1
+                    if key not in self._inflight:
+                        self.stats['refreshes'] += 1
+                        self._inflight[key] = self._executor.submit(self._resolve, key)
+                    return entry.addresses, None
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return None, future
+            self.stats['misses'] += 1
+            future = self._inflight[key] = self._executor.submit(self._resolve, key)
+            return None, future
+
+    def _resolve(self, key: Tuple[str, int]) -> List[Address]:
+        """在解析线程中调用getaddrinfo并写入缓存"""
+        host, family = key
+        try:
+            infos = socket.getaddrinfo(host, None, family, socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys((info[0], info[4][0]) for info in infos))
+        except OSError as e:
+            error = DNSResolutionError(getattr(e, 'errno', None),
+                                       f"DNS lookup for {host} failed: {e.strerror or str(e)}")
+            with self._lock:
+                self.stats['failures'] += 1
+                self._inflight.pop(key, None)
+                entry = self._entries.get(key)
+                now = time.monotonic()
+                if entry is not None and entry.addresses is not None and now < entry.stale_until:
+                    # 刷新失败时继续使用旧结果，直到超出stale_ttl
+                    logger.warning(f"DNS refresh for {host} failed, serving stale addresses: "
+                                   f"{str(e)}")
+                else:
+                    self._store(key, _Entry(None, error, now + self.negative_ttl,
+                                            now + self.negative_ttl))
+            raise error from e
+        with self._lock:
+            now = time.monotonic()
+            self._inflight.pop(key, None)
+            self._store(key, _Entry(addresses, None, now + self.ttl,
+                                    now + self.ttl + self.stale_ttl))
+        return addresses
+
+    def _store(self, key: Tuple[str, int], entry: _Entry):
+        """写入缓存项并淘汰最久未用的（调用方需持有锁）"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计"""
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries), 'inflight': len(self._inflight)}
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+_shared_cache: Optional[DNSCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_dns_cache() -> Optional[DNSCache]:
+    """获取进程内共享的DNS缓存（按DNS_CONFIG创建），未启用时返回None"""
+    global _shared_cache
+    config = APIMonitorSettings.DNS_CONFIG
+    if not config['enabled']:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = DNSCache(
+                ttl=config['ttl'],
+                negative_ttl=config['negative_ttl'],
+                stale_ttl=config['stale_ttl'],
+                timeout=config['timeout'],
+                max_entries=config['max_entries'],
+                workers=config['workers']
+            )
+        return _shared_cache
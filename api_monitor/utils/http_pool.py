@@ -0,0 +1,274 @@
+# api_monitor/utils/http_pool.py
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util import connection
+
+from api_monitor.config.settings import APIMonitorSettings
+from api_monitor.models.api import TIMING_PHASES
+from api_monitor.utils.body_inspector import BodyInspector
+from api_monitor.utils.dns_cache import get_dns_cache
+from api_monitor.utils.logger import setup_logger
+
+logger = setup_logger('http_pool')
+
+# 记录当前线程的请求是否新建了连接，以及各阶段耗时
+_local = threading.local()
+
+def _phases() -> Dict[str, float]:
+    phases = getattr(_local, 'phases', None)
+    if phases is None:
+        phases = _local.phases = {}
+    return phases
+
+class DNSLookupError(requests.ConnectionError):
+    """DNS解析失败或超时导致请求失败"""
+
+def _resolve(host: str) -> List[str]:
+    """解析主机名，启用DNS缓存时经缓存解析"""
+    family = connection.allowed_gai_family()
+    cache = get_dns_cache()
+    if cache is not None:
+        return [address for _, address in cache.resolve(host, family)]
+    return [info[4][0] for info in socket.getaddrinfo(host, None, family, socket.SOCK_STREAM)]
+
+class _TimedConnectionMixin:
+    """把建连拆成DNS解析和TCP连接分别计时（单调时钟）
+
+    先解析地址再逐个尝试连接解析出的IP，与urllib3.util.connection.create_connection
+    的行为一致，但不会重复解析；解析经进程内DNS缓存，命中时dns阶段接近0。
+    """
+    def _new_conn(self) -> socket.socket:
+        phases = _phases()
+        started = time.perf_counter()
+        try:
+            addresses = _resolve(self._dns_host)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = time.perf_counter()
+        phases['dns'] = resolved - started
+
+        last_error: Optional[OSError] = None
+        for address in addresses:
+            try:
+                sock = connection.create_connection(
+                    (address, self.port),
+                    self.timeout,
+                    source_address=self.source_address,
+                    socket_options=self.socket_options
+                )
+                break
+            except OSError as e:
+                last_error = e
+        else:
+            if isinstance(last_error, socket.timeout):
+                raise ConnectTimeoutError(
+                    self,
+                    f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+                ) from last_error
+            raise NewConnectionError(
+                self, f"Failed to establish a new connection: {last_error}"
+            ) from last_error
+        phases['connect'] = time.perf_counter() - resolved
+        return sock
+
+class _TrackedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    """建立连接时打标记的HTTP连接"""
+    def connect(self):
+        _local.new_connection = True
+        super().connect()
+
+class _TrackedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    """建立连接时打标记的HTTPS连接，TLS握手耗时为建连总耗时减去DNS和TCP连接"""
+    def connect(self):
+        _local.new_connection = True
+        started = time.perf_counter()
+        super().connect()
+        phases = _phases()
+        phases['tls'] = max(0.0, time.perf_counter() - started
+                            - phases.get('dns', 0.0) - phases.get('connect', 0.0))
+
+class _TrackedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TrackedHTTPConnection
+
+class _TrackedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TrackedHTTPSConnection
+
+class _TrackedAdapter(HTTPAdapter):
+    """使用可追踪连接的适配器"""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TrackedHTTPConnectionPool,
+            'https': _TrackedHTTPSConnectionPool
+        }
+
+class _HostSession:
+    """单个主机的会话及其最近使用时间"""
+    def __init__(self, pool_maxsize: int):
+        self.session = requests.Session()
+        adapter = _TrackedAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.last_used = time.monotonic()
+
+class HTTPSessionPool:
+    """按主机管理的keep-alive会话池
+
+    每个主机一个requests.Session，连接在多次检查之间复用；
+    超过idle_timeout未使用的主机会被回收，主机数超过max_hosts时淘汰最久未用的。
+    """
+    def __init__(self, pool_maxsize: int = 10, max_hosts: int = 100,
+                 idle_timeout: float = 300, chunk_size: int = 8192,
+                 drain_bytes: int = 16384):
+        self.pool_maxsize = pool_maxsize
+        self.max_hosts = max_hosts
+        self.idle_timeout = idle_timeout
+        self.chunk_size = chunk_size  # 流式读取响应体的块大小
+        self.drain_bytes = drain_bytes  # 未读完的响应体不超过该长度时读完以保留连接
+        self._sessions: 'OrderedDict[str, _HostSession]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    def _get_session(self, url: str) -> requests.Session:
+        """获取（或创建）URL所属主机的会话"""
+        parts = urlsplit(url)
+        host_key = f"{parts.scheme}://{parts.netloc}"
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_eviction >= min(self.idle_timeout, 60):
+                self._evict_idle(now)
+            host = self._sessions.get(host_key)
+            if host is None:
+                host = _HostSession(self.pool_maxsize)
+                self._sessions[host_key] = host
+                while len(self._sessions) > self.max_hosts:
+                    _, oldest = self._sessions.popitem(last=False)
+                    oldest.session.close()
+            else:
+                self._sessions.move_to_end(host_key)
+            host.last_used = now
+            return host.session
+
+    def _evict_idle(self, now: float):
+        """回收空闲超时的主机会话（调用方需持有锁）"""
+        expired = [key for key, host in self._sessions.items()
+                   if now - host.last_used > self.idle_timeout]
+        for key in expired:
+            self._sessions.pop(key).session.close()
+        if expired:
+            logger.info(f"Evicted {len(expired)} idle host sessions")
+        self._last_eviction = now
+
+    def request(self, method: str, url: str, inspector: Optional[BodyInspector] = None,
+                read_body: bool = False, **kwargs) -> Tuple[requests.Response, bool]:
+        """发送请求，返回(响应, 是否复用了已有连接)
+
+        默认收到响应头即结束，不下载响应体；传入inspector时流式读取响应体，
+        由inspector决定何时停止，断言失败原因记录在response.body_error中；
+        read_body为True时读完整个响应体，response.content/json()/text照常可用。
+        各阶段耗时记录在response.phase_timings中（未读取响应体时transfer为None），
+        读取的响应体字节数记录在response.body_bytes中：inspector/read_body读取的部分按解压后计，
+        为复用连接读完的剩余部分按传输的原始字节计（不解压）。
+        """
+        session = self._get_session(url)
+        _local.new_connection = False
+        phases = _local.phases = {}
+        started = time.perf_counter()
+        try:
+            response = session.request(method=method, url=url, stream=True, **kwargs)
+        except requests.ConnectionError as e:
+            reason = getattr(e.args[0], 'reason', None) if e.args else None
+            if isinstance(reason, NameResolutionError):
+                raise DNSLookupError(str(reason.__cause__ or reason), request=e.request) from e
+            raise
+        headers_received = time.perf_counter()
+        response.body_error = None
+        body_bytes = 0
+        try:
+            if inspector is not None:
+                for chunk in response.iter_content(self.chunk_size):
+                    body_bytes += len(chunk)
+                    if inspector.feed(chunk):
+                        break
+                response.body_error = inspector.finish()
+                phases['transfer'] = time.perf_counter() - headers_received
+            elif read_body:
+                body_bytes += len(response.content)
+                phases['transfer'] = time.perf_counter() - headers_received
+        finally:
+            body_bytes += self._release(response)
+        established = sum(phases.get(phase, 0.0) for phase in ('dns', 'connect', 'tls'))
+        phases['ttfb'] = max(0.0, headers_received - started - established)
+        response.phase_timings = {phase: phases.get(phase) for phase in TIMING_PHASES}
+        response.body_bytes = body_bytes
+        reused = not _local.new_connection
+        with self._lock:
+            if reused:
+                self.reused_connections += 1
+            else:
+                self.new_connections += 1
+        return response, reused
+
+    def _release(self, response: requests.Response) -> int:
+        """处理未读完的响应体：声明的长度不超过drain_bytes时读完，使连接可以复用；
+        否则关闭连接，不再下载剩余部分。返回读完时读取的原始（未解压）字节数"""
+        if response.raw.length_remaining == 0 or response.raw.closed:
+            return 0
+        drained = 0
+        content_length = response.headers.get('Content-Length', '')
+        if content_length.isdigit() and int(content_length) <= self.drain_bytes:
+            try:
+                for chunk in response.raw.stream(self.chunk_size, decode_content=False):
+                    drained += len(chunk)
+                return drained
+            except Exception:
+                pass
+        response.close()
+        return drained
+
+    def get_stats(self) -> Dict:
+        """获取连接池统计"""
+        with self._lock:
+            hosts = len(self._sessions)
+        return {
+            'hosts': hosts,
+            'new_connections': self.new_connections,
+            'reused_connections': self.reused_connections
+        }
+
+    def close(self):
+        """关闭所有会话"""
+        with self._lock:
+            for host in self._sessions.values():
+                host.session.close()
+            self._sessions.clear()
+
+_shared_pool: Optional[HTTPSessionPool] = None
+_shared_pool_lock = threading.Lock()
+
+def get_http_pool() -> HTTPSessionPool:
+    """获取进程内共享的会话池（按HTTP_POOL_CONFIG创建）"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            config = APIMonitorSettings.HTTP_POOL_CONFIG
+            _shared_pool = HTTPSessionPool(
+                pool_maxsize=config['pool_maxsize'],
+                max_hosts=config['max_hosts'],
+                idle_timeout=config['idle_timeout'],
+                chunk_size=config['chunk_size'],
+                drain_bytes=config['drain_bytes']
+            )
+        return _shared_pool
@@ -1,12 +1,194 @@
+import atexit
+import gzip
+import json
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import shutil
+import threading
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Dict, Optional
 from api_monitor.config.settings import APIMonitorSettings
+from api_monitor.utils.rate_limit import TokenBucket
+
+# 逐次检查日志（如"API check completed"）使用的extra，丢弃条数附在这类记录上
+SAMPLED = {'sampled': True}
+
+class LazyStr:
+    """延迟格式化的日志参数，只有在日志真正输出时（异步模式下在后台线程）才调用func"""
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return self.func(*self.args)
+
+class TextFormatter(logging.Formatter):
+    """文本格式，抽样丢弃过日志时附上丢弃条数"""
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f" ({suppressed} similar lines suppressed)"
+        return text
+
+class JSONFormatter(logging.Formatter):
+    """每条记录一行JSON，extra中的fields字典并入记录"""
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': record.created,
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            data.update(fields)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            data['suppressed'] = suppressed
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class CheckLogSampler(logging.Filter):
+    """按令牌桶限制逐次检查日志
+
+    调用方先用admit()决定是否记录，被拒绝时不会创建LogRecord；
+    作为过滤器时把累计丢弃条数附在下一条带sampled标记的记录上。
+    """
+    def __init__(self, rate: float, burst: float):
+        super().__init__()
+        self.bucket = TokenBucket(rate, burst)
+        self.suppressed = 0
+
+    def admit(self) -> bool:
+        if self.bucket.try_acquire():
+            return True
+        self.suppressed += 1
+        return False
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.suppressed and getattr(record, 'sampled', False):
+            record.suppressed = self.suppressed
+            self.suppressed = 0
+        return True
+
+class _DeferredQueueHandler(QueueHandler):
+    """入队时不格式化消息，格式化留给后台监听线程"""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class _PerLoggerFileHandler(logging.Handler):
+    """在监听线程中按记录的logger名称写入各自的<name>.log"""
+    def __init__(self, formatter: logging.Formatter):
+        super().__init__()
+        self.setFormatter(formatter)
+        self._handlers: Dict[str, logging.Handler] = {}
+
+    def emit(self, record: logging.LogRecord):
+        handler = self._handlers.get(record.name)
+        if handler is None:
+            handler = _file_handler(record.name, self.formatter)
+            self._handlers[record.name] = handler
+        handler.handle(record)
+
+    def close(self):
+        for handler in self._handlers.values():
+            handler.close()
+        super().close()
+
+def _compress_rotated(plain_path: str, gz_path: str):
+    """在后台压缩轮转出的日志文件"""
+    try:
+        tmp_path = gz_path + '.tmp'
+        with open(plain_path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, gz_path)
+        os.remove(plain_path)
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Failed to compress {plain_path}: {str(e)}")
+
+def _gzip_namer(name: str) -> str:
+    return name + '.gz'
+
+def _gzip_rotator(source: str, dest: str):
+    """轮转时只做重命名，压缩交给后台线程，不阻塞写日志的线程"""
+    plain_path = dest[:-len('.gz')]
+    os.rename(source, plain_path)
+    threading.Thread(target=_compress_rotated, args=(plain_path, dest),
+                     name='log-compress', daemon=True).start()
+
+def _file_handler(name: str, formatter: logging.Formatter) -> logging.Handler:
+    config = APIMonitorSettings.LOG_CONFIG
+    handler = TimedRotatingFileHandler(
+        filename=os.path.join(config['log_dir'], f'{name}.log'),
+        when='midnight',
+        interval=1,
+        backupCount=config['backup_count'],
+        encoding='utf-8'
+    )
+    if config.get('compress_rotated', False):
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    handler.setFormatter(formatter)
+    return handler
+
+def _formatter() -> logging.Formatter:
+    config = APIMonitorSettings.LOG_CONFIG
+    if config.get('format') == 'json':
+        return JSONFormatter()
+    return TextFormatter(config['log_format'])
+
+_sampler: Optional[CheckLogSampler] = None
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_init_lock = threading.Lock()
+
+def _get_sampler() -> Optional[CheckLogSampler]:
+    global _sampler
+    rate = APIMonitorSettings.LOG_CONFIG.get('check_log_rate', 0)
+    if rate and _sampler is None:
+        _sampler = CheckLogSampler(rate, APIMonitorSettings.LOG_CONFIG.get('check_log_burst', rate))
+    return _sampler
+
+def _get_queue_handler() -> QueueHandler:
+    """所有logger共用一个队列处理器和一个后台监听线程"""
+    global _queue_handler, _listener
+    if _queue_handler is None:
+        formatter = _formatter()
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        log_queue: 'queue.SimpleQueue[logging.LogRecord]' = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, console_handler, _PerLoggerFileHandler(formatter))
+        _listener.start()
+        atexit.register(stop_logging)
+        _queue_handler = _DeferredQueueHandler(log_queue)
+    return _queue_handler
+
+def check_log_enabled(logger: logging.Logger) -> bool:
+    """是否输出这一条逐次检查日志（INFO级别且通过抽样），应在构造日志参数前调用"""
+    if not logger.isEnabledFor(logging.INFO):
+        return False
+    return _sampler is None or _sampler.admit()
+
+def stop_logging():
+    """写完队列中剩余的日志并停止后台监听线程"""
+    global _listener
+    with _init_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
 
 def setup_logger(name: str) -> logging.Logger:
-    """设置日志记录器"""
+    """设置日志记录器（LOG_CONFIG['mode']为async时经队列由后台线程写出）"""
     logger = logging.getLogger(name)
-    
+
     # 如果已经设置过handler，直接返回
     if logger.handlers:
         return logger
@@ -16,8 +198,17 @@ def setup_logger(name: str) -> logging.Logger:
     # 确保日志目录存在
     os.makedirs(APIMonitorSettings.LOG_CONFIG['log_dir'], exist_ok=True)
 
+    with _init_lock:
+        sampler = _get_sampler()
+        if sampler is not None:
+            logger.addFilter(sampler)
+
+        if APIMonitorSettings.LOG_CONFIG.get('mode') == 'async':
+            logger.addHandler(_get_queue_handler())
+            return logger
+
     # 创建格式化器
-    formatter = logging.Formatter(APIMonitorSettings.LOG_CONFIG['log_format'])
+    formatter = _formatter()
 
     # 添加控制台处理器
     console_handler = logging.StreamHandler()
@@ -25,14 +216,6 @@ def setup_logger(name: str) -> logging.Logger:
     logger.addHandler(console_handler)
 
     # 添加文件处理器
-    file_handler = TimedRotatingFileHandler(
-        filename=os.path.join(APIMonitorSettings.LOG_CONFIG['log_dir'], f'{name}.log'),
-        when='midnight',
-        interval=1,
-        backupCount=APIMonitorSettings.LOG_CONFIG['backup_count'],
-        encoding='utf-8'
-    )
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    logger.addHandler(_file_handler(name, formatter))
 
     return logger
@@ -1,9 +1,17 @@
 # monitoring_system/api_monitor/api.py
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from datetime import datetime
 
 app = FastAPI()
+# 指标来源（如ServiceMonitor.exporter），需提供render()和state()；由启动进程注入
+app.state.metrics_source = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def attach_metrics_source(source):
+    """注入发布指标快照的对象，/metrics和/state只读取它的当前快照"""
+    app.state.metrics_source = source
 
 @app.get("/health")
 async def health_check():
@@ -15,8 +23,16 @@ async def health_check():
 
 @app.get("/metrics")
 async def get_metrics():
-    """获取监控指标"""
-    return {
-        "timestamp": datetime.now().isoformat(),
-        "status": "ok"
-    }
\ No newline at end of file
+    """Prometheus格式的监控指标"""
+    source = app.state.metrics_source
+    if source is None:
+        return Response("# no metrics source attached\n", status_code=503, media_type=CONTENT_TYPE)
+    return Response(source.render(), media_type=CONTENT_TYPE)
+
+@app.get("/state")
+async def get_state():
+    """当前指标快照（JSON）"""
+    source = app.state.metrics_source
+    if source is None:
+        return {"published": False, "timestamp": datetime.now().isoformat()}
+    return source.state()
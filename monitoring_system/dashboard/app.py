@@ -10,6 +10,8 @@ import asyncio
 from datetime import datetime
 from typing import List, Dict
 
+from metrics.sampler import SystemMetricsSampler
+
 logger = logging.getLogger(__name__)
 
 class DashboardApp:
@@ -17,6 +19,8 @@ class DashboardApp:
         self.app = FastAPI()
         self.setup_routes()
         self.clients: List[WebSocket] = []
+        # 本进程的系统指标由后台线程采样，请求只读取最新快照
+        self.sampler = SystemMetricsSampler()
         self.metrics_store: Dict = {
             "system": {
                 "cpu_percent": 0,
@@ -38,6 +42,21 @@ class DashboardApp:
         self.app.get("/health")(self.health_check)
         self.app.get("/api/metrics")(self.get_metrics)
         self.app.websocket("/ws")(self.websocket_endpoint)
+        self.app.on_event("startup")(self.start_sampler)
+        self.app.on_event("shutdown")(self.stop_sampler)
+
+    async def start_sampler(self):
+        self.sampler.start()
+
+    async def stop_sampler(self):
+        self.sampler.stop()
+
+    def current_metrics(self) -> Dict:
+        """当前指标数据，系统指标取后台采样的最新快照（尚无快照时保留已推送的数据）"""
+        snapshot = self.sampler.latest()
+        if snapshot is None:
+            return self.metrics_store
+        return {**self.metrics_store, "system": snapshot.as_dict()}
 
     async def get_dashboard(self):
         """返回仪表盘页面"""
@@ -52,7 +71,7 @@ class DashboardApp:
 
     async def get_metrics(self):
         """获取当前指标数据"""
-        return self.metrics_store
+        return self.current_metrics()
 
     async def websocket_endpoint(self, websocket: WebSocket):
         """WebSocket连接处理"""
@@ -78,7 +97,7 @@ class DashboardApp:
             try:
                 await client.send_json({
                     "type": "metrics_update",
-                    "data": self.metrics_store
+                    "data": self.current_metrics()
                 })
             except Exception as e:
                 logger.error(f"Failed to send metrics to client: {e}")
@@ -94,7 +113,7 @@ class DashboardApp:
         try:
             await websocket.send_json({
                 "type": "metrics_update",
-                "data": self.metrics_store
+                "data": self.current_metrics()
             })
         except Exception as e:
             logger.error(f"Failed to send metrics update: {e}")
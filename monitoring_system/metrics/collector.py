@@ -4,6 +4,9 @@ from typing import Dict, List, Optional
 import psutil
 import platform
 import os
+import requests
+
+from metrics.sampler import SystemMetricsSampler
 
 @dataclass
 class SystemMetrics:
@@ -29,11 +32,42 @@ class ServiceMetrics:
 
 class MetricsCollector:
     """指标收集器"""
+    def __init__(self, http_pool=None, sampler: Optional[SystemMetricsSampler] = None):
+        # 可注入api_monitor.utils.http_pool.HTTPSessionPool与检查服务共享连接池；
+        # 未注入时使用本收集器自己的keep-alive会话
+        self.http_pool = http_pool
+        self._session = requests.Session()
+        # 可注入已启动的SystemMetricsSampler，系统指标直接读取其最新快照
+        self.sampler = sampler
+        # 建立CPU使用率的基准，之后interval=None的调用返回距此的使用率，而不是首次调用的0
+        psutil.cpu_percent(interval=None)
+
     def collect_system_metrics(self) -> SystemMetrics:
-        """收集系统指标"""
+        """收集系统指标，不阻塞等待CPU采样"""
+        snapshot = self.sampler.latest() if self.sampler is not None else None
+        if snapshot is not None:
+            return SystemMetrics(
+                timestamp=datetime.fromtimestamp(snapshot.timestamp),
+                cpu_percent=snapshot.cpu_percent,
+                memory_percent=snapshot.memory_percent,
+                disk_usage=snapshot.disk_usage,
+                disk_io={
+                    'read_bytes': snapshot.disk_read_bytes,
+                    'write_bytes': snapshot.disk_write_bytes,
+                    'read_rate': snapshot.disk_read_rate,
+                    'write_rate': snapshot.disk_write_rate
+                },
+                network_io={
+                    'bytes_sent': snapshot.network_bytes_sent,
+                    'bytes_recv': snapshot.network_bytes_recv,
+                    'sent_rate': snapshot.network_sent_rate,
+                    'recv_rate': snapshot.network_recv_rate
+                }
+            )
         return SystemMetrics(
             timestamp=datetime.now(),
-            cpu_percent=psutil.cpu_percent(interval=1),
+            # interval=None返回距上次调用（最早为构造时）的CPU使用率，立即返回
+            cpu_percent=psutil.cpu_percent(interval=None),
             memory_percent=psutil.virtual_memory().percent,
             disk_usage=psutil.disk_usage('/').percent,
             disk_io=psutil.disk_io_counters()._asdict(),
@@ -85,9 +119,11 @@ class MetricsCollector:
     def _check_service_response(self, url: str) -> float:
         """检查服务响应时间"""
         try:
-            import requests
             start_time = datetime.now()
-            response = requests.get(url, timeout=5)
+            if self.http_pool is not None:
+                response, _ = self.http_pool.request('GET', url, timeout=5)
+            else:
+                response = self._session.get(url, timeout=5)
             response_time = (datetime.now() - start_time).total_seconds()
             
             if response.status_code == 200:
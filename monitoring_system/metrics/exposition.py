@@ -0,0 +1,179 @@
+# metrics/exposition.py
+import bisect
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import psutil
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+CYCLE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Histogram:
+    """分桶直方图，只由采集循环写入"""
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Tuple[Tuple[int, ...], float, int]:
+        cumulative = []
+        total = 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return tuple(cumulative), self.sum, self.count
+
+class ServiceMetricsExporter:
+    """ServiceMonitor自身指标的Prometheus导出
+
+    采集循环每轮结束时调用publish()，把各服务窗口统计、采集耗时和循环滞后直方图、
+    进程CPU/RSS整理成只读快照并整体替换引用；抓取只拼接文本，不加锁也不重新计算。
+    """
+    def __init__(self):
+        self.cycle_duration = Histogram(CYCLE_BUCKETS)
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.cycles = 0
+        self._process = psutil.Process()
+        self.start_time = self._process.create_time()
+        self._labels: Dict[str, str] = {}  # 服务名 -> 已编码的标签
+        self._snapshot: Optional[Dict] = None
+
+    def observe_cycle(self, duration: float):
+        self.cycle_duration.observe(duration)
+        self.cycles += 1
+
+    def observe_lag(self, lag: float):
+        self.loop_lag.observe(max(0.0, lag))
+
+    def publish(self, services: List[Tuple[str, Dict]], dns: Optional[Dict] = None):
+        """发布快照，services为(服务名, 窗口统计)列表，dns为解析缓存统计"""
+        cpu = self._process.cpu_times()
+        self._snapshot = {
+            'timestamp': time.time(),
+            'services': [(self._service_labels(name), name, stats) for name, stats in services],
+            'cycle': self.cycle_duration.snapshot(),
+            'lag': self.loop_lag.snapshot(),
+            'cycles': self.cycles,
+            'dns': dns,
+            'cpu_seconds': cpu.user + cpu.system,
+            'rss_bytes': self._process.memory_info().rss
+        }
+
+    def _service_labels(self, name: str) -> str:
+        labels = self._labels.get(name)
+        if labels is None:
+            labels = f'service="{_escape(name)}"'
+            self._labels[name] = labels
+        return labels
+
+    def render(self) -> str:
+        """把当前快照编码为Prometheus文本格式"""
+        snapshot = self._snapshot
+        lines: List[str] = []
+        add = lines.append
+
+        def family(name: str, metric_type: str, help_text: str):
+            add(f'# HELP {name} {help_text}')
+            add(f'# TYPE {name} {metric_type}')
+
+        def histogram(name: str, buckets: Sequence[float], data):
+            cumulative, total, count = data
+            for bound, value in zip(buckets, cumulative):
+                add(f'{name}_bucket{{le="{bound}"}} {value}')
+            add(f'{name}_bucket{{le="+Inf"}} {cumulative[-1]}')
+            add(f'{name}_sum {total!r}')
+            add(f'{name}_count {count}')
+
+        family('process_start_time_seconds', 'gauge', 'Start time of the process since unix epoch.')
+        add(f'process_start_time_seconds {self.start_time!r}')
+        if snapshot is None:
+            return '\n'.join(lines) + '\n'
+
+        family('process_cpu_seconds_total', 'counter', 'Total user and system CPU time spent.')
+        add(f'process_cpu_seconds_total {snapshot["cpu_seconds"]!r}')
+        family('process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes.')
+        add(f'process_resident_memory_bytes {snapshot["rss_bytes"]}')
+        family('service_monitor_snapshot_timestamp_seconds', 'gauge',
+               'When the collection loop last published metrics.')
+        add(f'service_monitor_snapshot_timestamp_seconds {snapshot["timestamp"]!r}')
+        family('service_monitor_collection_cycles_total', 'counter', 'Completed collection cycles.')
+        add(f'service_monitor_collection_cycles_total {snapshot["cycles"]}')
+        family('service_monitor_collection_duration_seconds', 'histogram',
+               'Wall time of a full metrics collection.')
+        histogram('service_monitor_collection_duration_seconds', self.cycle_duration.buckets,
+                  snapshot['cycle'])
+        family('service_monitor_scheduler_lag_seconds', 'histogram',
+               'How much later than planned a collection cycle started.')
+        histogram('service_monitor_scheduler_lag_seconds', self.loop_lag.buckets, snapshot['lag'])
+
+        dns = snapshot['dns']
+        if dns is not None:
+            family('service_monitor_dns_cache_lookups_total', 'counter',
+                   'DNS cache lookups by result.')
+            for result in ('hits', 'stale_hits', 'negative_hits', 'misses', 'coalesced'):
+                add(f'service_monitor_dns_cache_lookups_total{{result="{result}"}} {dns[result]}')
+            family('service_monitor_dns_resolutions_failed_total', 'counter',
+                   'DNS resolutions that failed or exceeded the lookup timeout.')
+            for reason in ('failures', 'timeouts'):
+                add(f'service_monitor_dns_resolutions_failed_total{{reason="{reason}"}} '
+                    f'{dns[reason]}')
+
+        services = snapshot['services']
+        family('service_monitor_service_up', 'gauge', 'Whether the last check found the service UP.')
+        for labels, _, stats in services:
+            add(f'service_monitor_service_up{{{labels}}} {stats["up"]}')
+        family('service_monitor_service_window_response_seconds', 'gauge',
+               'Health check response time over the statistics window.')
+        for labels, _, stats in services:
+            for stat in ('avg', 'p95', 'max'):
+                value = stats.get(stat)
+                if value is not None:
+                    add(f'service_monitor_service_window_response_seconds{{{labels},stat="{stat}"}} '
+                        f'{value!r}')
+        family('service_monitor_service_window_up_ratio', 'gauge',
+               'Share of checks in the window that found the service UP.')
+        for labels, _, stats in services:
+            if stats['checks']:
+                add(f'service_monitor_service_window_up_ratio{{{labels}}} {stats["up_ratio"]!r}')
+        return '\n'.join(lines) + '\n'
+
+    def state(self) -> Dict:
+        """当前快照的JSON结构"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'published': False, 'start_time': self.start_time}
+        return {
+            'published': True,
+            'timestamp': snapshot['timestamp'],
+            'start_time': self.start_time,
+            'cycles': snapshot['cycles'],
+            'collection_duration': {'sum': snapshot['cycle'][1], 'count': snapshot['cycle'][2]},
+            'scheduler_lag': {'sum': snapshot['lag'][1], 'count': snapshot['lag'][2]},
+            'process': {'cpu_seconds': snapshot['cpu_seconds'], 'rss_bytes': snapshot['rss_bytes']},
+            'dns': snapshot['dns'],
+            'services': {name: stats for _, name, stats in snapshot['services']}
+        }
+
+def window_stats(entries: Sequence[Dict]) -> Dict:
+    """计算一个服务最近若干次检查的窗口统计"""
+    times = sorted(entry['response_time'] for entry in entries
+                   if entry.get('response_time') is not None)
+    up = sum(1 for entry in entries if entry.get('status') == 'UP')
+    return {
+        'up': 1 if entries and entries[-1].get('status') == 'UP' else 0,
+        'checks': len(entries),
+        'up_ratio': up / len(entries) if entries else None,
+        'avg': sum(times) / len(times) if times else None,
+        'p95': times[min(len(times) - 1, int(0.95 * (len(times) - 1)))] if times else None,
+        'max': times[-1] if times else None
+    }
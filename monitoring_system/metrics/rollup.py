@@ -0,0 +1,221 @@
+# metrics/rollup.py
+
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+# 默认降采样层级：(名称, 分辨率秒, 保留秒)
+DEFAULT_TIERS = (
+    ('1m', 60, 24 * 3600),
+    ('5m', 300, 7 * 24 * 3600),
+    ('1h', 3600, 30 * 24 * 3600),
+)
+
+class LogHistogram:
+    """对数分桶直方图，可合并，分位数相对误差不超过relative_accuracy"""
+    __slots__ = ('gamma', '_log_gamma', 'buckets', 'zero_count', 'count')
+
+    def __init__(self, relative_accuracy: float = 0.02):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: 'LogHistogram'):
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for key, bucket_count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + bucket_count
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """一次遍历计算多个分位数（qs需升序）"""
+        qs = list(qs)
+        if not self.count:
+            return [None] * len(qs)
+        ranks = [q * (self.count - 1) for q in qs]
+        results: List[Optional[float]] = []
+        cumulative = self.zero_count
+        while len(results) < len(ranks) and ranks[len(results)] < cumulative:
+            results.append(0.0)
+        for key in sorted(self.buckets):
+            cumulative += self.buckets[key]
+            while len(results) < len(ranks) and ranks[len(results)] < cumulative:
+                results.append(2 * self.gamma ** key / (self.gamma + 1))
+            if len(results) == len(ranks):
+                break
+        while len(results) < len(ranks):
+            results.append(results[-1] if results else 0.0)
+        return results
+
+@dataclass
+class Aggregate:
+    """一个时间桶内的聚合值"""
+    start: float
+    count: int = 0
+    error_count: int = 0
+    sum: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+    sketch: LogHistogram = field(default_factory=LogHistogram)
+
+    def add(self, value: Optional[float], error: bool = False):
+        self.count += 1
+        if error:
+            self.error_count += 1
+        if value is None:
+            return
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other: 'Aggregate'):
+        self.count += other.count
+        self.error_count += other.error_count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def to_dict(self) -> Dict:
+        p50, p95, p99 = self.sketch.quantiles((0.5, 0.95, 0.99))
+        valued = self.sketch.count
+        return {
+            'start': self.start,
+            'count': self.count,
+            'error_count': self.error_count,
+            'sum': self.sum,
+            'avg': self.sum / valued if valued else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': p50,
+            'p95': p95,
+            'p99': p99
+        }
+
+class RollupTier:
+    """单个分辨率层级，按序列保存按时间排序的聚合桶"""
+    def __init__(self, name: str, resolution: int, retention: float):
+        self.name = name
+        self.resolution = resolution
+        self.retention = retention
+        self.series: Dict[str, Deque[Aggregate]] = {}
+
+    def add(self, series: str, timestamp: float, value: Optional[float], error: bool):
+        start = timestamp - timestamp % self.resolution
+        buckets = self.series.get(series)
+        if buckets is None:
+            buckets = self.series[series] = deque()
+        if not buckets or buckets[-1].start < start:
+            buckets.append(Aggregate(start))
+            self._expire(buckets, timestamp)
+            buckets[-1].add(value, error)
+            return
+        # 乱序到达的样本：从最新的桶往回找（通常只差一两个桶）
+        for index in range(len(buckets) - 1, -1, -1):
+            bucket = buckets[index]
+            if bucket.start == start:
+                bucket.add(value, error)
+                return
+            if bucket.start < start:
+                buckets.insert(index + 1, Aggregate(start))
+                buckets[index + 1].add(value, error)
+                return
+        if start > timestamp - self.retention:
+            buckets.appendleft(Aggregate(start))
+            buckets[0].add(value, error)
+
+    def _expire(self, buckets: Deque[Aggregate], now: float):
+        cutoff = now - self.retention
+        while buckets and buckets[0].start + self.resolution <= cutoff:
+            buckets.popleft()
+
+    def oldest(self, series: str) -> Optional[float]:
+        buckets = self.series.get(series)
+        return buckets[0].start if buckets else None
+
+    def query(self, series: str, start: float, end: float) -> List[Aggregate]:
+        buckets = self.series.get(series)
+        if not buckets:
+            return []
+        return [b for b in buckets if b.start + self.resolution > start and b.start <= end]
+
+class RollupPipeline:
+    """多分辨率降采样管道
+
+    原始样本到达时同时累加进每个层级的当前桶，各层级按自己的保留期淘汰旧桶；
+    查询时按时间跨度选择满足保留期且点数不超过max_points的最细层级。
+    """
+    def __init__(self, tiers: Iterable[Tuple[str, int, float]] = DEFAULT_TIERS,
+                 max_points: int = 2500):
+        self.tiers = [RollupTier(name, resolution, retention)
+                      for name, resolution, retention in sorted(tiers, key=lambda t: t[1])]
+        self.max_points = max_points
+        self.latest: Dict[str, float] = {}
+
+    def add(self, series: str, timestamp: float, value: Optional[float], error: bool = False):
+        """写入一个原始样本"""
+        for tier in self.tiers:
+            tier.add(series, timestamp, value, error)
+        if timestamp > self.latest.get(series, 0):
+            self.latest[series] = timestamp
+
+    def select_tier(self, start: float, end: float, now: Optional[float] = None) -> RollupTier:
+        """选择能覆盖[start, end]的最细层级"""
+        if now is None:
+            now = max(self.latest.values(), default=end)
+        for tier in self.tiers:
+            if start >= now - tier.retention and (end - start) / tier.resolution <= self.max_points:
+                return tier
+        return self.tiers[-1]
+
+    def query(self, series: str, start: float, end: float,
+              now: Optional[float] = None) -> Dict:
+        """查询序列在时间范围内的聚合点"""
+        tier = self.select_tier(start, end, now)
+        return {
+            'series': series,
+            'tier': tier.name,
+            'resolution': tier.resolution,
+            'points': [bucket.to_dict() for bucket in tier.query(series, start, end)]
+        }
+
+    def summarize(self, series: str, start: float, end: float,
+                  now: Optional[float] = None) -> Dict:
+        """把时间范围内的聚合点合并成一个汇总值"""
+        tier = self.select_tier(start, end, now)
+        total = Aggregate(start)
+        for bucket in tier.query(series, start, end):
+            total.merge(bucket)
+        summary = total.to_dict()
+        summary['tier'] = tier.name
+        return summary
+
+    def series_names(self) -> List[str]:
+        return sorted(self.latest)
+
+def tiers_from_config(monitor_config: Dict) -> List[Tuple[str, int, float]]:
+    """从services.json的monitor配置读取层级，未配置时使用默认层级；
+    5分钟层级的保留期默认取history_retention_days"""
+    configured = monitor_config.get('rollup_tiers')
+    if configured:
+        return [(tier['name'], tier['resolution_seconds'], tier['retention_days'] * 86400)
+                for tier in configured]
+    retention_days = monitor_config.get('history_retention_days')
+    tiers = []
+    for name, resolution, retention in DEFAULT_TIERS:
+        if name == '5m' and retention_days:
+            retention = retention_days * 86400
+        tiers.append((name, resolution, retention))
+    return tiers
@@ -0,0 +1,131 @@
+# metrics/sampler.py
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    """一次系统指标采样，发布后不再修改"""
+    timestamp: float
+    cpu_percent: float  # 两次采样之间的CPU使用率
+    memory_percent: float
+    memory_used: int
+    memory_total: int
+    disk_usage: float
+    disk_used: int
+    disk_total: int
+    disk_read_bytes: int
+    disk_write_bytes: int
+    disk_read_rate: float  # 字节/秒
+    disk_write_rate: float
+    network_bytes_sent: int
+    network_bytes_recv: int
+    network_sent_rate: float  # 字节/秒
+    network_recv_rate: float
+
+    def as_dict(self) -> Dict:
+        """转为指标字典，timestamp为ISO格式的采样时间"""
+        metrics = asdict(self)
+        metrics['timestamp'] = datetime.fromtimestamp(self.timestamp).isoformat()
+        return metrics
+
+class _Counters:
+    """计算速率所需的累计计数"""
+    __slots__ = ('time', 'cpu_busy', 'cpu_total', 'disk_read', 'disk_write',
+                 'net_sent', 'net_recv')
+
+    def __init__(self):
+        self.time = time.monotonic()
+        cpu = psutil.cpu_times()
+        self.cpu_total = sum(cpu)
+        # Linux上guest时间已计入user/nice，不能重复计算
+        self.cpu_total -= getattr(cpu, 'guest', 0) + getattr(cpu, 'guest_nice', 0)
+        self.cpu_busy = self.cpu_total - cpu.idle - getattr(cpu, 'iowait', 0)
+        disk = psutil.disk_io_counters()
+        self.disk_read = disk.read_bytes if disk is not None else 0
+        self.disk_write = disk.write_bytes if disk is not None else 0
+        net = psutil.net_io_counters()
+        self.net_sent = net.bytes_sent
+        self.net_recv = net.bytes_recv
+
+def _rate(current: int, previous: int, elapsed: float) -> float:
+    # 计数器回绕或重置时不输出负速率
+    return max(0, current - previous) / elapsed if elapsed > 0 else 0.0
+
+class SystemMetricsSampler:
+    """后台线程按固定间隔采集系统指标
+
+    CPU使用率和磁盘、网络字节速率由相邻两次采样的累计计数之差计算，不调用阻塞的
+    psutil.cpu_percent(interval=...)。每次采样生成不可变的SystemSnapshot并整体替换引用，
+    事件循环和其他线程通过latest()读取，不加锁也不等待采样。
+    """
+    def __init__(self, interval: float = 5, disk_path: str = '/'):
+        self.interval = interval
+        self.disk_path = disk_path
+        self._snapshot: Optional[SystemSnapshot] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动采样线程，已启动时不做任何事"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def latest(self) -> Optional[SystemSnapshot]:
+        """最近一次采样，尚未完成首次采样时为None"""
+        return self._snapshot
+
+    def _run(self):
+        previous = _Counters()
+        # 首次采样不等完整间隔，使启动后很快就有可用快照
+        wait = min(self.interval, 1.0)
+        while not self._stop_event.wait(wait):
+            try:
+                current = _Counters()
+                self._snapshot = self._sample(previous, current)
+                previous = current
+            except Exception as e:
+                logger.error(f"Error sampling system metrics: {e}")
+            wait = self.interval
+
+    def _sample(self, previous: _Counters, current: _Counters) -> SystemSnapshot:
+        elapsed = current.time - previous.time
+        cpu_total = current.cpu_total - previous.cpu_total
+        cpu_percent = 100.0 * (current.cpu_busy - previous.cpu_busy) / cpu_total \
+            if cpu_total > 0 else 0.0
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        return SystemSnapshot(
+            timestamp=time.time(),
+            cpu_percent=round(min(100.0, max(0.0, cpu_percent)), 1),
+            memory_percent=memory.percent,
+            memory_used=memory.used,
+            memory_total=memory.total,
+            disk_usage=disk.percent,
+            disk_used=disk.used,
+            disk_total=disk.total,
+            disk_read_bytes=current.disk_read,
+            disk_write_bytes=current.disk_write,
+            disk_read_rate=_rate(current.disk_read, previous.disk_read, elapsed),
+            disk_write_rate=_rate(current.disk_write, previous.disk_write, elapsed),
+            network_bytes_sent=current.net_sent,
+            network_bytes_recv=current.net_recv,
+            network_sent_rate=_rate(current.net_sent, previous.net_sent, elapsed),
+            network_recv_rate=_rate(current.net_recv, previous.net_recv, elapsed)
+        )
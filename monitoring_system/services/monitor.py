@@ -1,26 +1,62 @@
 # services/monitor.py
 
 import asyncio
+import itertools
 import logging
-from typing import Dict, Any
+from collections import deque
+from typing import Dict, Any, Optional
 from datetime import datetime
+import socket
 import psutil
 import aiohttp
 import json
 from pathlib import Path
 
+from metrics.exposition import ServiceMetricsExporter, window_stats
+from metrics.rollup import RollupPipeline, tiers_from_config
+from metrics.sampler import SystemMetricsSampler
+from services.resolver import CachingResolver
+
 logger = logging.getLogger(__name__)
 
+# 写入降采样层级的系统指标
+SYSTEM_ROLLUP_METRICS = ("cpu_percent", "memory_percent", "disk_usage")
+
 class ServiceMonitor:
     """服务监控类"""
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, store=None):
         self.config = self._load_config(config_path)
+        # 可选的检查结果持久化存储（需提供append(timestamp, endpoint, status_code, latency, error_class)）
+        self.store = store
         self.services_status = {}
         self.last_check_time = None
         self.metrics_history = {
-            'system': [],
+            'system': deque(),
             'services': {}
         }
+        monitor_config = self.config.get('monitor', {})
+        # 原始样本按时间保留，更长时间范围的查询走降采样层级
+        self.raw_retention = monitor_config.get('raw_retention_hours', 24) * 3600
+        self.rollups = RollupPipeline(tiers_from_config(monitor_config))
+        # 自身运行指标，每轮采集后发布快照供/metrics读取
+        self.statistics_window = monitor_config.get('statistics_window', 60)
+        self.exporter = ServiceMetricsExporter()
+        # 所有健康检查共用的DNS缓存
+        self.resolver = CachingResolver(**monitor_config.get('dns', {}))
+        # 健康检查共用的长连接会话，在监控循环的事件循环中首次检查时创建
+        http_config = monitor_config.get('http', {})
+        self.max_connections = http_config.get('max_connections', 100)
+        self.max_per_host = http_config.get('max_per_host', 10)
+        # keep-alive时间需大于检查间隔，连接才能跨周期复用
+        self.keepalive_timeout = http_config.get('keepalive_timeout', 120)
+        self.max_concurrent_checks = http_config.get('max_concurrent_checks', 20)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._check_limit: Optional[asyncio.Semaphore] = None
+        # 系统指标由后台线程按自己的间隔采样，采集周期只读取最近的快照
+        self.sampler = SystemMetricsSampler(
+            interval=monitor_config.get('system_metrics_interval', 60)
+        )
+        self._last_system_sample: Optional[float] = None
 
     def _load_config(self, config_path: str) -> Dict:
         """加载配置文件"""
@@ -36,7 +72,9 @@ class ServiceMonitor:
                 "services": [],
                 "monitor": {
                     "check_interval": 30,
-                    "system_metrics_interval": 60
+                    "system_metrics_interval": 60,
+                    "history_retention_days": 7,
+                    "raw_retention_hours": 24
                 },
                 "thresholds": {
                     "cpu_percent": 80,
@@ -55,9 +93,12 @@ class ServiceMonitor:
                 "services": {}
             }
 
-            # 收集服务指标
-            for service in self.config['services']:
-                service_metrics = await self._collect_service_metrics(service)
+            # 并发收集服务指标，周期耗时取决于最慢的服务
+            services = self.config['services']
+            results = await asyncio.gather(*(
+                self._collect_service_metrics_limited(service) for service in services
+            ))
+            for service, service_metrics in zip(services, results):
                 metrics['services'][service['name']] = service_metrics
 
             self.last_check_time = datetime.now()
@@ -73,40 +114,25 @@ class ServiceMonitor:
             }
 
     async def _collect_system_metrics(self) -> Dict[str, float]:
-        """收集系统指标"""
+        """读取后台采样的最新系统指标，不阻塞事件循环"""
         try:
-            # CPU使用率（使用interval=1以获得更准确的读数）
-            cpu_percent = psutil.cpu_percent(interval=1)
-            
-            # 内存使用情况
-            memory = psutil.virtual_memory()
-            
-            # 磁盘使用情况
-            disk = psutil.disk_usage('/')
-            
-            # 网络IO
-            net_io = psutil.net_io_counters()
-            
-            metrics = {
-                "cpu_percent": cpu_percent,
-                "memory_percent": memory.percent,
-                "memory_used": memory.used,
-                "memory_total": memory.total,
-                "disk_usage": disk.percent,
-                "disk_used": disk.used,
-                "disk_total": disk.total,
-                "network_bytes_sent": net_io.bytes_sent,
-                "network_bytes_recv": net_io.bytes_recv,
-                "timestamp": datetime.now().isoformat()
-            }
+            self.sampler.start()
+            snapshot = self.sampler.latest()
+            if snapshot is None:
+                return {
+                    "cpu_percent": 0,
+                    "memory_percent": 0,
+                    "disk_usage": 0,
+                    "error": "system metrics not sampled yet"
+                }
+            metrics = snapshot.as_dict()
 
-            # 添加到历史记录
-            self.metrics_history['system'].append(metrics)
-            
-            # 保持历史记录在合理范围内（例如保留最近24小时的数据）
-            max_history = 24 * 60  # 24小时，每分钟一个数据点
-            if len(self.metrics_history['system']) > max_history:
-                self.metrics_history['system'] = self.metrics_history['system'][-max_history:]
+            # 每个采样只写入一次历史记录和降采样层级（采样间隔可能大于检查间隔）
+            if snapshot.timestamp != self._last_system_sample:
+                self._last_system_sample = snapshot.timestamp
+                self._append_history(self.metrics_history['system'], snapshot.timestamp, metrics)
+                for name in SYSTEM_ROLLUP_METRICS:
+                    self.rollups.add(f"system.{name}", snapshot.timestamp, metrics[name])
 
             return metrics
 
@@ -119,6 +145,13 @@ class ServiceMonitor:
                 "error": str(e)
             }
 
+    async def _collect_service_metrics_limited(self, service_config: Dict) -> Dict[str, Any]:
+        """在并发上限内收集单个服务的指标，排队时间不计入检查超时和响应时间"""
+        if self._check_limit is None:
+            self._check_limit = asyncio.Semaphore(self.max_concurrent_checks)
+        async with self._check_limit:
+            return await self._collect_service_metrics(service_config)
+
     async def _collect_service_metrics(self, service_config: Dict) -> Dict[str, Any]:
         """收集服务指标"""
         try:
@@ -130,44 +163,48 @@ class ServiceMonitor:
                 "last_check": start_time.isoformat()
             }
 
-            # 检查进程
+            timeout = service_config.get("timeout", 5)
+
+            # 检查进程（psutil遍历较慢，在线程中执行以免阻塞其他服务的检查）
             if "process_name" in service_config:
-                service_metrics["process_running"] = self._check_process(
-                    service_config["process_name"]
+                service_metrics["process_running"] = await self._run_blocking_check(
+                    self._check_process, service_config["process_name"], timeout
                 )
 
             # 检查端口
             if "port" in service_config:
-                service_metrics["port_listening"] = self._check_port(
-                    service_config["port"]
+                service_metrics["port_listening"] = await self._run_blocking_check(
+                    self._check_port, service_config["port"], timeout
                 )
 
             # 检查健康检查URL
             if "health_check_url" in service_config:
-                response_time, status_code = await self._check_health_endpoint(
+                response_time, status_code, error_class = await self._check_health_endpoint(
                     service_config["health_check_url"],
-                    service_config.get("timeout", 5)
+                    timeout
                 )
                 service_metrics.update({
                     "response_time": response_time,
                     "status_code": status_code,
                     "status": "UP" if status_code == 200 else "DOWN"
                 })
+                if error_class is not None:
+                    service_metrics["error_class"] = error_class
+                self._persist_check(service_config["name"], start_time, response_time,
+                                    status_code, error_class)
 
-            # 更新服务历史记录
-            if service_config["name"] not in self.metrics_history['services']:
-                self.metrics_history['services'][service_config["name"]] = []
-            
-            self.metrics_history['services'][service_config["name"]].append({
+            # 更新服务历史记录并写入降采样层级
+            history = self.metrics_history['services'].setdefault(service_config["name"], deque())
+            self._append_history(history, start_time.timestamp(), {
                 "timestamp": start_time.isoformat(),
                 **service_metrics
             })
-
-            # 保持历史记录在合理范围内
-            max_history = 24 * 60  # 24小时，每分钟一个数据点
-            if len(self.metrics_history['services'][service_config["name"]]) > max_history:
-                self.metrics_history['services'][service_config["name"]] = \
-                    self.metrics_history['services'][service_config["name"]][-max_history:]
+            self.rollups.add(
+                f"service.{service_config['name']}.response_time",
+                start_time.timestamp(),
+                service_metrics["response_time"],
+                error=service_metrics["status"] != "UP"
+            )
 
             return service_metrics
 
@@ -180,6 +217,38 @@ class ServiceMonitor:
                 "last_check": datetime.now().isoformat()
             }
 
+    def _append_history(self, history: deque, timestamp: float, entry: Dict):
+        """追加原始样本并淘汰超过原始保留期的样本"""
+        history.append((timestamp, entry))
+        cutoff = timestamp - self.raw_retention
+        while history and history[0][0] < cutoff:
+            history.popleft()
+
+    def _persist_check(self, service_name: str, start_time: datetime,
+                       response_time, status_code, error_class: Optional[str] = None):
+        """把健康检查结果写入持久化存储"""
+        if self.store is None:
+            return
+        try:
+            self.store.append(
+                start_time.timestamp(),
+                service_name,
+                status_code,
+                response_time if response_time is not None else 0.0,
+                error_class
+            )
+        except Exception as e:
+            logger.error(f"Failed to persist check result for service {service_name}: {e}")
+
+    async def _run_blocking_check(self, check, target, timeout: float) -> bool:
+        """在线程池中执行阻塞的本地检查，超过timeout视为检查失败"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(None, check, target), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{check.__name__} for {target} timed out after {timeout}s")
+            return False
+
     def _check_process(self, process_name: str) -> bool:
         """检查进程是否运行"""
         try:
@@ -203,22 +272,59 @@ class ServiceMonitor:
             return False
 
     async def _check_health_endpoint(self, url: str, timeout: int) -> tuple:
-        """检查健康检查端点"""
-        async with aiohttp.ClientSession() as session:
-            try:
-                start_time = datetime.now()
-                async with session.get(url, timeout=timeout) as response:
-                    response_time = (datetime.now() - start_time).total_seconds()
-                    return response_time, response.status
-            except Exception as e:
-                logger.error(f"Error checking health endpoint {url}: {e}")
-                return None, None
+        """检查健康检查端点，返回(响应时间, 状态码, 错误类型)
+
+        错误类型为dns（解析失败或超时）、timeout或request，成功时为None。
+        """
+        session = self._get_session()
+        try:
+            start_time = datetime.now()
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                response_time = (datetime.now() - start_time).total_seconds()
+                return response_time, response.status, None
+        except aiohttp.ClientConnectorError as e:
+            # 解析失败时os_error为解析器抛出的socket.gaierror
+            if isinstance(e.os_error, socket.gaierror):
+                logger.error(f"DNS resolution failed for health endpoint {url}: {e}")
+                return None, None, 'dns'
+            logger.error(f"Error checking health endpoint {url}: {e}")
+            return None, None, 'request'
+        except asyncio.TimeoutError:
+            logger.error(f"Health endpoint {url} timed out after {timeout}s")
+            return None, None, 'timeout'
+        except Exception as e:
+            logger.error(f"Error checking health endpoint {url}: {e}")
+            return None, None, 'request'
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取共用的长连接会话，连接在各周期的健康检查间复用"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                resolver=self.resolver,
+                use_dns_cache=False
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        """停止系统指标采样，关闭共用会话和DNS缓存中进行中的解析"""
+        self.sampler.stop()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        await self.resolver.close()
 
     async def start_monitoring(self):
         """启动监控"""
         logger.info("Starting service monitoring...")
+        loop = asyncio.get_running_loop()
+        self.sampler.start()
         try:
             while True:
+                cycle_start = loop.time()
                 metrics = await self.collect_metrics()
                 
                 # 这里可以添加将指标发送到仪表盘的代码
@@ -227,12 +333,33 @@ class ServiceMonitor:
                 
                 # 检查阈值并触发告警
                 await self._check_thresholds(metrics)
-                
-                # 等待下一次检查
-                await asyncio.sleep(self.config['monitor']['check_interval'])
+
+                self.exporter.observe_cycle(loop.time() - cycle_start)
+                self.publish_metrics()
+
+                # 等待下一次检查，多睡的时间记为调度滞后
+                interval = self.config['monitor']['check_interval']
+                sleep_start = loop.time()
+                await asyncio.sleep(interval)
+                self.exporter.observe_lag(loop.time() - sleep_start - interval)
         except Exception as e:
             logger.error(f"Error in monitoring loop: {e}")
             raise
+        finally:
+            await self.close()
+
+    def publish_metrics(self):
+        """按最近statistics_window次检查计算各服务窗口统计并发布指标快照"""
+        try:
+            services = []
+            for service in self.config['services']:
+                history = self.metrics_history['services'].get(service['name'], ())
+                recent = [entry for _, entry in
+                          itertools.islice(reversed(history), self.statistics_window)]
+                services.append((service['name'], window_stats(recent[::-1])))
+            self.exporter.publish(services, dns=self.resolver.get_stats())
+        except Exception as e:
+            logger.error(f"Error publishing self metrics: {e}")
 
     async def _check_thresholds(self, metrics: Dict):
         """检查指标是否超过阈值"""
@@ -258,5 +385,17 @@ class ServiceMonitor:
                 )
 
     def get_metrics_history(self) -> Dict:
-        """获取历史指标数据"""
-        return self.metrics_history
\ No newline at end of file
+        """获取原始历史指标数据"""
+        return {
+            'system': [entry for _, entry in self.metrics_history['system']],
+            'services': {
+                name: [entry for _, entry in history]
+                for name, history in self.metrics_history['services'].items()
+            }
+        }
+
+    def query_history(self, series: str, start: float, end: Optional[float] = None) -> Dict:
+        """按时间范围查询序列（如system.cpu_percent、service.<名称>.response_time），
+        自动选择覆盖该范围且点数不超限的最细降采样层级"""
+        now = datetime.now().timestamp()
+        return self.rollups.query(series, start, now if end is None else end, now=now)
\ No newline at end of file
@@ -0,0 +1,135 @@
+# services/resolver.py
+
+import asyncio
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from aiohttp.abc import AbstractResolver
+
+logger = logging.getLogger(__name__)
+
+class DNSResolutionError(socket.gaierror):
+    """DNS解析失败或超时"""
+
+class CachingResolver(AbstractResolver):
+    """带缓存的aiohttp解析器，可在多个事件循环和线程间共享
+
+    与api_monitor/utils/dns_cache.py的DNSCache行为一致：解析在固定大小的线程池中调用系统
+    getaddrinfo，缓存、进行中的解析和统计由同一把锁保护，同一主机名的并发查询共用一个Future。
+    系统解析器不返回记录TTL，成功结果按ttl缓存；过期后stale_ttl内直接返回旧结果并在后台刷新，
+    刷新失败时继续使用旧结果；解析失败按negative_ttl缓存；等待超过timeout按解析失败处理。
+    """
+    def __init__(self, ttl: float = 60, negative_ttl: float = 10, stale_ttl: float = 300,
+                 timeout: float = 5, max_entries: int = 10000, workers: int = 8):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dns')
+        # (主机名, 地址族) -> (地址列表或None, 错误信息, 过期时间, 可用旧结果的截止时间)
+        self._entries: 'OrderedDict[Tuple[str, int], Tuple]' = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'negative_hits': 0, 'misses': 0,
+                      'coalesced': 0, 'refreshes': 0, 'failures': 0, 'timeouts': 0}
+
+    async def resolve(self, host: str, port: int = 0,
+                      family: socket.AddressFamily = socket.AF_INET) -> List[Dict]:
+        addresses = await self._lookup(host, family)
+        return [{
+            'hostname': host,
+            'host': address,
+            'port': port,
+            'family': address_family,
+            'proto': 0,
+            'flags': socket.AI_NUMERICHOST
+        } for address_family, address in addresses]
+
+    async def _lookup(self, host: str, family: int) -> List[Tuple[int, str]]:
+        key = (host.rstrip('.').lower(), family)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                addresses, error, expires, stale_until = entry
+                self._entries.move_to_end(key)
+                if now < expires:
+                    if error is not None:
+                        self.stats['negative_hits'] += 1
+                        raise DNSResolutionError(*error)
+                    self.stats['hits'] += 1
+                    return addresses
+                if addresses is not None and now < stale_until:
+                    self.stats['stale_hits'] += 1
+                    if key not in self._inflight:
+                        self.stats['refreshes'] += 1
+                        self._inflight[key] = self._executor.submit(self._resolve, key)
+                    return addresses
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+            else:
+                self.stats['misses'] += 1
+                future = self._inflight[key] = self._executor.submit(self._resolve, key)
+        try:
+            # shield避免一个调用方超时或取消时连带取消其他调用方共享的解析
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                          self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise DNSResolutionError(
+                socket.EAI_AGAIN, f"DNS lookup for {host} timed out after {self.timeout}s"
+            ) from None
+
+    def _resolve(self, key: Tuple[str, int]) -> List[Tuple[int, str]]:
+        """在解析线程中调用getaddrinfo并写入缓存"""
+        host, family = key
+        try:
+            infos = socket.getaddrinfo(host, None, family, socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys((info[0], info[4][0]) for info in infos))
+        except OSError as e:
+            error = (getattr(e, 'errno', None),
+                     f"DNS lookup for {host} failed: {e.strerror or str(e)}")
+            with self._lock:
+                self.stats['failures'] += 1
+                self._inflight.pop(key, None)
+                entry = self._entries.get(key)
+                now = time.monotonic()
+                if entry is not None and entry[0] is not None and now < entry[3]:
+                    logger.warning(f"DNS refresh for {host} failed, serving stale addresses: {e}")
+                else:
+                    self._store(key, (None, error, now + self.negative_ttl,
+                                      now + self.negative_ttl))
+            raise DNSResolutionError(*error) from e
+        with self._lock:
+            now = time.monotonic()
+            self._inflight.pop(key, None)
+            self._store(key, (addresses, None, now + self.ttl, now + self.ttl + self.stale_ttl))
+        return addresses
+
+    def _store(self, key: Tuple[str, int], entry: Tuple):
+        """写入缓存项并淘汰最久未用的（调用方需持有锁）"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计"""
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries), 'inflight': len(self._inflight)}
+
+    async def close(self):
+        """取消尚未开始的解析并关闭解析线程池，不等待进行中的getaddrinfo"""
+        with self._lock:
+            for future in self._inflight.values():
+                future.cancel()
+            self._inflight.clear()
+        self._executor.shutdown(wait=False)
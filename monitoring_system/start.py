@@ -25,18 +25,21 @@ def start_dashboard():
     from dashboard.app import app
     uvicorn.run(app, host="0.0.0.0", port=8080)
 
-def start_api_server():
-    """启动API服务器"""
+async def serve_api(monitor):
+    """在监控进程内运行API服务器，/metrics直接读取监控循环发布的快照"""
     import uvicorn
-    from api_monitor.api import app
-    uvicorn.run(app, host="localhost", port=8000)
+    from api_monitor.api import app, attach_metrics_source
+    attach_metrics_source(monitor.exporter)
+    server = uvicorn.Server(uvicorn.Config(app, host="localhost", port=8000, log_level="warning"))
+    await server.serve()
 
 async def run_service_monitor():
-    """运行服务监控"""
+    """运行服务监控和API服务器"""
     from services.monitor import ServiceMonitor
     config_path = os.path.join(current_dir, 'config', 'services.json')
     monitor = ServiceMonitor(config_path)
-    await monitor.start_monitoring()
+    logger.info("API server started on http://localhost:8000")
+    await asyncio.gather(monitor.start_monitoring(), serve_api(monitor))
 
 async def main():
     """主程序入口"""
@@ -46,12 +49,7 @@ async def main():
         dashboard_process.start()
         logger.info("Dashboard started on http://localhost:8080")
 
-        # 启动API服务器进程
-        api_process = Process(target=start_api_server)
-        api_process.start()
-        logger.info("API server started on http://localhost:8000")
-
-        # 运行服务监控
+        # 运行服务监控（API服务器在同一进程内）
         await run_service_monitor()
 
     except KeyboardInterrupt:
@@ -63,8 +61,6 @@ async def main():
         # 清理进程
         if 'dashboard_process' in locals():
             dashboard_process.terminate()
-        if 'api_process' in locals():
-            api_process.terminate()
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,163 @@
+# tests/test_circuit_breaker.py
+import threading
+from datetime import datetime
+
+import pytest
+
+from api_monitor.core import circuit_breaker as circuit_breaker_module
+from api_monitor.core.circuit_breaker import BreakerState, CircuitBreaker
+from api_monitor.models.api import APIResponse, ErrorType
+
+URL = 'https://api.example.com/health'
+SAME_HOST_URL = 'https://api.example.com/status'
+
+class FakeClock:
+    """替换熔断器使用的time模块，测试中手动推进时间"""
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker_module, 'time', fake)
+    return fake
+
+@pytest.fixture
+def breaker():
+    instance = CircuitBreaker(failure_threshold=3, probe_interval=30, probe_timeout=0.5)
+    instance.probes = []
+    instance.probe_error = None
+
+    def fake_probe(key):
+        instance.probes.append(key)
+        return instance.probe_error
+    instance._tcp_probe = fake_probe
+    yield instance
+    instance.close()
+
+def _result(error_type=None, status_code=None) -> APIResponse:
+    return APIResponse(
+        status_code=status_code,
+        response_time=0.1,
+        timestamp=datetime.now(),
+        error=None if error_type is None else f"{error_type} error",
+        success=error_type is None,
+        error_type=error_type
+    )
+
+def _open(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record(URL, _result(ErrorType.TIMEOUT))
+
+def test_opens_after_consecutive_host_failures(clock, breaker):
+    assert breaker.record(URL, _result(ErrorType.TIMEOUT)) is None
+    assert breaker.record(URL, _result(ErrorType.REQUEST)) is None
+    assert breaker.record(URL, _result(ErrorType.DNS)) == (BreakerState.CLOSED,
+                                                           BreakerState.OPEN)
+    assert breaker.state(URL) == BreakerState.OPEN
+    assert breaker.state(SAME_HOST_URL) == BreakerState.OPEN  # 按主机熔断
+    assert breaker.get_stats()['api.example.com:443']['open_count'] == 1
+
+@pytest.mark.parametrize('result', [
+    _result(status_code=200),
+    _result(ErrorType.UNEXPECTED, status_code=500),
+    _result(ErrorType.ASSERTION, status_code=200)
+])
+def test_http_response_resets_failure_count(clock, breaker, result):
+    breaker.record(URL, _result(ErrorType.TIMEOUT))
+    breaker.record(URL, _result(ErrorType.TIMEOUT))
+    breaker.record(URL, result)  # 收到HTTP响应说明主机可达
+    breaker.record(URL, _result(ErrorType.TIMEOUT))
+
+    assert breaker.failures(URL) == 1
+    assert breaker.state(URL) == BreakerState.CLOSED
+
+def test_open_circuit_fails_fast_until_probe_is_due(clock, breaker):
+    _open(breaker)
+
+    reason, half_open = breaker.before_check(URL)
+
+    assert reason is not None and 'Circuit open' in reason
+    assert not half_open
+    assert breaker.probes == []
+
+def test_successful_probe_moves_to_half_open_then_closed(clock, breaker):
+    _open(breaker)
+    clock.now += 30
+
+    assert breaker.before_check(URL) == (None, True)
+    assert breaker.state(URL) == BreakerState.HALF_OPEN
+    assert breaker.before_check(URL) == (None, False)  # 半开期间照常执行完整检查
+
+    assert breaker.record(URL, _result(status_code=200)) == (BreakerState.HALF_OPEN,
+                                                             BreakerState.CLOSED)
+    assert breaker.failures(URL) == 0
+
+def test_failed_check_in_half_open_reopens(clock, breaker):
+    _open(breaker)
+    clock.now += 30
+    breaker.before_check(URL)
+
+    assert breaker.record(URL, _result(ErrorType.TIMEOUT)) == (BreakerState.HALF_OPEN,
+                                                               BreakerState.OPEN)
+    assert breaker.before_check(URL)[0] is not None
+    assert breaker.get_stats()['api.example.com:443']['open_count'] == 1
+
+def test_failed_probe_stays_open_and_waits_another_interval(clock, breaker):
+    _open(breaker)
+    clock.now += 30
+    breaker.probe_error = 'Connection refused'
+
+    reason, half_open = breaker.before_check(URL)
+
+    assert 'TCP probe failed: Connection refused' in reason
+    assert not half_open
+    assert breaker.state(URL) == BreakerState.OPEN
+    clock.now += 10
+    breaker.before_check(URL)
+    assert len(breaker.probes) == 1
+
+def test_circuit_open_results_are_not_recorded(clock, breaker):
+    _open(breaker)
+    clock.now += 30
+    breaker.before_check(URL)
+
+    assert breaker.record(URL, _result(ErrorType.CIRCUIT_OPEN)) is None
+    assert breaker.state(URL) == BreakerState.HALF_OPEN
+
+def test_batch_probes_once_per_host(clock, breaker):
+    other = 'http://other.example.com:8080/health'
+    _open(breaker)
+    for _ in range(3):
+        breaker.record(other, _result(ErrorType.REQUEST))
+    clock.now += 30
+
+    decisions = breaker.before_checks([URL, SAME_HOST_URL, other, 'https://ok.example.com/'])
+
+    assert sorted(breaker.probes) == [('api.example.com', 443), ('other.example.com', 8080)]
+    assert decisions[URL] == decisions[SAME_HOST_URL] == (None, True)
+    assert decisions[other] == (None, True)
+    assert decisions['https://ok.example.com/'] == (None, False)
+
+def test_batch_probes_run_concurrently():
+    breaker = CircuitBreaker(failure_threshold=1, probe_interval=0, probe_timeout=0.5)
+    barrier = threading.Barrier(4, timeout=5)
+
+    def slow_probe(key):
+        barrier.wait()  # 四个探测同时进行才能全部通过
+        return None
+    breaker._tcp_probe = slow_probe
+    urls = [f"http://host-{index}.example.com/" for index in range(4)]
+    for url in urls:
+        breaker.record(url, _result(ErrorType.TIMEOUT))
+
+    decisions = breaker.before_checks(urls)
+    breaker.close()
+
+    assert all(decision == (None, True) for decision in decisions.values())
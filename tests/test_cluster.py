@@ -0,0 +1,110 @@
+# tests/test_cluster.py
+import pytest
+
+from api_monitor.cluster import coordinator as coordinator_module
+from api_monitor.cluster.backend import SQLiteCoordinationBackend
+from api_monitor.cluster.coordinator import ClusterCoordinator
+
+PARTITIONS = 32
+LEASE_TTL = 90
+
+class FakeClock:
+    """替换协调器使用的time模块，测试中手动推进时间"""
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(coordinator_module, 'time', fake)
+    return fake
+
+@pytest.fixture
+def make_node(tmp_path):
+    db_path = str(tmp_path / 'cluster.db')
+
+    def make(node_id: str) -> ClusterCoordinator:
+        # 每个节点使用自己的后端连接，只共享数据库文件，与多进程部署相同
+        return ClusterCoordinator(SQLiteCoordinationBackend(db_path), node_id=node_id,
+                                  partitions=PARTITIONS, lease_ttl=LEASE_TTL)
+    return make
+
+def _assert_exclusive(*nodes):
+    owned = [node.owned_partitions() for node in nodes]
+    for index, partitions in enumerate(owned):
+        for other in owned[index + 1:]:
+            assert not partitions & other
+
+def test_single_node_holds_every_partition(clock, make_node):
+    node = make_node('a')
+    node.sync()
+
+    assert node.owned_partitions() == set(range(PARTITIONS))
+
+def test_two_nodes_never_overlap_while_rebalancing(clock, make_node):
+    a, b = make_node('a'), make_node('b')
+    a.sync()
+    b.sync()
+    # a的租约未过期，b暂时拿不到分到自己名下的分区
+    _assert_exclusive(a, b)
+    assert b.owned_partitions() == set()
+
+    for _ in range(3):
+        clock.now += 1
+        a.sync()
+        _assert_exclusive(a, b)
+        b.sync()
+        _assert_exclusive(a, b)
+
+    assert a.owned_partitions() | b.owned_partitions() == set(range(PARTITIONS))
+    assert a.owned_partitions() and b.owned_partitions()
+
+def test_every_endpoint_has_exactly_one_owner(clock, make_node):
+    a, b = make_node('a'), make_node('b')
+    for _ in range(2):
+        a.sync()
+        b.sync()
+
+    urls = [f"https://service-{index}.example.com/health" for index in range(200)]
+    assert all(a.owns(url) != b.owns(url) for url in urls)
+
+def test_crashed_node_partitions_move_after_lease_expires(clock, make_node):
+    a, b = make_node('a'), make_node('b')
+    for _ in range(2):
+        a.sync()
+        b.sync()
+    a_partitions = a.owned_partitions()
+
+    # a不再续约；租约到期前b不能接管
+    clock.now += LEASE_TTL / 2
+    b.sync()
+    assert not b.owned_partitions() & a_partitions
+
+    clock.now += LEASE_TTL
+    assert a.owned_partitions() == set()  # 本地租约也已过期，a不再探测
+    b.sync()
+    assert b.owned_partitions() == set(range(PARTITIONS))
+
+def test_stopped_node_hands_over_immediately(clock, make_node):
+    a, b = make_node('a'), make_node('b')
+    for _ in range(2):
+        a.sync()
+        b.sync()
+
+    a.stop()
+    b.sync()
+
+    assert a.owned_partitions() == set()
+    assert b.owned_partitions() == set(range(PARTITIONS))
+
+def test_backend_claim_is_exclusive_until_expiry(tmp_path):
+    db_path = str(tmp_path / 'cluster.db')
+    first, second = SQLiteCoordinationBackend(db_path), SQLiteCoordinationBackend(db_path)
+
+    assert first.claim('a', [0, 1], now=100, ttl=10) == [0, 1]
+    assert second.claim('b', [1, 2], now=105, ttl=10) == [2]
+    assert first.claim('a', [0, 1], now=108, ttl=10) == [0, 1]  # 续约
+    assert second.claim('b', [1], now=119, ttl=10) == [1]
@@ -0,0 +1,102 @@
+# tests/test_sketch.py
+import math
+import random
+
+import pytest
+
+from api_monitor.models.sketch import LatencySketch
+
+QUANTILES = [0.0, 0.1, 0.5, 0.9, 0.95, 0.99, 1.0]
+
+def _exact(values, q):
+    """与草图相同的秩定义：排序后第floor(q*(n-1))个样本"""
+    ordered = sorted(values)
+    return ordered[math.floor(q * (len(ordered) - 1))]
+
+def _samples(seed, n=5000):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(-2, 1.2) for _ in range(n)]
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.02, 0.05])
+def test_quantiles_within_relative_accuracy(accuracy):
+    values = _samples(1)
+    sketch = LatencySketch(relative_accuracy=accuracy)
+    for value in values:
+        sketch.add(value)
+
+    for q, estimate in zip(QUANTILES, sketch.quantiles(QUANTILES)):
+        exact = _exact(values, q)
+        assert abs(estimate - exact) <= accuracy * exact * (1 + 1e-9)
+
+def test_empty_sketch_returns_none():
+    assert LatencySketch().quantiles([0.5, 0.99]) == [None, None]
+
+def test_values_below_min_value_count_as_zero():
+    sketch = LatencySketch()
+    for value in (0.0, 0.0, 0.0, 1.0):
+        sketch.add(value)
+
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(1.0, rel=0.01)
+
+def test_merge_matches_single_sketch():
+    left, right = _samples(2, 3000), _samples(3, 2000)
+    merged = LatencySketch()
+    combined = LatencySketch()
+    other = LatencySketch()
+    for value in left:
+        merged.add(value)
+        combined.add(value)
+    for value in right:
+        other.add(value)
+        combined.add(value)
+
+    merged.merge(other)
+
+    assert merged.count == combined.count
+    assert merged.buckets == combined.buckets
+    assert merged.quantiles(QUANTILES) == combined.quantiles(QUANTILES)
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        LatencySketch(relative_accuracy=0.01).merge(LatencySketch(relative_accuracy=0.02))
+
+def test_remove_restores_previous_distribution():
+    kept, evicted = _samples(4, 2000), _samples(5, 500)
+    sketch = LatencySketch()
+    expected = LatencySketch()
+    for value in kept:
+        sketch.add(value)
+        expected.add(value)
+    for value in evicted + [0.0]:
+        sketch.add(value)
+    for value in evicted + [0.0]:
+        sketch.remove(value)
+
+    assert sketch.count == expected.count
+    assert sketch.zero_count == expected.zero_count
+    assert sketch.buckets == expected.buckets
+
+def test_remove_everything_empties_sketch():
+    sketch = LatencySketch()
+    values = _samples(6, 100)
+    for value in values:
+        sketch.add(value)
+    for value in values:
+        sketch.remove(value)
+
+    assert sketch.count == 0
+    assert sketch.buckets == {}
+    assert sketch.quantile(0.5) is None
+
+def test_collapse_bounds_buckets_and_keeps_upper_quantiles():
+    values = [10 ** (i / 100) * 1e-3 for i in range(600)]  # 跨6个数量级
+    sketch = LatencySketch(relative_accuracy=0.01, max_buckets=64)
+    for value in values:
+        sketch.add(value)
+
+    assert len(sketch.buckets) <= 64
+    assert sketch.count == len(values)
+    for q in (0.95, 0.99, 1.0):
+        exact = _exact(values, q)
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact * (1 + 1e-9)
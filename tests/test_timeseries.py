@@ -0,0 +1,102 @@
+# tests/test_timeseries.py
+import json
+import os
+
+import pytest
+
+from api_monitor.models.api import ErrorType
+from api_monitor.storage.timeseries import (ERROR_CLASSES, INDEX_BLOCK_RECORDS, RECORD_SIZE,
+                                            TimeSeriesStore)
+
+def _open(path, **kwargs) -> TimeSeriesStore:
+    # 后台刷写间隔设得很长，测试中只由flush/close/scan落盘
+    return TimeSeriesStore(str(path), flush_interval=3600, **kwargs)
+
+def _crash(store: TimeSeriesStore):
+    """模拟进程异常退出：停止后台线程，不封存活动段"""
+    store._stop_event.set()
+    store._flusher.join()
+    store._active_file.close()
+
+def test_round_trip_through_sealed_segment(tmp_path):
+    store = _open(tmp_path)
+    store.append(1.0, 'a', 200, 0.1)
+    store.append(2.0, 'b', None, 5.0, ErrorType.TIMEOUT)
+    store.close()
+
+    reopened = _open(tmp_path)
+    records = list(reopened.scan())
+    reopened.close()
+
+    assert [(r.timestamp, r.endpoint, r.status_code, r.error_class) for r in records] == [
+        (1.0, 'a', 200, None),
+        (2.0, 'b', None, ErrorType.TIMEOUT)
+    ]
+    assert records[0].latency == pytest.approx(0.1)
+
+def test_recovers_active_segment_and_drops_torn_record(tmp_path):
+    store = _open(tmp_path)
+    for index in range(10):
+        store.append(100.0 + index, 'a', 200, 0.01 * index)
+    store.flush()
+    active_path = os.path.join(str(tmp_path), store._active_name)
+    _crash(store)
+    with open(active_path, 'ab') as f:
+        f.write(b'\x01' * (RECORD_SIZE - 3))  # 写入中断留下的半条记录
+
+    recovered = _open(tmp_path)
+    records = list(recovered.scan())
+    recovered.close()
+
+    assert [r.timestamp for r in records] == [100.0 + index for index in range(10)]
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.active')]
+    with open(os.path.join(str(tmp_path), 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert [(seg['count'], seg['min_ts'], seg['max_ts']) for seg in manifest] == [
+        (10, 100.0, 109.0)
+    ]
+
+def test_empty_active_segment_is_removed_on_recovery(tmp_path):
+    open(os.path.join(str(tmp_path), 'seg-0000000000001.active'), 'wb').close()
+
+    store = _open(tmp_path)
+    store.close()
+
+    assert not [name for name in os.listdir(str(tmp_path)) if name.startswith('seg-')]
+
+def test_scan_filters_by_time_range_endpoint_and_blocks(tmp_path):
+    store = _open(tmp_path, batch_size=INDEX_BLOCK_RECORDS)
+    total = INDEX_BLOCK_RECORDS * 2 + 10
+    for index in range(total):
+        store.append(float(index), 'a' if index % 2 else 'b', 200, 0.0)
+    store.close()
+
+    store = _open(tmp_path)
+    window = list(store.scan(INDEX_BLOCK_RECORDS - 2, INDEX_BLOCK_RECORDS + 2, endpoints=['a']))
+    store.close()
+
+    assert [r.timestamp for r in window] == [INDEX_BLOCK_RECORDS - 1.0, INDEX_BLOCK_RECORDS + 1.0]
+
+def test_delete_before_removes_only_expired_segments(tmp_path):
+    store = _open(tmp_path)
+    store.append(1.0, 'a', 200, 0.0)
+    store.flush()
+    store._seal_active()
+    store.append(50.0, 'a', 200, 0.0)
+    store.flush()
+    store._seal_active()
+
+    assert store.delete_before(10.0) == 1
+    assert [r.timestamp for r in store.scan()] == [50.0]
+    store.close()
+
+def test_unknown_error_class_is_rejected(tmp_path):
+    store = _open(tmp_path)
+    with pytest.raises(ValueError):
+        store.append(1.0, 'a', None, 0.0, 'not-an-error-type')
+    store.close()
+
+def test_error_class_codes_follow_error_type_order():
+    # 已有文件按编码读回，新增的ErrorType只能追加在末尾
+    assert ERROR_CLASSES[:6] == [None, 'timeout', 'request', 'unexpected', 'assertion', 'dns']
+    assert ERROR_CLASSES[1:] == ErrorType.values()
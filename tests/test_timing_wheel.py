@@ -0,0 +1,69 @@
+# tests/test_timing_wheel.py
+import random
+
+import pytest
+
+from api_monitor.core.timing_wheel import HierarchicalTimingWheel, TimerEntry
+
+def _drain(wheel: HierarchicalTimingWheel, until: int):
+    """逐tick推进，返回(到期tick, 定时项)列表"""
+    fired = []
+    while wheel.current_tick < until:
+        tick = wheel.current_tick + 1
+        fired.extend((tick, entry) for entry in wheel.advance(tick))
+    return fired
+
+@pytest.mark.parametrize('delta', [1, 2, 63, 64, 65, 4095, 4096, 4097, 100000])
+def test_entry_fires_exactly_at_deadline(delta):
+    wheel = HierarchicalTimingWheel(start_tick=1000, slot_bits=6, levels=3)
+    entry = TimerEntry(1000 + delta, 'a')
+    wheel.add(entry)
+
+    fired = _drain(wheel, 1000 + delta)
+
+    assert fired == [(1000 + delta, entry)]
+    assert len(wheel) == 0
+
+def test_cascade_keeps_every_entry_on_its_tick():
+    rng = random.Random(7)
+    wheel = HierarchicalTimingWheel(start_tick=0, slot_bits=3, levels=3)
+    deadlines = [rng.randint(1, 2000) for _ in range(500)]
+    for index, deadline in enumerate(deadlines):
+        wheel.add(TimerEntry(deadline, index))
+    assert len(wheel) == 500
+
+    fired = _drain(wheel, 2000)
+
+    assert sorted(entry.payload for _, entry in fired) == list(range(500))
+    assert all(tick == deadlines[entry.payload] for tick, entry in fired)
+    assert len(wheel) == 0
+
+def test_overdue_entry_fires_on_next_tick():
+    wheel = HierarchicalTimingWheel(start_tick=50)
+    entry = TimerEntry(10, 'late')
+    wheel.add(entry)
+
+    assert wheel.advance(50) == []
+    assert wheel.advance(51) == [entry]
+
+def test_entry_beyond_max_span_is_reinserted_until_due():
+    wheel = HierarchicalTimingWheel(start_tick=0, slot_bits=2, levels=2)
+    deadline = wheel.max_span * 3 + 5
+    entry = TimerEntry(deadline, 'far')
+    wheel.add(entry)
+
+    fired = _drain(wheel, deadline + 10)
+
+    assert fired == [(deadline, entry)]
+
+def test_advance_skipping_many_ticks_returns_all_expired():
+    wheel = HierarchicalTimingWheel(start_tick=0, slot_bits=4, levels=3)
+    entries = [TimerEntry(deadline, deadline) for deadline in (1, 15, 16, 17, 255, 256, 300)]
+    for entry in entries:
+        wheel.add(entry)
+
+    expired = wheel.advance(256)
+
+    assert sorted(entry.payload for entry in expired) == [1, 15, 16, 17, 255, 256]
+    assert len(wheel) == 1
+    assert [entry.payload for entry in wheel.advance(300)] == [300]